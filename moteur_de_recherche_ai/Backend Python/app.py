@@ -1,8 +1,15 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
 import os
+import time
 from database_config import DatabaseConfig
 from search_engine import SearchEngine
 from indexer import DocumentIndexer
+from surveillant import lire_etat
+from segments import GestionnaireSegments
+from shards import IndexPartitionne
+from index_mappe import IndexMappe
+from cache_resultats import CacheResultats
+from autocompletion import IndexPrefixes
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.config['SECRET_KEY'] = 'votre_cle_secrete_ici'
@@ -15,6 +22,54 @@ def get_db():
     db.connect()
     return db
 
+# Index segmenté utilisé s'il a été construit (reindex.py --segments).
+# Un seul gestionnaire pour le processus: ses écritures du catalogue sont
+# sérialisées entre threads (et avec les autres processus par segments.lock)
+_segments = None
+
+def get_segments():
+    """Gestionnaire de l'index segmenté, ou None si l'index est dans la base"""
+    global _segments
+    if _segments is None and GestionnaireSegments.existe():
+        _segments = GestionnaireSegments()
+    return _segments
+
+# Index partitionné utilisé s'il a été construit (reindex.py --shards N).
+# Chargé une seule fois: il garde un pool de threads et des connexions par thread
+_shards = None
+
+def get_shards():
+    """Index partitionné, ou None si l'index est dans une seule base"""
+    global _shards
+    if _shards is None:
+        _shards = IndexPartitionne.charger()
+    return _shards
+
+# Cache des résultats de recherche du processus, invalidé par les commits de l'indexeur
+cache_resultats = CacheResultats()
+
+# Index des préfixes de l'autocomplétion, reconstruit quand l'index change
+index_prefixes = IndexPrefixes()
+
+# Index mappé utilisé s'il a été construit (reindex.py --index-mappe).
+# Gardé ouvert d'une requête à l'autre, rouvert quand le fichier est reconstruit
+_index_mappe = None
+
+def get_index_mappe(db):
+    """
+    Index projeté en mémoire, ou None s'il n'a pas été construit ou si la
+    base a été modifiée depuis (/api/indexer, surveillant): la recherche
+    passe alors par la base jusqu'à la reconstruction du fichier
+    """
+    global _index_mappe
+    if _index_mappe is not None and not _index_mappe.est_a_jour():
+        _index_mappe = None
+    if _index_mappe is None and IndexMappe.existe():
+        _index_mappe = IndexMappe()
+    if _index_mappe is not None and not _index_mappe.est_synchronise(db):
+        return None
+    return _index_mappe
+
 @app.route('/')
 def index():
     """Page d'accueil"""
@@ -192,10 +247,15 @@ def api_statistiques():
         stats_db['nb_videos'] = result[0] if result else 0
         
         # Compter les mots-clés uniques
-        db.cursor.execute("SELECT COUNT(DISTINCT mot_cle) FROM index_mots_cles")
+        db.cursor.execute("SELECT COUNT(DISTINCT terme_id) FROM index_mots_cles")
         result = db.cursor.fetchone()
         stats_db['nb_mots_cles_uniques'] = result[0] if result else 0
         
+        # Index partitionné: les contenus sont dans les shards
+        shards = get_shards()
+        if shards:
+            stats_db = shards.get_stats()
+        
         print(f"✅ Stats récupérées: {stats_db}")
         
         # Stats de recherche
@@ -215,9 +275,14 @@ def api_statistiques():
             print(f"⚠️  Erreur stats recherches: {e}")
             recherches_populaires = []
         
+        segments = get_segments()
+        
         return jsonify({
             'recherches_populaires': recherches_populaires,
-            'stats_base': stats_db
+            'stats_base': stats_db,
+            'index_segmente': segments.stats() if segments else None,
+            'cache_resultats': cache_resultats.stats(),
+            'autocompletion': index_prefixes.stats()
         })
         
     except Exception as e:
@@ -244,30 +309,47 @@ def api_rechercher():
     try:
         # Créer une nouvelle connexion pour cette requête
         db = get_db()
-        search_engine = SearchEngine(db)
         
         if request.method == 'POST':
             data = request.get_json()
             requete = data.get('q', '')
             type_contenu = data.get('type', 'all')
             limit = data.get('limit', 20)
+            classement = data.get('classement', 'bm25')
+            avec_contenu = bool(data.get('contenu', False))
+            apres = data.get('apres')
         else:
             requete = request.args.get('q', '')
             type_contenu = request.args.get('type', 'all')
             limit = int(request.args.get('limit', 20))
+            classement = request.args.get('classement', 'bm25')
+            avec_contenu = request.args.get('contenu', '').lower() in ('1', 'true', 'oui')
+            apres = request.args.get('apres')
         
         if not requete:
             return jsonify({'error': 'Requête vide'}), 400
         
+        # classement=frequences: ancien classement par nombre d'occurrences (comparaison)
+        if classement not in SearchEngine.CLASSEMENTS:
+            return jsonify({'error': f"Classement inconnu: {classement}"}), 400
+        search_engine = SearchEngine(db, segments=get_segments(), shards=get_shards(),
+                                     classement=classement, index_mappe=get_index_mappe(db),
+                                     cache=cache_resultats)
+        
         print(f"🔍 Recherche: '{requete}' (type: {type_contenu}, limit: {limit})")
         
-        # Effectuer la recherche
-        resultats = search_engine.rechercher(requete, type_contenu, limit)
+        # Effectuer la recherche (contenu=1: début du texte des documents en plus de l'extrait;
+        # apres: 'curseur_suivant' de la page précédente)
+        resultats = search_engine.rechercher(requete, type_contenu, limit, avec_contenu=avec_contenu,
+                                             apres=apres)
         
         print(f"✅ {resultats.get('nb_total', 0)} résultats trouvés en {resultats.get('temps_ms', 0)}ms")
         
         return jsonify(resultats)
         
+    except ValueError as e:
+        # Paramètre invalide (limite, curseur de pagination)
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erreur recherche: {e}")
         import traceback
@@ -288,7 +370,7 @@ def api_suggestions():
     db = None
     try:
         db = get_db()
-        search_engine = SearchEngine(db)
+        search_engine = SearchEngine(db, shards=get_shards(), prefixes=index_prefixes)
         
         debut = request.args.get('q', '')
         
@@ -306,13 +388,24 @@ def api_suggestions():
         if db:
             db.close()
 
+@app.route('/api/surveillance')
+def api_surveillance():
+    """API d'état du surveillant du corpus (file d'attente et retard)"""
+    etat = lire_etat()
+    if etat is None:
+        return jsonify({'actif': False})
+    
+    # L'état est publié toutes les quelques secondes par surveillant.py
+    etat['actif'] = time.time() - etat.get('mis_a_jour', 0) < 30
+    return jsonify(etat)
+
 @app.route('/api/indexer', methods=['POST'])
 def api_indexer():
     """API pour indexer un nouveau fichier ou dossier"""
     db = None
     try:
         db = get_db()
-        indexer = DocumentIndexer(db)
+        indexer = DocumentIndexer(db, segments=get_segments())
         
         data = request.get_json()
         chemin = data.get('chemin', '')
@@ -320,9 +413,14 @@ def api_indexer():
         if not chemin or not os.path.exists(chemin):
             return jsonify({'error': 'Chemin invalide'}), 400
         
+        shards = get_shards()
+        
         if os.path.isdir(chemin):
             # Indexer un dossier complet
-            compteurs = indexer.indexer_dossier(chemin)
+            if shards:
+                compteurs = shards.indexer_dossier(chemin)
+            else:
+                compteurs = indexer.indexer_dossier(chemin)
             return jsonify({
                 'success': True,
                 'message': 'Dossier indexé avec succès',
@@ -330,7 +428,10 @@ def api_indexer():
             })
         else:
             # Indexer un fichier unique
-            success = indexer.indexer_document(chemin)
+            if shards:
+                success = shards.indexer_fichier(chemin)
+            else:
+                success = indexer.indexer_document(chemin)
             return jsonify({
                 'success': success,
                 'message': 'Fichier indexé' if success else 'Erreur d\'indexation'
@@ -0,0 +1,164 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from text_processor import MOT_REGEX, plier
+
+# Borne supérieure des clés commençant par un préfixe (prefixe + FIN_PREFIXE)
+FIN_PREFIXE = '\U0010ffff'
+
+
+class IndexPrefixes:
+    """
+    Index des préfixes de l'autocomplétion (voir SearchEngine.suggestions_recherche)
+
+    Les mots indexés sont rangés dans un tableau trié par forme pliée:
+    les mots commençant par un préfixe y forment un intervalle trouvé par
+    recherche dichotomique. Les `k` meilleures complétions de chaque
+    préfixe partagé par plus de `seuil` mots sont précalculées; pour les
+    autres, l'intervalle (au plus `seuil` mots) est parcouru à la lecture.
+
+    Le poids d'un mot est sa fréquence dans le corpus, plus POIDS_RECHERCHES
+    par recherche ayant trouvé des résultats qui le contenait
+    (statistiques_recherche). L'index est reconstruit quand la génération
+    de l'index change (voir rafraichir); les recherches enregistrées depuis
+    ne comptent qu'à la reconstruction suivante. Partagé entre les threads
+    du serveur: une reconstruction remplace l'état d'un bloc, les lectures
+    continuent sur l'ancien pendant qu'elle s'exécute.
+    """
+
+    # Poids d'une recherche passée contenant le mot, en occurrences du corpus
+    POIDS_RECHERCHES = 10
+
+    def __init__(self, k=10, seuil=64):
+        self.k = k
+        self.seuil = seuil
+
+        # (génération, clés triées, textes, rangs par poids, meilleurs par préfixe)
+        self.etat = None
+        self.verrou = threading.Lock()
+
+        self.reconstructions = 0
+        self.duree_construction_ms = 0
+
+    @property
+    def generation(self):
+        return self.etat[0] if self.etat is not None else None
+
+    def rafraichir(self, generation, charger):
+        """
+        Reconstruire l'index s'il date d'une autre génération
+
+        Args:
+            generation: Génération courante de l'index (SearchEngine.generation_index)
+            charger: Fonction rendant (frequences, recherches), voir construire
+
+        Une reconstruction déjà en cours dans un autre thread n'est pas
+        attendue si un état plus ancien peut être servi
+        """
+        if self.generation == generation:
+            return
+        if not self.verrou.acquire(blocking=self.etat is None):
+            return
+        try:
+            if self.generation != generation:
+                frequences, recherches = charger()
+                self.construire(frequences, recherches, generation)
+        finally:
+            self.verrou.release()
+
+    def construire(self, frequences, recherches, generation=None):
+        """
+        Construire l'index
+
+        Args:
+            frequences: Itérable de (mot, fréquence dans le corpus)
+            recherches: Itérable de (requête, nombre de recherches)
+            generation: Génération de l'index dont proviennent les fréquences
+        """
+        debut = time.time()
+
+        poids_recherches = {}
+        for requete, nb in recherches:
+            for mot in set(MOT_REGEX.findall(plier(requete))):
+                poids_recherches[mot] = poids_recherches.get(mot, 0) + nb
+
+        entrees = sorted((plier(texte), texte, freq) for texte, freq in frequences)
+        cles = [cle for cle, _, _ in entrees]
+        textes = [texte for _, texte, _ in entrees]
+
+        # Rang de chaque mot par poids décroissant (puis par texte): les
+        # meilleures complétions d'un intervalle sont celles de plus petit rang
+        ordre = sorted(range(len(entrees)),
+                       key=lambda i: (-(entrees[i][2] + self.POIDS_RECHERCHES
+                                        * poids_recherches.get(cles[i], 0)), textes[i]))
+        rangs = array('I', bytes(4 * len(entrees)))
+        for rang, i in enumerate(ordre):
+            rangs[i] = rang
+
+        meilleurs = {}
+        if len(cles) > self.seuil:
+            self._meilleurs(cles, rangs, meilleurs, 0, len(cles), '')
+
+        self.etat = (generation, cles, textes, rangs,
+                     {prefixe: tuple(textes[i] for i in ids) for prefixe, ids in meilleurs.items()})
+        self.reconstructions += 1
+        self.duree_construction_ms = round((time.time() - debut) * 1000, 1)
+
+    def _meilleurs(self, cles, rangs, meilleurs, lo, hi, prefixe):
+        """
+        Meilleures complétions de l'intervalle [lo, hi) des mots commençant
+        par `prefixe`, précalculées pour ce préfixe et ses prolongements
+        partagés par plus de `seuil` mots (fusion des meilleures complétions
+        de chaque prolongement d'un caractère)
+        """
+        if hi - lo <= self.seuil:
+            return heapq.nsmallest(self.k, range(lo, hi), key=rangs.__getitem__)
+
+        # Mots égaux au préfixe, triés en tête de l'intervalle
+        n = len(prefixe)
+        i = lo
+        while i < hi and len(cles[i]) == n:
+            i += 1
+        candidats = list(range(lo, i))
+        while i < hi:
+            prolongement = cles[i][:n + 1]
+            j = bisect_right(cles, prolongement + FIN_PREFIXE, i, hi)
+            candidats.extend(self._meilleurs(cles, rangs, meilleurs, i, j, prolongement))
+            i = j
+
+        resultat = heapq.nsmallest(self.k, candidats, key=rangs.__getitem__)
+        meilleurs[prefixe] = resultat
+        return resultat
+
+    def completer(self, debut_mot, limit=5):
+        """
+        Mots indexés commençant par debut_mot (accents et casse ignorés),
+        par poids décroissant
+
+        Returns:
+            Liste d'au plus `limit` mots
+        """
+        if self.etat is None:
+            return []
+        _, cles, textes, rangs, meilleurs = self.etat
+
+        prefixe = plier(debut_mot.strip())
+        if limit <= self.k and prefixe in meilleurs:
+            return list(meilleurs[prefixe][:limit])
+
+        lo = bisect_left(cles, prefixe)
+        hi = bisect_right(cles, prefixe + FIN_PREFIXE, lo)
+        return [textes[i] for i in heapq.nsmallest(limit, range(lo, hi), key=rangs.__getitem__)]
+
+    def stats(self):
+        """Compteurs de l'index (exposés par /api/statistiques)"""
+        etat = self.etat
+        return {
+            'generation': etat[0] if etat else None,
+            'nb_mots': len(etat[1]) if etat else 0,
+            'nb_prefixes_precalcules': len(etat[4]) if etat else 0,
+            'reconstructions': self.reconstructions,
+            'duree_construction_ms': self.duree_construction_ms,
+        }
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Autocomplétion par l'index des préfixes contre la requête LIKE
+Construit l'index des préfixes (voir autocompletion.py) d'un vocabulaire
+synthétique (mots de syllabes tirées au hasard, fréquences de Zipf) et
+vérifie ses complétions contre un parcours exhaustif, puis mesure la
+latence médiane et au 99e centile de préfixes de 2 à 6 caractères.
+Avec --base, compare aussi les suggestions d'un index existant par la
+requête SQL d'origine et par l'index des préfixes.
+Usage: python benchmark_autocompletion.py [--mots N] [--requetes N] [--base chemin]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+import time
+from autocompletion import IndexPrefixes
+from database_config import DatabaseConfig
+from search_engine import SearchEngine
+
+SYLLABES = ['ap', 'pren', 'tis', 'sa', 'ge', 're', 'seau', 'neu', 'ro', 'ne', 'don', 'nees',
+            'mo', 'de', 'le', 'ca', 'lcul', 'vi', 'sion', 'tra', 'duc', 'tion', 'in', 'for',
+            'ma', 'ti', 'que', 'al', 'go', 'rith', 'me', 'clas', 'se', 'ment', 'ur', 'ba']
+
+
+def generer_vocabulaire(nb_mots, graine=0):
+    """Mots distincts de 1 à 5 syllabes et leur fréquence (loi de Zipf sur un ordre aléatoire)"""
+    aleatoire = random.Random(graine)
+    mots = set()
+    while len(mots) < nb_mots:
+        mots.add(''.join(aleatoire.choice(SYLLABES) for _ in range(aleatoire.randint(1, 5)))
+                 + aleatoire.choice(['', 's', 'e', 'x', 'al', 'if']))
+    mots = sorted(mots)
+    aleatoire.shuffle(mots)
+    return [(mot, 1 + 100000 // rang) for rang, mot in enumerate(mots, 1)]
+
+
+def mesurer(fonction, prefixes):
+    """Durées (ms) de chaque appel, et résultats"""
+    durees, resultats = [], []
+    for prefixe in prefixes:
+        debut = time.perf_counter()
+        resultats.append(fonction(prefixe))
+        durees.append((time.perf_counter() - debut) * 1000)
+    return sorted(durees), resultats
+
+
+def afficher(nom, durees):
+    print(f"  - {nom:16s}: {statistics.median(durees):8.3f} ms {durees[int(len(durees) * 0.99)]:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autocomplétion par l'index des préfixes")
+    parser.add_argument('--mots', type=int, default=1000000)
+    parser.add_argument('--requetes', type=int, default=2000)
+    parser.add_argument('--base', default=None,
+                        help="Index existant dont comparer les suggestions (requête SQL et index des préfixes)")
+    args = parser.parse_args()
+
+    print(f"📝 Vocabulaire de {args.mots} mots...")
+    frequences = generer_vocabulaire(args.mots)
+    index = IndexPrefixes()
+    index.construire(frequences, [])
+    print(f"✓ Index construit en {index.duree_construction_ms / 1000:.1f} s "
+          f"({index.stats()['nb_prefixes_precalcules']} préfixes précalculés)")
+
+    aleatoire = random.Random(1)
+    prefixes = [mot[:aleatoire.randint(2, 6)] for mot, _ in aleatoire.sample(frequences, args.requetes)]
+    durees, resultats = mesurer(lambda prefixe: index.completer(prefixe, 5), prefixes)
+
+    # Complétions attendues: parcours de tout le vocabulaire
+    erreurs = []
+    for prefixe, obtenu in list(zip(prefixes, resultats))[:100]:
+        attendu = heapq.nsmallest(5, ((-freq, mot) for mot, freq in frequences if mot.startswith(prefixe)))
+        if obtenu != [mot for _, mot in attendu]:
+            erreurs.append((prefixe, obtenu, attendu))
+
+    print(f"\n⏱️  {args.requetes} préfixes (médiane, 99e centile):")
+    afficher('index préfixes', durees)
+
+    if args.base:
+        db = DatabaseConfig(args.base)
+        db.connect()
+        engine = SearchEngine(db)
+        mots = [mot for mot, _ in engine._frequences_termes()]
+        if mots:
+            prefixes = [mot[:aleatoire.randint(2, 6)] for mot in aleatoire.choices(mots, k=args.requetes)]
+            durees_sql, _ = mesurer(lambda prefixe: engine.suggestions_recherche(prefixe, 5), prefixes)
+            engine.prefixes = IndexPrefixes()
+            engine.suggestions_recherche(prefixes[0], 5)
+            durees_index, _ = mesurer(lambda prefixe: engine.suggestions_recherche(prefixe, 5), prefixes)
+            print(f"\n⏱️  {args.base} ({len(mots)} mots, {args.requetes} préfixes):")
+            afficher('requête LIKE', durees_sql)
+            afficher('index préfixes', durees_index)
+        db.close()
+
+    if erreurs:
+        print(f"❌ Complétions différentes du parcours exhaustif: {erreurs[:5]}")
+        sys.exit(1)
+    print("✅ Complétions identiques au parcours exhaustif")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recherche des fautes de frappe sur un grand vocabulaire
+Construit l'index des suppressions (voir correction.py) d'un vocabulaire
+synthétique (mots du corpus fourni et croisements de leurs débuts et fins),
+puis cherche des mots altérés de 1 ou 2 fautes: le mot d'origine doit être
+retrouvé à chaque fois, et la latence médiane et au 95e centile est mesurée.
+Usage: python benchmark_correction.py [dossier] [--mots N] [--base chemin] [--requetes N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from correction import IndexCorrection, distance_autorisee, distance_edition
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+from text_processor import plier
+
+LETTRES = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def generer_vocabulaire(dossier_source, nb_mots, graine=0):
+    """Mots pliés distincts: ceux du corpus, complétés par des croisements début + fin"""
+    indexer = DocumentIndexer(None)
+    mots = set()
+    for chemin, categorie in indexer.lister_fichiers(dossier_source):
+        if categorie == 'docs':
+            for token in indexer.processor.tokeniser(indexer.extraire_contenu(chemin) or ''):
+                if len(token) > 2 and token.isascii() and token.isalpha():
+                    mots.add(plier(token))
+    if not mots:
+        return []
+
+    aleatoire = random.Random(graine)
+    sources = sorted(mots)
+    while len(mots) < nb_mots:
+        a, b = aleatoire.choice(sources), aleatoire.choice(sources)
+        mots.add(a[:aleatoire.randint(2, len(a))] + b[aleatoire.randint(1, len(b) - 1):])
+    return sorted(mots)[:nb_mots]
+
+
+def alterer(mot, aleatoire):
+    """Mot avec 1 faute (2 pour les mots longs): substitution, insertion, suppression ou inversion"""
+    for _ in range(distance_autorisee(mot)):
+        i = aleatoire.randrange(len(mot))
+        operation = aleatoire.choice(['substitution', 'insertion', 'suppression', 'inversion'])
+        if operation == 'substitution':
+            mot = mot[:i] + aleatoire.choice(LETTRES) + mot[i + 1:]
+        elif operation == 'insertion':
+            mot = mot[:i] + aleatoire.choice(LETTRES) + mot[i:]
+        elif operation == 'suppression' and len(mot) > 3:
+            mot = mot[:i] + mot[i + 1:]
+        elif i + 1 < len(mot):
+            mot = mot[:i] + mot[i + 1] + mot[i] + mot[i + 2:]
+    return mot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recherche des fautes de frappe")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--mots', type=int, default=1000000)
+    parser.add_argument('--base', default=None,
+                        help="Base de l'index des suppressions (réutilisée si elle existe)")
+    parser.add_argument('--requetes', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"📝 Vocabulaire de {args.mots} mots depuis {args.dossier}...")
+    vocabulaire = generer_vocabulaire(args.dossier, args.mots)
+    if not vocabulaire:
+        print(f"❌ Aucun document texte dans {args.dossier}")
+        sys.exit(1)
+
+    temporaire = tempfile.TemporaryDirectory()
+    base = args.base or os.path.join(temporaire.name, 'benchmark_correction.db')
+    existe = os.path.exists(base)
+    db = DatabaseConfig(base)
+    db.connect()
+    db.create_tables()
+    index = IndexCorrection(db)
+    if not existe:
+        debut = time.time()
+        index.ajouter(vocabulaire)
+        index.ecrire()
+        db.conn.commit()
+        print(f"✓ Index construit en {time.time() - debut:.1f} s")
+
+    aleatoire = random.Random(1)
+    durees = {'plus proches': [], 'toutes': []}
+    manques = []
+    for mot in aleatoire.sample(vocabulaire, args.requetes):
+        faute = alterer(mot, aleatoire)
+        # Recherche du moteur: formes de la plus petite distance trouvée
+        debut = time.perf_counter()
+        next(index.plus_proches(faute), None)
+        durees['plus proches'].append((time.perf_counter() - debut) * 1000)
+        # Toutes les formes à la distance tolérée
+        debut = time.perf_counter()
+        candidats = index.candidats(faute)
+        durees['toutes'].append((time.perf_counter() - debut) * 1000)
+        # Une faute peut raccourcir le mot sous le seuil d'une distance tolérée
+        attendu = faute != mot and distance_edition(faute, mot, 2) <= distance_autorisee(faute)
+        if attendu and mot not in {forme for _, forme in candidats}:
+            manques.append((faute, mot))
+    db.close()
+    temporaire.cleanup()
+
+    print(f"\n⏱️  {args.requetes} recherches sur {len(vocabulaire)} mots (médiane, 95e centile):")
+    for mode, valeurs in durees.items():
+        valeurs.sort()
+        print(f"  - {mode:12s}: {statistics.median(valeurs):8.2f} ms {valeurs[int(len(valeurs) * 0.95)]:8.2f} ms")
+    if manques:
+        print(f"❌ Mot d'origine non retrouvé: {manques[:10]}")
+        sys.exit(1)
+    print("✅ Mot d'origine toujours retrouvé")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index projeté en mémoire contre lecture de la base SQLite
+Construit l'index mappé d'une base déjà indexée, vérifie que les deux modes
+rendent les mêmes résultats, puis compare la latence médiane de la résolution
+d'un terme et d'une recherche complète.
+Usage: python benchmark_mappe.py [base] [--repetitions N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from database_config import DatabaseConfig
+from index_mappe import IndexMappe, construire_index_mappe
+from search_engine import SearchEngine
+
+REQUETES = ['ai', 'ml', 'nlp', 'cnn', 'deep learning', 'données', 'réseaux de neurones',
+            '"apprentissage automatique"', 'descente de gradient', 'arbre de décision']
+
+
+def preparer(engine, requete):
+    """Mots, racines, phrases et synonymes de la requête (comme SearchEngine.rechercher, sans correction)"""
+    _, mots, racines, synonymes, _ = engine._plan_requete(requete, corriger=False)
+    return mots, racines, engine.extraire_phrases(requete), synonymes
+
+
+def mediane_ms(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index mappé contre base SQLite")
+    parser.add_argument('base', nargs='?', default='ai_search_engine.db')
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base):
+        print(f"❌ Base introuvable: {args.base} (lancer d'abord l'indexation)")
+        sys.exit(1)
+
+    db = DatabaseConfig(args.base)
+    db.connect()
+    temporaire = tempfile.TemporaryDirectory()
+    fichier = os.path.join(temporaire.name, IndexMappe.FICHIER)
+    debut = time.perf_counter()
+    nb_postings = construire_index_mappe(db, fichier)
+    print(f"🔧 Index mappé: {nb_postings} postings, {os.path.getsize(fichier) / 1e6:.1f} Mo "
+          f"en {time.perf_counter() - debut:.1f} s")
+
+    index = IndexMappe(fichier)
+    moteurs = {'sqlite': SearchEngine(db), 'mappe': SearchEngine(db, index_mappe=index)}
+
+    requetes = [preparer(moteurs['sqlite'], requete) for requete in REQUETES]
+    resultats = {mode: [[(r['type'], r['id'], r['score'])
+                         for r in engine._rechercher_contenus(mots, racines, 'all', 20, phrases,
+                                                              synonymes=synonymes)]
+                        for mots, racines, phrases, synonymes in requetes]
+                 for mode, engine in moteurs.items()}
+    if resultats['sqlite'] != resultats['mappe']:
+        print("❌ Résultats différents entre la base et l'index mappé")
+        sys.exit(1)
+
+    print(f"\n⏱️  Médiane ({len(REQUETES)} requêtes × {args.repetitions}):")
+    for mode, engine in moteurs.items():
+        resolution = statistics.median(
+            mediane_ms(lambda: engine.termes.variantes_pliees([mot]), args.repetitions)
+            for mots, _, _, _ in requetes for mot in mots)
+        recherche = statistics.median(
+            mediane_ms(lambda: engine._rechercher_contenus(mots, racines, 'all', 20, phrases,
+                                                           synonymes=synonymes),
+                       args.repetitions)
+            for mots, racines, phrases, synonymes in requetes)
+        print(f"  - {mode:7s}: terme {resolution * 1000:7.1f} µs, recherche {recherche:7.2f} ms")
+
+    index.fermer()
+    db.close()
+    temporaire.cleanup()
+    print("✅ Résultats identiques")
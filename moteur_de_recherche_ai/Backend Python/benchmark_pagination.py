@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pagination par curseur contre pagination par décalage
+Indexe un corpus synthétique (voir benchmark_topk.py), parcourt les pages
+de chaque requête avec 'curseur_suivant', avec et sans bonus de proximité:
+sans, résultats identiques au classement d'un seul tenant exigés; avec,
+mêmes contenus, chacun une seule fois, et chaque page triée par score.
+Compare ensuite la latence médiane de la première et de la dernière page
+à celle d'une recherche de toutes les pages tronquée.
+Usage: python benchmark_pagination.py [dossier] [--documents N] [--base chemin] [--pages N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from benchmark_topk import REQUETES, generer_corpus
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+from search_engine import SearchEngine
+
+
+def parcourir(engine, requete, taille_page, nb_pages, proximite=False):
+    """
+    Curseurs de chaque page (None pour la première), résultats (type, id)
+    des pages, et True si chaque page est triée par score décroissant
+    """
+    curseurs, resultats, curseur, triees = [], [], None, True
+    for _ in range(nb_pages):
+        curseurs.append(curseur)
+        reponse = engine.rechercher(requete, limit=taille_page, proximite=proximite, apres=curseur)
+        scores = [r['score'] for r in reponse['resultats']]
+        triees = triees and scores == sorted(scores, reverse=True)
+        resultats.extend((r['type'], r['id']) for r in reponse['resultats'])
+        curseur = reponse['curseur_suivant']
+        if curseur is None:
+            break
+    return curseurs, resultats, triees
+
+
+def mediane_ms(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pagination par curseur")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--documents', type=int, default=3000)
+    parser.add_argument('--base', default=None,
+                        help="Base du corpus synthétique (réutilisée si elle existe)")
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--taille-page', type=int, default=20)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    temporaire = tempfile.TemporaryDirectory()
+    base = args.base or os.path.join(temporaire.name, 'benchmark_pagination.db')
+    if not os.path.exists(base):
+        dossier_synthetique = os.path.join(temporaire.name, 'corpus')
+        os.makedirs(dossier_synthetique)
+        print(f"📝 Génération de {args.documents} documents depuis {args.dossier}...")
+        if not generer_corpus(args.dossier, dossier_synthetique, args.documents):
+            print(f"❌ Aucun document texte dans {args.dossier}")
+            sys.exit(1)
+        db = DatabaseConfig(base)
+        db.connect()
+        db.create_tables()
+        DocumentIndexer(db).indexer_dossier(dossier_synthetique, bulk=True)
+        db.close()
+
+    db = DatabaseConfig(base)
+    db.connect()
+    engine = SearchEngine(db)
+    profondeur = args.pages * args.taille_page
+
+    durees = {'page 1': [], f'page {args.pages}': [], f'top {profondeur} tronqué': []}
+    differences = []
+    for requete in REQUETES:
+        curseurs, pages, _ = parcourir(engine, requete, args.taille_page, args.pages)
+        complet = engine.rechercher(requete, limit=profondeur, proximite=False)['resultats']
+        if pages != [(r['type'], r['id']) for r in complet]:
+            differences.append(requete)
+
+        # Bonus de proximité (par défaut): il ne reclasse qu'à l'intérieur des pages
+        _, pages, triees = parcourir(engine, requete, args.taille_page, args.pages, proximite=True)
+        complet = engine.rechercher(requete, limit=profondeur)['resultats']
+        if (not triees or len(set(pages)) != len(pages)
+                or set(pages) != {(r['type'], r['id']) for r in complet}):
+            differences.append(f"{requete} (proximité)")
+
+        durees['page 1'].append(mediane_ms(
+            lambda: engine.rechercher(requete, limit=args.taille_page, proximite=False),
+            args.repetitions))
+        durees[f'page {args.pages}'].append(mediane_ms(
+            lambda: engine.rechercher(requete, limit=args.taille_page, proximite=False,
+                                      apres=curseurs[-1]),
+            args.repetitions))
+        durees[f'top {profondeur} tronqué'].append(mediane_ms(
+            lambda: engine.rechercher(requete, limit=profondeur, proximite=False),
+            args.repetitions))
+    db.close()
+    temporaire.cleanup()
+
+    if differences:
+        print(f"❌ Pages différentes du classement complet pour: {', '.join(differences)}")
+        sys.exit(1)
+
+    print(f"\n⏱️  Médiane par requête ({len(REQUETES)} requêtes, pages de {args.taille_page}):")
+    for mode, valeurs in durees.items():
+        print(f"  - {mode:20s}: {statistics.median(valeurs):8.2f} ms")
+    print("✅ Pages identiques au classement complet")
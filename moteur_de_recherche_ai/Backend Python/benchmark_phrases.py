@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latence des requêtes de phrase et de proximité
+Compare, sur une base déjà indexée, les mêmes mots cherchés en sac de mots
+(classement par fréquences), avec bonus de proximité, puis en phrase exacte.
+Usage: python benchmark_phrases.py [base] [--repetitions N] [--facteur-max F]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from database_config import DatabaseConfig
+from search_engine import SearchEngine
+
+REQUETES = [
+    '"réseaux de neurones"',
+    '"apprentissage automatique"',
+    '"intelligence artificielle"',
+    '"machine learning"',
+    '"deep learning"',
+    '"descente de gradient"',
+    '"arbre de décision"',
+    '"réseau de neurones convolutif"',
+]
+
+# Mode -> (avec phrases, avec proximité)
+MODES = {
+    'mots': (False, False),
+    'proximite': (False, True),
+    'phrase': (True, True),
+}
+
+
+def preparer(engine, requete):
+    """Mots, racines, phrases et synonymes de la requête (comme SearchEngine.rechercher, sans correction)"""
+    _, mots, racines, synonymes, _ = engine._plan_requete(requete, corriger=False)
+    return mots, racines, engine.extraire_phrases(requete), synonymes
+
+
+def mesurer(engine, requetes, repetitions, limit=20):
+    """
+    Médiane (ms) par requête de chaque mode
+    Sans l'enregistrement des statistiques de recherche (écriture en base)
+    """
+    durees = {mode: [] for mode in MODES}
+    for requete in requetes:
+        for mode, (avec_phrases, proximite) in MODES.items():
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                mots, racines, phrases, synonymes = preparer(engine, requete)
+                engine._rechercher_contenus(mots, racines, 'all', limit,
+                                            phrases if avec_phrases else (), proximite,
+                                            synonymes=synonymes)
+                durees[mode].append((time.perf_counter() - debut) * 1000)
+    return {mode: statistics.median(valeurs) for mode, valeurs in durees.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latence des requêtes de phrase")
+    parser.add_argument('base', nargs='?', default='ai_search_engine.db')
+    parser.add_argument('--repetitions', type=int, default=20)
+    parser.add_argument('--facteur-max', type=float, default=3.0,
+                        help="Facteur toléré entre phrase et sac de mots")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base):
+        print(f"❌ Base introuvable: {args.base} (lancer d'abord l'indexation)")
+        sys.exit(1)
+
+    db = DatabaseConfig(args.base)
+    db.connect()
+    engine = SearchEngine(db)
+
+    # Une passe à vide: miroir des termes et cache SQLite chauds
+    mesurer(engine, REQUETES, 1)
+    medianes = mesurer(engine, REQUETES, args.repetitions)
+    db.close()
+
+    print(f"\n⏱️  Médiane par requête ({len(REQUETES)} requêtes × {args.repetitions}):")
+    for mode, duree in medianes.items():
+        print(f"  - {mode:10s}: {duree:8.2f} ms  (×{duree / medianes['mots']:.1f})")
+
+    facteur = medianes['phrase'] / medianes['mots']
+    if facteur > args.facteur_max:
+        print(f"❌ Phrases {facteur:.1f}× plus lentes que le sac de mots (max {args.facteur_max})")
+        sys.exit(1)
+    print(f"✅ Phrases à {facteur:.1f}× du sac de mots (max {args.facteur_max})")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Équivalence et performance du traitement de texte
+Compare TextProcessor à l'implémentation d'origine (TextProcessorReference)
+sur le corpus fourni: sorties identiques exigées, puis tokens/seconde.
+Usage: python benchmark_texte.py [dossier] [--repetitions N]
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from indexer import DocumentIndexer
+from text_processor import TextProcessor
+
+
+class TextProcessorReference:
+    """
+    Implémentation d'origine du pipeline (avant précompilation et mémo),
+    copie figée du TextProcessor d'origine: les sorties du TextProcessor
+    actuel sont comparées à elle
+    """
+
+    def __init__(self):
+        # Anti-dictionnaire (mots vides) en français et anglais
+        self.stop_words_fr = {
+            'le', 'la', 'les', 'un', 'une', 'des', 'de', 'du', 'et', 'ou', 'mais',
+            'donc', 'car', 'ni', 'est', 'sont', 'a', 'au', 'aux', 'ce', 'cette',
+            'ces', 'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses',
+            'notre', 'nos', 'votre', 'vos', 'leur', 'leurs', 'je', 'tu', 'il',
+            'elle', 'nous', 'vous', 'ils', 'elles', 'on', 'qui', 'que', 'quoi',
+            'dont', 'où', 'pour', 'par', 'dans', 'sur', 'avec', 'sans', 'sous',
+            'entre', 'vers', 'chez', 'être', 'avoir', 'faire', 'dire', 'aller',
+            'voir', 'savoir', 'pouvoir', 'falloir', 'vouloir', 'devoir', 'plus',
+            'moins', 'très', 'aussi', 'encore', 'déjà', 'ici', 'là', 'alors'
+        }
+
+        self.stop_words_en = {
+            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+            'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+            'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+            'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this',
+            'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
+            'what', 'which', 'who', 'when', 'where', 'why', 'how', 'all', 'each',
+            'every', 'both', 'few', 'more', 'most', 'other', 'some', 'such', 'no',
+            'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very'
+        }
+
+        self.stop_words = self.stop_words_fr.union(self.stop_words_en)
+
+        # Règles de racinisation simplifiées (stemming)
+        self.suffixes_fr = [
+            'ement', 'ation', 'ateur', 'atrice', 'ique', 'isme', 'able', 'ible',
+            'eux', 'euse', 'ance', 'ence', 'ité', 'age', 'ment', 'ant', 'ent',
+            'ais', 'ait', 'aient', 'era', 'erai', 'erais', 'erait', 'és', 'ées',
+            'er', 'ez', 'é', 'ée', 's', 'x'
+        ]
+
+        self.suffixes_en = [
+            'ing', 'ed', 'es', 's', 'er', 'est', 'ly', 'ness', 'ment', 
+            'tion', 'sion', 'ance', 'ence', 'able', 'ible', 'al', 'ful',
+            'less', 'ous', 'ive', 'ize', 'ise'
+        ]
+
+    def nettoyer_texte(self, texte):
+        """Nettoyer le texte: minuscules, suppression ponctuation"""
+        if not texte:
+            return ""
+
+        # Convertir en minuscules
+        texte = texte.lower()
+
+        # Remplacer les caractères spéciaux par des espaces
+        texte = re.sub(r'[^\w\sàâäéèêëïîôùûüÿæœç]', ' ', texte)
+
+        # Supprimer les espaces multiples
+        texte = re.sub(r'\s+', ' ', texte)
+
+        return texte.strip()
+
+    def tokeniser(self, texte):
+        """Diviser le texte en tokens (mots)"""
+        texte_propre = self.nettoyer_texte(texte)
+        tokens = texte_propre.split()
+        return tokens
+
+    def appliquer_anti_dictionnaire(self, tokens):
+        """Supprimer les mots vides (stop words)"""
+        return [token for token in tokens if token not in self.stop_words and len(token) > 2]
+
+    def raciniser(self, mot):
+        """
+        Racinisation (stemming): réduire un mot à sa racine
+        Algorithme simplifié inspiré de Porter
+        """
+        if len(mot) <= 3:
+            return mot
+
+        # Essayer les suffixes français
+        for suffixe in sorted(self.suffixes_fr, key=len, reverse=True):
+            if mot.endswith(suffixe) and len(mot) - len(suffixe) >= 3:
+                return mot[:-len(suffixe)]
+
+        # Essayer les suffixes anglais
+        for suffixe in sorted(self.suffixes_en, key=len, reverse=True):
+            if mot.endswith(suffixe) and len(mot) - len(suffixe) >= 3:
+                return mot[:-len(suffixe)]
+
+        return mot
+
+    def lemmatiser_simple(self, mot):
+        """
+        Lemmatisation simplifiée
+        (Pour une vraie lemmatisation, utiliser spaCy ou NLTK)
+        """
+        # Dictionnaire de lemmes courants pour l'IA/ML
+        lemmes = {
+            'algorithmes': 'algorithme',
+            'réseaux': 'réseau',
+            'neurones': 'neurone',
+            'données': 'donnée',
+            'modèles': 'modèle',
+            'apprentissage': 'apprendre',
+            'entraînement': 'entraîner',
+            'prédictions': 'prédiction',
+            'classifications': 'classification',
+            'optimisations': 'optimisation',
+            'networks': 'network',
+            'models': 'model',
+            'algorithms': 'algorithm',
+            'predictions': 'prediction',
+            'training': 'train',
+            'learning': 'learn'
+        }
+
+        return lemmes.get(mot, mot)
+
+    def extraire_mots_cles(self, texte, min_freq=1):
+        """
+        Pipeline complet d'extraction de mots-clés
+        1. Nettoyage
+        2. Tokenisation
+        3. Anti-dictionnaire
+        4. Lemmatisation
+        5. Racinisation
+        """
+        # Tokenisation
+        tokens = self.tokeniser(texte)
+
+        # Appliquer l'anti-dictionnaire
+        tokens_filtres = self.appliquer_anti_dictionnaire(tokens)
+
+        # Lemmatisation et racinisation
+        mots_cles = []
+        racines = []
+
+        for token in tokens_filtres:
+            lemme = self.lemmatiser_simple(token)
+            racine = self.raciniser(lemme)
+            mots_cles.append(token)
+            racines.append(racine)
+
+        # Calculer les fréquences
+        freq_mots = Counter(zip(mots_cles, racines))
+
+        # Filtrer par fréquence minimale
+        resultats = [
+            (mot, racine, freq) 
+            for (mot, racine), freq in freq_mots.items() 
+            if freq >= min_freq
+        ]
+
+        return sorted(resultats, key=lambda x: x[2], reverse=True)
+
+    def extraire_avec_positions(self, texte):
+        """
+        Extraire les mots-clés avec leurs positions dans le texte
+        CETTE MÉTHODE ÉTAIT MANQUANTE - C'EST LA CAUSE DE L'ERREUR
+        """
+        tokens = self.tokeniser(texte)
+        return self._filtrer_avec_positions(tokens)
+
+    def _filtrer_avec_positions(self, tokens, decalage=0):
+        """Filtrer, lemmatiser et raciniser des tokens en conservant leur position"""
+        tokens_filtres_avec_pos = []
+
+        for i, token in enumerate(tokens, decalage):
+            if token not in self.stop_words and len(token) > 2:
+                lemme = self.lemmatiser_simple(token)
+                racine = self.raciniser(lemme)
+                tokens_filtres_avec_pos.append({
+                    'mot': token,
+                    'racine': racine,
+                    'position': i
+                })
+
+        return tokens_filtres_avec_pos
+
+
+
+def charger_textes(dossier):
+    """Texte de chaque fichier du corpus (via le cache d'extraction)"""
+    indexer = DocumentIndexer(None)
+    textes = []
+    for chemin, categorie in indexer.lister_fichiers(dossier):
+        if categorie == 'docs':
+            texte = indexer.extraire_contenu(chemin)
+            if texte:
+                textes.append((chemin, texte))
+    return textes
+
+
+def verifier_equivalence(textes):
+    """Comparer les sorties des deux implémentations, texte par texte"""
+    reference = TextProcessorReference()
+    processor = TextProcessor()
+    ecarts = 0
+
+    for chemin, texte in textes:
+        for methode in ['nettoyer_texte', 'tokeniser', 'extraire_avec_positions', 'extraire_mots_cles']:
+            if getattr(reference, methode)(texte) != getattr(processor, methode)(texte):
+                print(f"❌ {methode} diffère pour {chemin}")
+                ecarts += 1
+
+    return ecarts
+
+
+def mesurer(processor, textes, repetitions):
+    """Tokens par seconde de extraire_avec_positions"""
+    nb_tokens = sum(len(processor.tokeniser(texte)) for _, texte in textes) * repetitions
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        for _, texte in textes:
+            processor.extraire_avec_positions(texte)
+    duree = time.perf_counter() - debut
+    return nb_tokens / duree if duree > 0 else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Équivalence et performance du traitement de texte")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    textes = charger_textes(args.dossier)
+    if not textes:
+        print(f"❌ Aucun texte extrait de {args.dossier}")
+        sys.exit(1)
+    print(f"📂 {len(textes)} documents, {sum(len(t) for _, t in textes)} caractères")
+
+    ecarts = verifier_equivalence(textes)
+    if ecarts:
+        print(f"❌ {ecarts} différence(s) avec l'implémentation d'origine")
+        sys.exit(1)
+    print("✅ Sorties identiques à l'implémentation d'origine")
+
+    avant = mesurer(TextProcessorReference(), textes, args.repetitions)
+    apres = mesurer(TextProcessor(), textes, args.repetitions)
+    print("\n⏱️  extraire_avec_positions:")
+    print(f"  - Avant: {avant:12.0f} tokens/s")
+    print(f"  - Après: {apres:12.0f} tokens/s  (×{apres / avant:.1f})")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Top-k BM25 avec élagage (MaxScore) contre notation exhaustive
+Génère un corpus synthétique (passages tirés des documents du corpus fourni),
+l'indexe, puis cherche des requêtes étendues par synonymes (synonymes.json)
+avec et sans élagage: résultats identiques exigés, puis latence médiane.
+Les résultats identiques sont aussi exigés après la réindexation d'un
+document changé (bornes de l'élagage mises à jour dans le même commit).
+Usage: python benchmark_topk.py [dossier] [--documents N] [--base chemin] [--repetitions N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+from search_engine import SearchEngine
+
+# Requêtes étendues à plusieurs synonymes de plusieurs mots
+REQUETES = ['ai', 'ml', 'ai&ml', 'nlp', 'cnn', 'rnn', 'neural',
+            'deep learning', 'data science', 'model']
+
+
+def generer_corpus(dossier_source, dossier_cible, nb_documents, graine=0):
+    """
+    Écrire nb_documents fichiers texte, chacun un passage de 100 à 1500 mots
+    pris au hasard dans un document du corpus source
+    """
+    indexer = DocumentIndexer(None)
+    textes = []
+    for chemin, categorie in indexer.lister_fichiers(dossier_source):
+        if categorie == 'docs':
+            mots = (indexer.extraire_contenu(chemin) or '').split()
+            if mots:
+                textes.append(mots)
+    if not textes:
+        return 0
+
+    aleatoire = random.Random(graine)
+    for numero in range(nb_documents):
+        mots = aleatoire.choice(textes)
+        longueur = aleatoire.randint(100, 1500)
+        debut = aleatoire.randint(0, max(len(mots) - longueur, 0))
+        with open(os.path.join(dossier_cible, f"doc_{numero:06d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(' '.join(mots[debut:debut + longueur]))
+    return nb_documents
+
+
+def rechercher(engine, requete, limit):
+    """Classement seul (sans proximité ni statistiques de recherche)"""
+    _, mots, racines, synonymes, _ = engine._plan_requete(requete, corriger=False)
+    return engine._rechercher_contenus(mots, racines, 'document', limit, proximite=False,
+                                       synonymes=synonymes)
+
+
+def mesurer(engine, requetes, repetitions, limit):
+    """Médiane (ms) par requête, et résultats (id, score) de chaque requête"""
+    durees, resultats = [], {}
+    for requete in requetes:
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            trouves = rechercher(engine, requete, limit)
+            durees.append((time.perf_counter() - debut) * 1000)
+        resultats[requete] = [(r['id'], r['score']) for r in trouves]
+    return statistics.median(durees), resultats
+
+
+def verifier_reindexation(dossier, limit=3):
+    """
+    Réindexer un document changé (retiré puis ajouté dans le même commit)
+    dans un petit corpus où ses nouvelles fréquences dépassent les bornes
+    de l'élagage: seule la mise à jour de ces bornes le garde dans le top-k
+
+    Returns:
+        True si les résultats avec et sans élagage sont identiques
+    """
+    dossier_corpus = os.path.join(dossier, 'reindexation')
+    os.makedirs(dossier_corpus)
+    fichiers = {f"chien_{i}.txt": 'chien ' + 'oiseau ' * 20 for i in range(5)}
+    fichiers.update({f"chat_{i}.txt": 'chat ' + 'poisson ' * 10 for i in range(5)})
+    fichiers['change.txt'] = 'chat ' + 'oiseau ' * 10
+    for nom, texte in fichiers.items():
+        with open(os.path.join(dossier_corpus, nom), 'w', encoding='utf-8') as f:
+            f.write(texte)
+
+    db = DatabaseConfig(os.path.join(dossier, 'benchmark_topk_reindexation.db'))
+    db.connect()
+    db.create_tables()
+    indexer = DocumentIndexer(db)
+    indexer.indexer_dossier(dossier_corpus)
+    chemin = os.path.join(dossier_corpus, 'change.txt')
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write('chat ' * 60)
+    indexer.indexer_fichier(chemin)
+
+    engine = SearchEngine(db)
+    classements = []
+    for elagage in (False, True):
+        engine.ELAGAGE_BM25 = elagage
+        classements.append([(r['id'], r['score']) for r in rechercher(engine, 'chien chat', limit)])
+    db.close()
+    return classements[0] == classements[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top-k BM25 avec élagage")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--documents', type=int, default=3000)
+    parser.add_argument('--base', default=None,
+                        help="Base du corpus synthétique (réutilisée si elle existe)")
+    parser.add_argument('--repetitions', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    temporaire = tempfile.TemporaryDirectory()
+    base = args.base or os.path.join(temporaire.name, 'benchmark_topk.db')
+    if not os.path.exists(base):
+        dossier_synthetique = os.path.join(temporaire.name, 'corpus')
+        os.makedirs(dossier_synthetique)
+        print(f"📝 Génération de {args.documents} documents depuis {args.dossier}...")
+        if not generer_corpus(args.dossier, dossier_synthetique, args.documents):
+            print(f"❌ Aucun document texte dans {args.dossier}")
+            sys.exit(1)
+        db = DatabaseConfig(base)
+        db.connect()
+        db.create_tables()
+        DocumentIndexer(db).indexer_dossier(dossier_synthetique, bulk=True)
+        db.close()
+
+    db = DatabaseConfig(base)
+    db.connect()
+    engine = SearchEngine(db)
+
+    medianes, resultats = {}, {}
+    for mode, elagage in [('exhaustif', False), ('elagage', True)]:
+        engine.ELAGAGE_BM25 = elagage
+        # Une passe à vide: miroir des termes et cache SQLite chauds
+        mesurer(engine, REQUETES, 1, args.limit)
+        medianes[mode], resultats[mode] = mesurer(engine, REQUETES, args.repetitions, args.limit)
+    db.close()
+
+    differences = [r for r in REQUETES if resultats['exhaustif'][r] != resultats['elagage'][r]]
+    if not verifier_reindexation(temporaire.name):
+        differences.append("chien chat (réindexation)")
+    temporaire.cleanup()
+    if differences:
+        print(f"❌ Résultats différents pour: {', '.join(differences)}")
+        sys.exit(1)
+
+    print(f"\n⏱️  Médiane par requête ({len(REQUETES)} requêtes × {args.repetitions}, top {args.limit}):")
+    for mode, duree in medianes.items():
+        print(f"  - {mode:10s}: {duree:8.2f} ms")
+    print(f"✅ Résultats identiques, élagage {medianes['exhaustif'] / medianes['elagage']:.1f}× plus rapide")
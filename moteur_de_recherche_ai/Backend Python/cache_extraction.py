@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache disque du texte extrait des fichiers du corpus
+Clé: empreinte du contenu du fichier + version de l'extracteur
+Usage: python cache_extraction.py [stats|lister|purger] [--taille-max OCTETS]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+
+# À incrémenter à chaque changement de lire_pdf / lire_docx / lire_html...
+# pour invalider les extractions déjà en cache
+VERSION_EXTRACTEUR = 1
+
+# Dossier par défaut: cache de l'utilisateur, hors de l'arborescence du code
+# et indépendant du dossier courant
+DOSSIER_DEFAUT = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                              'moteur_de_recherche_ai', 'extraction')
+
+
+class CacheExtraction:
+    """Cache des pages de texte extraites, indexé par empreinte de contenu"""
+
+    EXTENSION = '.jsonl.gz'
+
+    def __init__(self, dossier=DOSSIER_DEFAUT, taille_max=2 * 1024 ** 3):
+        self.dossier = os.path.abspath(dossier)
+        self.taille_max = taille_max
+        self.taille_estimee = None
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def _chemin_entree(self, empreinte):
+        return os.path.join(self.dossier, f"{empreinte}-v{VERSION_EXTRACTEUR}{self.EXTENSION}")
+
+    def lire(self, empreinte):
+        """
+        Pages en cache pour cette empreinte (générateur), ou None si absente
+        La date de l'entrée est mise à jour (éviction LRU)
+        """
+        chemin = self._chemin_entree(empreinte)
+        try:
+            os.utime(chemin)
+        except FileNotFoundError:
+            return None
+        return self._lire_pages(chemin)
+
+    def _lire_pages(self, chemin):
+        with gzip.open(chemin, 'rt', encoding='utf-8') as f:
+            for ligne in f:
+                yield json.loads(ligne)
+
+    def ecrire(self, empreinte, pages, reussie=None):
+        """
+        Enregistrer les pages au fil de leur lecture (générateur)
+        Les pages sont rendues telles quelles; l'entrée n'est publiée dans
+        le cache qu'une fois toutes les pages lues, et seulement si
+        reussie() est vrai à ce moment (extraction sans erreur): une erreur
+        de lecture passagère ou un fichier tronqué n'est pas mis en cache
+        """
+        chemin = self._chemin_entree(empreinte)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        complet = False
+
+        try:
+            with gzip.open(temporaire, 'wt', encoding='utf-8') as f:
+                for page in pages:
+                    f.write(json.dumps(page, ensure_ascii=False) + "\n")
+                    yield page
+            complet = reussie is None or reussie()
+        finally:
+            if complet:
+                os.replace(temporaire, chemin)
+                self._apres_ecriture(os.path.getsize(chemin))
+            elif os.path.exists(temporaire):
+                os.remove(temporaire)
+
+    def _apres_ecriture(self, taille):
+        if self.taille_estimee is None:
+            self.taille_estimee = self.stats()['taille_octets']
+        else:
+            self.taille_estimee += taille
+
+        if self.taille_estimee > self.taille_max:
+            self.evincer()
+
+    def _entrees(self):
+        """Entrées du cache: liste de (chemin, taille, date d'accès), plus anciennes d'abord"""
+        entrees = []
+        for entree in os.scandir(self.dossier):
+            if entree.name.endswith(self.EXTENSION):
+                try:
+                    stat = entree.stat()
+                except FileNotFoundError:
+                    continue
+                entrees.append((entree.path, stat.st_size, stat.st_mtime))
+        return sorted(entrees, key=lambda e: e[2])
+
+    def evincer(self, taille_max=None):
+        """
+        Supprimer les entrées les moins récemment utilisées jusqu'à
+        repasser sous la taille maximale
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        taille_max = self.taille_max if taille_max is None else taille_max
+        entrees = self._entrees()
+        taille = sum(e[1] for e in entrees)
+        nb_supprimees = 0
+
+        for chemin, taille_entree, _ in entrees:
+            if taille <= taille_max:
+                break
+            try:
+                os.remove(chemin)
+                nb_supprimees += 1
+            except FileNotFoundError:
+                pass
+            taille -= taille_entree
+
+        self.taille_estimee = taille
+        return nb_supprimees
+
+    def purger(self):
+        """Vider entièrement le cache"""
+        return self.evincer(taille_max=0)
+
+    def stats(self):
+        """Nombre d'entrées et taille totale du cache"""
+        entrees = self._entrees()
+        return {
+            'dossier': self.dossier,
+            'nb_entrees': len(entrees),
+            'taille_octets': sum(e[1] for e in entrees),
+            'taille_max_octets': self.taille_max,
+            'version_extracteur': VERSION_EXTRACTEUR
+        }
+
+    def lister(self):
+        """Lister les entrées: (nom, taille, date du dernier accès)"""
+        return [(os.path.basename(chemin), taille, date) for chemin, taille, date in self._entrees()]
+
+
+# Outil en ligne de commande
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache d'extraction de texte")
+    parser.add_argument('action', nargs='?', default='stats', choices=['stats', 'lister', 'purger'])
+    parser.add_argument('--dossier', default=DOSSIER_DEFAUT)
+    parser.add_argument('--taille-max', type=int, default=None,
+                        help="purger: réduire le cache à cette taille (octets) au lieu de le vider")
+    args = parser.parse_args()
+
+    cache = CacheExtraction(args.dossier)
+
+    if args.action == 'lister':
+        for nom, taille, date in cache.lister():
+            print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(date))}  "
+                  f"{taille / 1024:10.1f} Ko  {nom}")
+
+    elif args.action == 'purger':
+        if args.taille_max is not None:
+            nb = cache.evincer(args.taille_max)
+        else:
+            nb = cache.purger()
+        print(f"🗑️  {nb} entrée(s) supprimée(s)")
+
+    stats = cache.stats()
+    print("\n📊 Cache d'extraction:")
+    print(f"  - Dossier: {stats['dossier']}")
+    print(f"  - Entrées: {stats['nb_entrees']}")
+    print(f"  - Taille: {stats['taille_octets'] / 1024 ** 2:.1f} Mo "
+          f"(max {stats['taille_max_octets'] / 1024 ** 2:.0f} Mo)")
+    print(f"  - Version de l'extracteur: {stats['version_extracteur']}")
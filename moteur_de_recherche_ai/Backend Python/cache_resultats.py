@@ -0,0 +1,102 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheResultats:
+    """
+    Cache LRU des résultats de recherche (voir SearchEngine.rechercher)
+
+    Borné en nombre d'entrées et en taille (octets du JSON des résultats),
+    chaque entrée expirant après `duree_vie` secondes. Une entrée n'est
+    servie que pour la génération de l'index à laquelle elle a été calculée:
+    chaque commit de l'indexeur change la génération et l'invalide.
+    Partagé entre les threads du serveur (verrou). Les valeurs sont copiées
+    en profondeur à l'écriture et à la lecture: un appelant qui modifie
+    les résultats rendus n'altère pas l'entrée en cache.
+    """
+
+    def __init__(self, capacite=1000, taille_max=32 * 1024 * 1024, duree_vie=300):
+        self.capacite = capacite
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+
+        # clé -> (génération, expiration, taille, valeur), du moins au plus récemment lu
+        self.entrees = OrderedDict()
+        self.taille = 0
+        self.verrou = threading.Lock()
+
+        self.succes = 0
+        self.echecs = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def lire(self, cle, generation):
+        """Valeur en cache pour cette génération de l'index, ou None"""
+        with self.verrou:
+            entree = self.entrees.get(cle)
+            if entree is None:
+                self.echecs += 1
+                return None
+
+            generation_entree, expiration, _, valeur = entree
+            if generation_entree != generation or expiration < time.monotonic():
+                if generation_entree != generation:
+                    self.invalidations += 1
+                else:
+                    self.expirations += 1
+                self._retirer(cle)
+                self.echecs += 1
+                return None
+
+            self.entrees.move_to_end(cle)
+            self.succes += 1
+        return copy.deepcopy(valeur)
+
+    def ecrire(self, cle, generation, valeur):
+        """Mettre en cache une valeur (sérialisable en JSON) calculée à cette génération"""
+        taille = len(json.dumps(valeur, ensure_ascii=False, default=str).encode('utf-8'))
+        if taille > self.taille_max:
+            return
+        valeur = copy.deepcopy(valeur)
+
+        with self.verrou:
+            if cle in self.entrees:
+                self._retirer(cle)
+            self.entrees[cle] = (generation, time.monotonic() + self.duree_vie, taille, valeur)
+            self.taille += taille
+
+            # Éviction des entrées les moins récemment lues
+            while len(self.entrees) > self.capacite or self.taille > self.taille_max:
+                ancienne = next(iter(self.entrees))
+                self._retirer(ancienne)
+                self.evictions += 1
+
+    def _retirer(self, cle):
+        self.taille -= self.entrees.pop(cle)[2]
+
+    def vider(self):
+        with self.verrou:
+            self.entrees.clear()
+            self.taille = 0
+
+    def stats(self):
+        """Compteurs du cache (exposés par /api/statistiques)"""
+        with self.verrou:
+            lectures = self.succes + self.echecs
+            return {
+                'entrees': len(self.entrees),
+                'capacite': self.capacite,
+                'taille_octets': self.taille,
+                'taille_max_octets': self.taille_max,
+                'duree_vie_s': self.duree_vie,
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'taux_succes': round(self.succes / lectures, 3) if lectures else 0,
+                'invalidations': self.invalidations,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+            }
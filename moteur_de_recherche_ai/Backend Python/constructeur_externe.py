@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construction hors ligne de l'index par tri externe
+Pour les très gros corpus: les postings sont triés par lots en mémoire
+bornée, écrits en fichiers temporaires, puis fusionnés et chargés dans
+index_mots_cles en ordre de terme, en une seule passe.
+Usage: python constructeur_externe.py [dossier] [--memoire-max Mo] [--workers N]
+"""
+
+import argparse
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from itertools import groupby
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+from termes import DictionnaireTermes
+
+
+class ConstructeurIndexExterne(DocumentIndexer):
+    """
+    Indexeur dont les postings passent par un tri externe au lieu d'être
+    insérés directement dans le B-tree de index_mots_cles
+
+    1. Les contenus sont lus et leurs postings accumulés en mémoire jusqu'à
+       `memoire_max` octets, puis triés par (terme, contenu) et écrits dans
+       un fichier temporaire (un « run »)
+    2. À la fin, les runs sont fusionnés (k-way merge) et les postings sont
+       chargés en ordre de terme, index désactivés, puis les index sont
+       reconstruits en une passe
+    """
+
+    # Nombre d'enregistrements par bloc sérialisé dans un run
+    TAILLE_BLOC = 2000
+
+    # Coût mémoire estimé d'un enregistrement hors blob (octets)
+    COUT_ENREGISTREMENT = 200
+
+    def __init__(self, db_config, memoire_max=256 * 1024 ** 2, dossier_temp=None, **kwargs):
+        super().__init__(db_config, **kwargs)
+        self.memoire_max = memoire_max
+        self.dossier_temp_parent = dossier_temp
+        self.dossier_temp = None
+        self.tampon = []
+        self.taille_tampon = 0
+        self.runs = []
+        self.sequence = 0
+
+    # --- Phase 1: accumulation et écriture des runs triés ---
+
+    def _inserer_postings(self, colonne_id, contenu_id, postings):
+        """Ajouter les postings d'un contenu au tampon de tri (au lieu de la base)"""
+        self._ajouter_au_tampon(colonne_id, contenu_id, postings)
+        self.nb_postings += len(postings)
+        return len(postings)
+
+    def _fusionner_postings(self, colonne_id, contenu_id, postings):
+        """Postings partiels d'un PDF en flux: fusionnés lors du k-way merge"""
+        self._ajouter_au_tampon(colonne_id, contenu_id, postings)
+
+    def _ajouter_au_tampon(self, colonne_id, contenu_id, postings):
+        for terme_id, racine_id, freq, positions in self._postings_ids(postings):
+            # La séquence conserve l'ordre d'émission: les blobs partiels d'un
+            # même (terme, contenu) se concatènent dans le bon ordre
+            self.tampon.append((terme_id, colonne_id, contenu_id, self.sequence,
+                                racine_id, freq, positions))
+            self.sequence += 1
+            self.taille_tampon += self.COUT_ENREGISTREMENT + len(positions)
+
+        if self.taille_tampon >= self.memoire_max:
+            self._ecrire_run()
+
+    def _ecrire_run(self):
+        """Trier le tampon et l'écrire dans un nouveau fichier temporaire"""
+        if not self.tampon:
+            return
+
+        self.tampon.sort()
+        chemin = os.path.join(self.dossier_temp, f"run_{len(self.runs):05d}.bin")
+        with open(chemin, 'wb') as f:
+            for i in range(0, len(self.tampon), self.TAILLE_BLOC):
+                pickle.dump(self.tampon[i:i + self.TAILLE_BLOC], f, pickle.HIGHEST_PROTOCOL)
+
+        print(f"💾 Run {len(self.runs) + 1}: {len(self.tampon)} postings triés")
+        self.runs.append(chemin)
+        self.tampon = []
+        self.taille_tampon = 0
+
+    # --- Phase 2: fusion des runs et chargement en ordre de terme ---
+
+    @staticmethod
+    def _lire_run(chemin):
+        with open(chemin, 'rb') as f:
+            while True:
+                try:
+                    bloc = pickle.load(f)
+                except EOFError:
+                    return
+                yield from bloc
+
+    def _fusionner_runs(self, taille_lot=10000):
+        """K-way merge des runs et insertion des postings en ordre de terme"""
+        flux = heapq.merge(*(self._lire_run(chemin) for chemin in self.runs))
+        colonnes = {'doc_id': 0, 'img_id': 1, 'video_id': 2}
+
+        lot = []
+        nb_lignes = 0
+        for (terme_id, colonne_id, contenu_id), parties in groupby(flux, key=lambda e: e[:3]):
+            parties = list(parties)
+            ids = [None, None, None]
+            ids[colonnes[colonne_id]] = contenu_id
+
+            lot.append((terme_id, parties[0][4], *ids,
+                        sum(p[5] for p in parties),
+                        b''.join(p[6] for p in parties)))
+
+            if len(lot) >= taille_lot:
+                self._inserer_lot(lot)
+                nb_lignes += len(lot)
+                lot = []
+
+        if lot:
+            self._inserer_lot(lot)
+            nb_lignes += len(lot)
+        return nb_lignes
+
+    def _inserer_lot(self, lot):
+        self.db.cursor.executemany('''
+            INSERT INTO index_mots_cles
+            (terme_id, racine_id, doc_id, img_id, video_id, frequence, positions)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', lot)
+
+    # --- Cycle du chargement en masse ---
+
+    def debut_chargement_bulk(self, taille_transaction=None):
+        self.dossier_temp = tempfile.mkdtemp(prefix='index_runs_', dir=self.dossier_temp_parent)
+        self.tampon = []
+        self.taille_tampon = 0
+        self.runs = []
+        self.sequence = 0
+
+        super().debut_chargement_bulk(taille_transaction)
+        self.db.supprimer_index_contenus()
+        self.db.conn.commit()
+
+    def fin_chargement_bulk(self):
+        try:
+            self._ecrire_run()
+            debut = time.time()
+            print(f"🔀 Fusion de {len(self.runs)} run(s)...")
+            nb_lignes = self._fusionner_runs()
+            print(f"✓ {nb_lignes} postings chargés en {time.time() - debut:.1f} s")
+        finally:
+            shutil.rmtree(self.dossier_temp, ignore_errors=True)
+
+        self.db.creer_index_contenus()
+        super().fin_chargement_bulk()
+
+    def construire(self, dossier_corpus, workers=1, taille_file=None, reinitialiser=True):
+        """
+        Construire l'index complet d'un corpus
+
+        Args:
+            reinitialiser: Vider l'index et les contenus existants avant la construction
+                           (dictionnaire des termes et index des fautes de frappe compris)
+        """
+        if reinitialiser:
+            for table in ['index_mots_cles', 'documents', 'images', 'videos', 'manifeste_fichiers',
+                          'longueurs_contenus', 'frequences_racines', 'ancres_documents',
+                          'morceaux_contenus', 'suppressions_formes', 'formes_correction', 'termes']:
+                self.db.cursor.execute(f'DELETE FROM {table}')
+            # La génération de l'index est conservée (et changée), pas remise à zéro
+            self.db.cursor.execute("DELETE FROM statistiques_corpus WHERE cle != 'generation'")
+            self.statistiques.incrementer_generation()
+            self.db.conn.commit()
+            DictionnaireTermes.oublier(self.db.db_path)
+            self._termes = None
+
+        compteurs = self.indexer_dossier(dossier_corpus, bulk=True, workers=workers,
+                                         taille_file=taille_file)
+        compteurs['rss_max_mo'] = rss_max_mo()
+        if compteurs['rss_max_mo']:
+            print(f"  🧠 Mémoire maximale (RSS): {compteurs['rss_max_mo']:.0f} Mo")
+        return compteurs
+
+
+def rss_max_mo():
+    """Pic de mémoire résidente du processus en Mo (None si indisponible)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construction de l'index par tri externe")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--memoire-max', type=int, default=256,
+                        help="Mémoire maximale du tampon de tri (Mo)")
+    parser.add_argument('--dossier-temp', default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    db = DatabaseConfig()
+    db.connect()
+    db.create_tables()
+
+    constructeur = ConstructeurIndexExterne(db, memoire_max=args.memoire_max * 1024 ** 2,
+                                            dossier_temp=args.dossier_temp)
+    constructeur.construire(args.dossier, workers=args.workers)
+
+    db.close()
@@ -0,0 +1,220 @@
+import hashlib
+from text_processor import plier
+
+# Distance d'édition maximale couverte par l'index des suppressions
+DISTANCE_MAX = 2
+
+# Les suppressions ne portent que sur le préfixe et le suffixe de cette
+# longueur: au-delà, le nombre de clés par forme ne croît plus avec sa longueur
+LONGUEUR_EXTREMITE = 7
+
+
+def distance_autorisee(mot):
+    """Distance d'édition tolérée pour un mot de la requête, selon sa longueur"""
+    if len(mot) < 3:
+        return 0
+    return 1 if len(mot) <= 4 else DISTANCE_MAX
+
+
+def suppressions(texte, distance=DISTANCE_MAX):
+    """
+    Chaînes obtenues en supprimant jusqu'à `distance` caractères du texte
+    (le texte lui-même compris)
+
+    Returns:
+        Dict chaîne -> plus petit nombre de caractères supprimés
+    """
+    niveau = {texte}
+    resultat = {texte: 0}
+    for nb_suppressions in range(1, distance + 1):
+        niveau = {chaine[:i] + chaine[i + 1:] for chaine in niveau for i in range(len(chaine))}
+        for chaine in niveau:
+            resultat.setdefault(chaine, nb_suppressions)
+    return resultat
+
+
+def cles_suppressions(texte, cote, distance=DISTANCE_MAX):
+    """
+    Clés entières (8 octets signés) des suppressions d'une extrémité d'une
+    forme, dans l'espace de clés de son côté (b'debut' ou b'fin')
+
+    Returns:
+        Dict clé -> plus petit nombre de caractères supprimés
+    """
+    return {int.from_bytes(hashlib.blake2b(chaine.encode('utf-8'), digest_size=8,
+                                           person=cote).digest(), 'little', signed=True): nb
+            for chaine, nb in suppressions(texte, distance).items()}
+
+
+def distance_edition(a, b, maximum):
+    """
+    Distance de Damerau-Levenshtein restreinte (transpositions de deux
+    caractères voisins), maximum + 1 dès qu'elle dépasse maximum
+    """
+    # Préfixe et suffixe communs retirés: une faute n'en touche qu'une partie
+    debut = 0
+    while debut < len(a) and debut < len(b) and a[debut] == b[debut]:
+        debut += 1
+    fin_a, fin_b = len(a), len(b)
+    while fin_a > debut and fin_b > debut and a[fin_a - 1] == b[fin_b - 1]:
+        fin_a -= 1
+        fin_b -= 1
+    a, b = a[debut:fin_a], b[debut:fin_b]
+
+    if abs(len(a) - len(b)) > maximum:
+        return maximum + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Algorithme bit-parallèle de Hyyrö: une colonne de la matrice des
+    # distances par caractère de b, codée en vecteurs de différences
+    masques = {}
+    for i, caractere in enumerate(a):
+        masques[caractere] = masques.get(caractere, 0) | (1 << i)
+    plein = (1 << len(a)) - 1
+    dernier = 1 << (len(a) - 1)
+    vp, vn, d0, pm_precedent = plein, 0, 0, 0
+    distance = len(a)
+    for caractere in b:
+        pm = masques.get(caractere, 0)
+        transposition = (((~d0) & pm) << 1) & pm_precedent
+        d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | transposition) & plein
+        hp = vn | ~(d0 | vp) & plein
+        hn = d0 & vp
+        if hp & dernier:
+            distance += 1
+        elif hn & dernier:
+            distance -= 1
+        hp = ((hp << 1) | 1) & plein
+        hn = (hn << 1) & plein
+        vp = hn | ~(d0 | hp) & plein
+        vn = hp & d0
+        pm_precedent = pm
+    return min(distance, maximum + 1)
+
+
+class IndexCorrection:
+    """
+    Index des fautes de frappe (suppressions symétriques)
+
+    Chaque forme pliée des mots indexés (table formes_correction) est
+    enregistrée sous les clés des chaînes obtenues en supprimant jusqu'à
+    DISTANCE_MAX caractères de son préfixe et de son suffixe (table
+    suppressions_formes). Deux mots à distance d'au plus d ont des préfixes
+    qui partagent une chaîne obtenue par au plus d suppressions de chaque
+    côté, et de même pour leurs suffixes: une recherche lit les formes
+    associées aux clés du préfixe du mot et, au-delà de LONGUEUR_EXTREMITE
+    caractères, à celles de son suffixe aussi, en une seule requête, puis
+    vérifie la distance exacte de chaque candidate.
+
+    Côté écriture, les mots des postings sont cumulés en mémoire et seules
+    les formes nouvelles sont écrites au commit de l'indexeur (voir ecrire).
+    Les formes de contenus supprimés restent dans l'index: les candidates
+    sans occurrence sont écartées à la recherche (SearchEngine)
+    """
+
+    def __init__(self, db_config):
+        self.db = db_config
+        self.mots_en_attente = set()
+
+    # --- Écriture (indexeur) ---
+
+    def ajouter(self, mots):
+        """Mots de surface d'un contenu indexé (formes écrites au prochain commit)"""
+        self.mots_en_attente.update(mots)
+
+    def ecrire(self, taille_lot=500):
+        """
+        Enregistrer les formes nouvelles et leurs suppressions (dans la
+        transaction courante)
+
+        Returns:
+            Nombre de formes ajoutées
+        """
+        formes = sorted({plier(mot) for mot in self.mots_en_attente})
+        self.mots_en_attente.clear()
+
+        nouvelles = []
+        for i in range(0, len(formes), taille_lot):
+            lot = formes[i:i + taille_lot]
+            self.db.cursor.execute(f'''
+                SELECT forme FROM formes_correction
+                WHERE forme IN ({','.join(['?'] * len(lot))})
+            ''', lot)
+            existantes = {row[0] for row in self.db.cursor.fetchall()}
+            nouvelles.extend(forme for forme in lot if forme not in existantes)
+
+        lignes = []
+        for forme in nouvelles:
+            self.db.cursor.execute('''
+                INSERT INTO formes_correction (forme, longueur) VALUES (?, ?)
+            ''', (forme, len(forme)))
+            forme_id = self.db.cursor.lastrowid
+            cles = cles_suppressions(forme[:LONGUEUR_EXTREMITE], b'debut')
+            if len(forme) > LONGUEUR_EXTREMITE:
+                cles.update(cles_suppressions(forme[-LONGUEUR_EXTREMITE:], b'fin'))
+            lignes.extend((cle, len(forme), forme_id, nb_suppressions)
+                          for cle, nb_suppressions in cles.items())
+        self.db.cursor.executemany('''
+            INSERT OR IGNORE INTO suppressions_formes (cle, longueur, forme_id, nb_suppressions)
+            VALUES (?, ?, ?, ?)
+        ''', lignes)
+        return len(nouvelles)
+
+    # --- Lecture (moteur de recherche) ---
+
+    def candidats(self, mot, distance=None):
+        """
+        Formes indexées à distance d'édition d'au plus `distance` du mot
+        (par défaut distance_autorisee), le mot lui-même exclu
+
+        Returns:
+            Liste de (distance, forme), par distance puis forme
+        """
+        forme = plier(mot)
+        distance = distance_autorisee(forme) if distance is None else distance
+        if distance <= 0:
+            return []
+
+        # Candidates par les clés du préfixe, filtrées par celles du suffixe
+        # si elles sont plus longues que LONGUEUR_EXTREMITE (seules à en avoir)
+        debut = list(cles_suppressions(forme[:LONGUEUR_EXTREMITE], b'debut', distance))
+        longueurs = [len(forme) - distance, len(forme) + distance, distance]
+        filtre_fin, parametres_fin = '', []
+        if len(forme) + distance > LONGUEUR_EXTREMITE:
+            fin = list(cles_suppressions(forme[-LONGUEUR_EXTREMITE:], b'fin', distance))
+            filtre_fin = f'''
+                  AND (longueur <= {LONGUEUR_EXTREMITE} OR forme_id IN (
+                      SELECT forme_id FROM suppressions_formes
+                      WHERE cle IN ({','.join(['?'] * len(fin))})
+                        AND longueur BETWEEN ? AND ? AND nb_suppressions <= ?
+                  ))'''
+            parametres_fin = fin + longueurs
+        self.db.cursor.execute(f'''
+            SELECT forme FROM formes_correction WHERE id IN (
+                SELECT forme_id FROM suppressions_formes
+                WHERE cle IN ({','.join(['?'] * len(debut))})
+                  AND longueur BETWEEN ? AND ? AND nb_suppressions <= ?{filtre_fin}
+            )
+        ''', debut + longueurs + parametres_fin)
+
+        resultat = []
+        for (candidate,) in self.db.cursor.fetchall():
+            if candidate != forme:
+                d = distance_edition(forme, candidate, distance)
+                if d <= distance:
+                    resultat.append((d, candidate))
+        return sorted(resultat)
+
+    def plus_proches(self, mot):
+        """
+        Formes indexées les plus proches du mot, par distance croissante:
+        générateur de (distance, formes), une requête par distance jusqu'à
+        distance_autorisee. Les suppressions d'une distance supérieure,
+        bien plus nombreuses, ne sont lues que si l'appelant poursuit
+        """
+        forme = plier(mot)
+        for distance in range(1, distance_autorisee(forme) + 1):
+            formes = [candidate for d, candidate in self.candidats(forme, distance) if d == distance]
+            if formes:
+                yield distance, formes
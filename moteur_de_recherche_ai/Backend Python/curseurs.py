@@ -0,0 +1,25 @@
+import base64
+import json
+
+
+def encoder_curseur(valeur):
+    """
+    Curseur de pagination opaque: valeur JSON (clé du dernier résultat
+    rendu) encodée en base64 sans remplissage, utilisable dans une URL
+    """
+    texte = json.dumps(valeur, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texte.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decoder_curseur(curseur):
+    """
+    Valeur JSON d'un curseur rendu par encoder_curseur
+
+    Raises:
+        ValueError: Curseur mal formé
+    """
+    try:
+        texte = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        return json.loads(texte.decode('utf-8'))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Curseur invalide: {curseur!r}") from e
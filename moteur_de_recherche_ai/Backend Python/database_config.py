@@ -1,9 +1,34 @@
 import sqlite3
 import os
+from contextlib import contextmanager
+from itertools import groupby
+from correction import IndexCorrection
+from extraits import PAS_ANCRES, ancres_texte
+from postings import encoder_positions
+from termes import DictionnaireTermes
+from text_processor import plier
 
 class DatabaseConfig:
     """Configuration et initialisation de la base de données SQLite"""
     
+    # Index secondaires de index_mots_cles (nom -> colonnes)
+    # idx_racine_contenu couvre le classement BM25: les fréquences d'une racine
+    # sont lues dans l'index seul, par contenu croissant (voir SearchEngine._top_bm25)
+    INDEX_SECONDAIRES = {
+        'idx_terme_id': 'terme_id',
+        'idx_racine_contenu': 'racine_id, doc_id, img_id, video_id, frequence'
+    }
+    
+    # Index uniques par contenu (colonne id -> nom de l'index): un posting par
+    # terme et par contenu. Servent à la suppression d'un fichier déjà indexé
+    # et à la fusion des postings d'un PDF indexé page par page (UPSERT).
+    # Conservés pendant un chargement en masse: insertions en ordre croissant
+    INDEX_CONTENUS = {
+        'doc_id': 'idx_postings_doc',
+        'img_id': 'idx_postings_img',
+        'video_id': 'idx_postings_video'
+    }
+    
     def __init__(self, db_name="ai_search_engine.db"):
     # Utiliser le dossier courant (là où on lance le script)
         self.db_path = os.path.abspath(db_name)
@@ -64,54 +89,459 @@ class DatabaseConfig:
             )
         ''')
         
-        # Table d'index des mots-clés
+        # Dictionnaire des termes: un identifiant entier par mot et par racine,
+        # et sa forme pliée (sans accents ni majuscules) pour les requêtes
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS termes (
+                id INTEGER PRIMARY KEY,
+                texte TEXT NOT NULL UNIQUE,
+                forme_pliee TEXT
+            )
+        ''')
+        
+        # Migrer les anciens formats d'index si nécessaire
+        self.migrer_index_agrege()
+        self.migrer_dictionnaire_termes()
+        self.migrer_formes_pliees()
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_termes_pliee ON termes(forme_pliee)')
+        
+        # Table d'index des mots-clés: une ligne par (terme, contenu)
+        self._creer_table_index()
+        
+        # Index pour améliorer les performances de recherche
+        # (idx_racine_id: ancien index, remplacé par idx_racine_contenu)
+        self.cursor.execute('DROP INDEX IF EXISTS idx_racine_id')
+        self.creer_index_secondaires()
+        self.creer_index_contenus()
+        
+        # Table des statistiques de recherche
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS statistiques_recherche (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                requete TEXT NOT NULL,
+                nb_resultats INTEGER,
+                date_recherche TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                temps_execution_ms REAL
+            )
+        ''')
+        
+        # Manifeste des fichiers indexés (réindexation incrémentale)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS manifeste_fichiers (
+                chemin TEXT PRIMARY KEY,
+                taille INTEGER,
+                mtime REAL,
+                empreinte TEXT,
+                categorie TEXT,
+                date_indexation TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Statistiques de classement BM25 (voir statistiques.py)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS longueurs_contenus (
+                colonne TEXT NOT NULL,
+                contenu_id INTEGER NOT NULL,
+                longueur INTEGER NOT NULL,
+                PRIMARY KEY (colonne, contenu_id)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS frequences_racines (
+                racine_id INTEGER PRIMARY KEY,
+                nb_contenus INTEGER NOT NULL,
+                frequence_max INTEGER NOT NULL DEFAULT 0,
+                ratio_max REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS statistiques_corpus (
+                cle TEXT PRIMARY KEY,
+                valeur INTEGER NOT NULL
+            )
+        ''')
+        self.migrer_statistiques_bm25()
+        
+        # Ancres des extraits: décalage en caractères d'un token sur PAS_ANCRES
+        # de chaque document (voir extraits.py)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ancres_documents (
+                doc_id INTEGER PRIMARY KEY,
+                pas INTEGER NOT NULL,
+                ancres BLOB NOT NULL
+            )
+        ''')
+        self.migrer_ancres_extraits()
+        
+        # Texte d'un PDF indexé en flux, par morceau, jusqu'à son assemblage
+        # dans documents.contenu (voir DocumentIndexer.indexer_pdf_flux)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS morceaux_contenus (
+                doc_id INTEGER NOT NULL,
+                numero INTEGER NOT NULL,
+                texte TEXT NOT NULL,
+                PRIMARY KEY (doc_id, numero)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Index des fautes de frappe: formes pliées des mots indexés et clés
+        # de leurs suppressions (voir correction.py)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS formes_correction (
+                id INTEGER PRIMARY KEY,
+                forme TEXT NOT NULL UNIQUE,
+                longueur INTEGER NOT NULL
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS suppressions_formes (
+                cle INTEGER NOT NULL,
+                longueur INTEGER NOT NULL,
+                forme_id INTEGER NOT NULL,
+                nb_suppressions INTEGER NOT NULL,
+                PRIMARY KEY (cle, longueur, forme_id)
+            ) WITHOUT ROWID
+        ''')
+        self.migrer_index_correction()
+        
+        self.conn.commit()
+        print("✓ Tables créées avec succès")
+    
+    def _creer_table_index(self):
+        """
+        Créer la table d'index des mots-clés
+        - terme_id, racine_id: identifiants dans la table termes
+        - frequence: nombre d'occurrences du terme dans le contenu
+        - positions: positions des occurrences (blob, voir postings.py)
+        """
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS index_mots_cles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                mot_cle TEXT NOT NULL,
-                racine TEXT NOT NULL,
+                terme_id INTEGER NOT NULL,
+                racine_id INTEGER NOT NULL,
                 doc_id INTEGER,
                 img_id INTEGER,
                 video_id INTEGER,
                 frequence INTEGER DEFAULT 1,
-                position_texte INTEGER,
+                positions BLOB,
+                FOREIGN KEY (terme_id) REFERENCES termes(id),
+                FOREIGN KEY (racine_id) REFERENCES termes(id),
                 FOREIGN KEY (doc_id) REFERENCES documents(id) ON DELETE CASCADE,
                 FOREIGN KEY (img_id) REFERENCES images(id) ON DELETE CASCADE,
                 FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
             )
         ''')
+    
+    def colonnes_table(self, table):
+        """Lister les colonnes d'une table (vide si la table n'existe pas)"""
+        self.cursor.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in self.cursor.fetchall()]
+    
+    def migrer_index_agrege(self, taille_lot=10000):
+        """
+        Migrer index_mots_cles de l'ancien format (une ligne par occurrence,
+        colonne position_texte) vers le format agrégé (une ligne par terme
+        et par contenu, avec fréquence et positions compactées)
         
-        # Index pour améliorer les performances de recherche
+        La migration est une seule transaction (voir _migration). Une table
+        index_mots_cles_v1 restante (migration interrompue d'une version
+        précédente) est reprise: la table agrégée partielle est recréée
+        
+        Returns:
+            True si une migration a été effectuée
+        """
+        reprise = bool(self.colonnes_table('index_mots_cles_v1'))
+        if not reprise and 'position_texte' not in self.colonnes_table('index_mots_cles'):
+            return False
+        
+        print("🔄 Migration de l'index vers le format agrégé...")
+        with self._migration():
+            if reprise:
+                self.cursor.execute('DROP TABLE IF EXISTS index_mots_cles')
+            else:
+                self.cursor.execute('ALTER TABLE index_mots_cles RENAME TO index_mots_cles_v1')
+            self._supprimer_index_table('index_mots_cles_v1')
+            self._creer_table_index()
+            self._remplir_termes('index_mots_cles_v1')
+            
+            lecture = self.conn.cursor()
+            lecture.execute('''
+                SELECT m.id, r.id, v.doc_id, v.img_id, v.video_id, v.position_texte
+                FROM index_mots_cles_v1 v
+                JOIN termes m ON m.texte = v.mot_cle
+                JOIN termes r ON r.texte = v.racine
+                ORDER BY v.doc_id, v.img_id, v.video_id, m.id, r.id, v.position_texte
+            ''')
+            
+            lot = []
+            nb_lignes = 0
+            for cle, lignes in groupby(lecture, key=lambda row: row[:5]):
+                positions = [row[5] for row in lignes if row[5] is not None]
+                lot.append(cle + (max(len(positions), 1), encoder_positions(positions)))
+                
+                if len(lot) >= taille_lot:
+                    self._inserer_lot_migration(lot)
+                    nb_lignes += len(lot)
+                    lot = []
+            
+            if lot:
+                self._inserer_lot_migration(lot)
+                nb_lignes += len(lot)
+            
+            self.cursor.execute('DROP TABLE index_mots_cles_v1')
+            self.creer_index_secondaires()
+        
+        # Récupérer l'espace libéré par l'ancienne table
+        self.cursor.execute('VACUUM')
+        print(f"✓ Migration terminée: {nb_lignes} postings agrégés")
+        return True
+    
+    @contextmanager
+    def _migration(self):
+        """
+        Transaction explicite d'une migration de table: sqlite3 valide
+        chaque ALTER/CREATE/DROP hors transaction, une migration interrompue
+        laisserait la table renommée sans sa copie complète
+        """
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+    
+    def _inserer_lot_migration(self, lot):
+        """Insérer un lot de postings agrégés pendant la migration"""
+        self.cursor.executemany('''
+            INSERT INTO index_mots_cles 
+            (terme_id, racine_id, doc_id, img_id, video_id, frequence, positions)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', lot)
+    
+    def migrer_dictionnaire_termes(self):
+        """
+        Migrer index_mots_cles du format agrégé à chaînes (colonnes mot_cle
+        et racine en TEXT) vers les identifiants du dictionnaire des termes
+        
+        Returns:
+            True si une migration a été effectuée
+        """
+        if 'mot_cle' not in self.colonnes_table('index_mots_cles'):
+            return False
+        
+        print("🔄 Migration de l'index vers le dictionnaire des termes...")
+        with self._migration():
+            self.cursor.execute('ALTER TABLE index_mots_cles RENAME TO index_mots_cles_v2')
+            self._supprimer_index_table('index_mots_cles_v2')
+            self._creer_table_index()
+            self._remplir_termes('index_mots_cles_v2')
+            
+            self.cursor.execute('''
+                INSERT INTO index_mots_cles 
+                (id, terme_id, racine_id, doc_id, img_id, video_id, frequence, positions)
+                SELECT v.id, m.id, r.id, v.doc_id, v.img_id, v.video_id, v.frequence, v.positions
+                FROM index_mots_cles_v2 v
+                JOIN termes m ON m.texte = v.mot_cle
+                JOIN termes r ON r.texte = v.racine
+                ORDER BY v.id
+            ''')
+            nb_lignes = self.cursor.rowcount
+            
+            self.cursor.execute('DROP TABLE index_mots_cles_v2')
+            self.creer_index_secondaires()
+        
+        self.cursor.execute('VACUUM')
+        print(f"✓ Migration terminée: {nb_lignes} postings convertis")
+        return True
+    
+    def migrer_formes_pliees(self):
+        """
+        Ajouter la colonne forme_pliee à un dictionnaire existant et calculer
+        la forme pliée des termes qui n'en ont pas encore
+        
+        Returns:
+            Nombre de termes complétés
+        """
+        if 'forme_pliee' not in self.colonnes_table('termes'):
+            print("🔄 Ajout des formes pliées au dictionnaire des termes...")
+            self.cursor.execute('ALTER TABLE termes ADD COLUMN forme_pliee TEXT')
+        
+        # Pliage calculé en Python (unicodedata), appelé depuis SQLite
+        self.conn.create_function('plier', 1, plier, deterministic=True)
+        self.cursor.execute('UPDATE termes SET forme_pliee = plier(texte) WHERE forme_pliee IS NULL')
+        return self.cursor.rowcount
+    
+    def migrer_statistiques_bm25(self):
+        """
+        Calculer les statistiques BM25 d'un index construit avant leur
+        introduction (ensuite tenues à jour par l'indexeur)
+        
+        Returns:
+            True si les statistiques ont été calculées
+        """
+        self.cursor.execute('SELECT 1 FROM index_mots_cles LIMIT 1')
+        index_rempli = self.cursor.fetchone() is not None
+        
+        self.cursor.execute("SELECT 1 FROM statistiques_corpus WHERE cle = 'nb_contenus'")
+        if self.cursor.fetchone():
+            if 'frequence_max' in self.colonnes_table('frequences_racines'):
+                return False
+            # Bornes des fréquences ajoutées après coup: recalculées depuis l'index
+            # (restent à 0, sans élagage, pour un index segmenté)
+            self.cursor.execute('ALTER TABLE frequences_racines ADD COLUMN frequence_max INTEGER NOT NULL DEFAULT 0')
+            self.cursor.execute('ALTER TABLE frequences_racines ADD COLUMN ratio_max REAL NOT NULL DEFAULT 0')
+            if not index_rempli:
+                return False
+        
+        if index_rempli:
+            print("🔄 Calcul des statistiques BM25 de l'index existant...")
+        
+        for colonne in self.INDEX_CONTENUS:
+            self.cursor.execute(f'''
+                INSERT OR REPLACE INTO longueurs_contenus (colonne, contenu_id, longueur)
+                SELECT '{colonne}', {colonne}, SUM(frequence) FROM index_mots_cles
+                WHERE {colonne} IS NOT NULL
+                GROUP BY {colonne}
+            ''')
+        self.cursor.execute('DELETE FROM frequences_racines')
         self.cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_mot_cle 
-            ON index_mots_cles(mot_cle)
+            INSERT INTO frequences_racines (racine_id, nb_contenus, frequence_max, ratio_max)
+            SELECT p.racine_id, COUNT(*), MAX(p.frequence), MAX(CAST(p.frequence AS REAL) / l.longueur)
+            FROM (
+                SELECT racine_id, SUM(frequence) AS frequence,
+                       CASE WHEN doc_id IS NOT NULL THEN 'doc_id'
+                            WHEN img_id IS NOT NULL THEN 'img_id'
+                            ELSE 'video_id' END AS colonne,
+                       COALESCE(doc_id, img_id, video_id) AS contenu_id
+                FROM index_mots_cles
+                GROUP BY racine_id, doc_id, img_id, video_id
+            ) p
+            JOIN longueurs_contenus l ON l.colonne = p.colonne AND l.contenu_id = p.contenu_id
+            GROUP BY p.racine_id
         ''')
-        
         self.cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_racine 
-            ON index_mots_cles(racine)
+            INSERT OR REPLACE INTO statistiques_corpus (cle, valeur)
+            SELECT 'nb_contenus', COUNT(*) FROM longueurs_contenus
+            UNION ALL
+            SELECT 'somme_longueurs', COALESCE(SUM(longueur), 0) FROM longueurs_contenus
         ''')
+        return True
+    
+    def migrer_ancres_extraits(self):
+        """
+        Calculer les ancres des extraits des documents indexés avant leur
+        introduction (un document à la fois: textes jamais tous en mémoire)
         
-        # Table des statistiques de recherche
+        Returns:
+            Nombre de documents complétés
+        """
         self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS statistiques_recherche (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                requete TEXT NOT NULL,
-                nb_resultats INTEGER,
-                date_recherche TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                temps_execution_ms REAL
-            )
+            SELECT id FROM documents
+            WHERE id NOT IN (SELECT doc_id FROM ancres_documents)
         ''')
+        ids = [row[0] for row in self.cursor.fetchall()]
+        if not ids:
+            return 0
         
-        self.conn.commit()
-        print("✓ Tables créées avec succès")
+        print(f"🔄 Calcul des ancres d'extraits de {len(ids)} documents...")
+        for doc_id in ids:
+            self.cursor.execute('SELECT contenu FROM documents WHERE id = ?', (doc_id,))
+            ancres, _ = ancres_texte(self.cursor.fetchone()[0] or '')
+            self.cursor.execute('''
+                INSERT INTO ancres_documents (doc_id, pas, ancres) VALUES (?, ?, ?)
+            ''', (doc_id, PAS_ANCRES, ancres.tobytes()))
+        return len(ids)
+    
+    def migrer_index_correction(self):
+        """
+        Construire l'index des fautes de frappe d'un index antérieur à son
+        introduction, depuis les mots présents dans index_mots_cles (tout le
+        dictionnaire des termes pour un index segmenté, racines comprises)
+        
+        Returns:
+            Nombre de formes ajoutées
+        """
+        self.cursor.execute('SELECT 1 FROM formes_correction LIMIT 1')
+        if self.cursor.fetchone() is not None:
+            return 0
+        
+        self.cursor.execute('SELECT 1 FROM index_mots_cles LIMIT 1')
+        if self.cursor.fetchone() is not None:
+            self.cursor.execute('''
+                SELECT texte FROM termes
+                WHERE id IN (SELECT DISTINCT terme_id FROM index_mots_cles)
+            ''')
+        else:
+            self.cursor.execute('SELECT texte FROM termes')
+        mots = [row[0] for row in self.cursor.fetchall()]
+        if not mots:
+            return 0
+        
+        print(f"🔄 Construction de l'index des fautes de frappe ({len(mots)} mots)...")
+        index = IndexCorrection(self)
+        index.ajouter(mots)
+        return index.ecrire()
+    
+    def _remplir_termes(self, table):
+        """Ajouter au dictionnaire les mots et racines d'une ancienne table d'index"""
+        self.cursor.execute(f'''
+            INSERT OR IGNORE INTO termes (texte)
+            SELECT mot_cle FROM {table} UNION SELECT racine FROM {table}
+        ''')
+        DictionnaireTermes.oublier(self.db_path)
+    
+    def _supprimer_index_table(self, table):
+        """Supprimer les index d'une table (libère leurs noms avant migration)"""
+        self.cursor.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+        ''', (table,))
+        for (nom,) in self.cursor.fetchall():
+            self.cursor.execute(f'DROP INDEX IF EXISTS {nom}')
+    
+    def creer_index_secondaires(self):
+        """Créer (ou recréer) les index secondaires de la table d'index"""
+        for nom, colonne in self.INDEX_SECONDAIRES.items():
+            self.cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS {nom} 
+                ON index_mots_cles({colonne})
+            ''')
+    
+    def supprimer_index_secondaires(self):
+        """
+        Supprimer les index secondaires de la table d'index
+        Utilisé pendant un chargement en masse: les index sont reconstruits
+        en une seule passe à la fin au lieu d'être maintenus à chaque INSERT
+        """
+        for nom in self.INDEX_SECONDAIRES:
+            self.cursor.execute(f'DROP INDEX IF EXISTS {nom}')
+    
+    def creer_index_contenus(self):
+        """Créer les index uniques (contenu, terme) de la table d'index"""
+        for colonne, nom in self.INDEX_CONTENUS.items():
+            self.cursor.execute(f'''
+                CREATE UNIQUE INDEX IF NOT EXISTS {nom} 
+                ON index_mots_cles({colonne}, terme_id) WHERE {colonne} IS NOT NULL
+            ''')
+    
+    def supprimer_index_contenus(self):
+        """Supprimer les index par contenu (construction hors ligne de l'index)"""
+        for nom in self.INDEX_CONTENUS.values():
+            self.cursor.execute(f'DROP INDEX IF EXISTS {nom}')
     
     def drop_tables(self):
         """Supprimer toutes les tables (pour réinitialisation)"""
-        tables = ['statistiques_recherche', 'index_mots_cles', 'videos', 'images', 'documents']
+        tables = ['manifeste_fichiers', 'statistiques_recherche', 'index_mots_cles', 'termes',
+                  'longueurs_contenus', 'frequences_racines', 'statistiques_corpus',
+                  'ancres_documents', 'morceaux_contenus', 'formes_correction', 'suppressions_formes',
+                  'videos', 'images', 'documents']
         for table in tables:
             self.cursor.execute(f'DROP TABLE IF EXISTS {table}')
         self.conn.commit()
+        DictionnaireTermes.oublier(self.db_path)
         print("✓ Tables supprimées")
     
     def close(self):
@@ -143,7 +573,7 @@ class DatabaseConfig:
             stats['nb_videos'] = 0
         
         try:
-            self.cursor.execute("SELECT COUNT(DISTINCT mot_cle) FROM index_mots_cles")
+            self.cursor.execute("SELECT COUNT(DISTINCT terme_id) FROM index_mots_cles")
             stats['nb_mots_cles_uniques'] = self.cursor.fetchone()[0]
         except:
             stats['nb_mots_cles_uniques'] = 0
@@ -162,4 +592,4 @@ if __name__ == "__main__":
     for key, value in stats.items():
         print(f"  - {key}: {value}")
     
-    db.close()
\ No newline at end of file
+    db.close()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import sqlite3
+from array import array
+from text_processor import MOT_REGEX, plier
+
+# Un token sur PAS_ANCRES a son décalage enregistré
+PAS_ANCRES = 16
+
+
+def ancres_texte(texte, premier_token=0, decalage=0, pas=PAS_ANCRES):
+    """
+    Décalages en octets (UTF-8) des tokens dont la position est multiple de `pas`
+    Tokens et positions identiques à ceux de TextProcessor.tokeniser
+
+    Les décalages sont en octets: le texte extrait des PDF peut contenir des
+    caractères nuls, où s'arrêtent substr et length de SQLite sur du texte
+    (mais pas sur un blob)
+
+    Args:
+        premier_token: Position du premier token du texte (texte découpé en pages)
+        decalage: Décalage du texte dans le contenu, en octets
+
+    Returns:
+        (array('I') des décalages, nombre de tokens du texte)
+    """
+    ancres = array('I')
+    nb_tokens = 0
+    precedent = 0
+    for nb_tokens, correspondance in enumerate(MOT_REGEX.finditer(texte.lower()), 1):
+        if (premier_token + nb_tokens - 1) % pas == 0:
+            decalage += len(texte[precedent:correspondance.start()].encode('utf-8'))
+            precedent = correspondance.start()
+            ancres.append(decalage)
+    return ancres, nb_tokens
+
+
+def surlignages(texte, correspond, debut=0, fin=None, decalage=0):
+    """
+    Plages [début, fin[ des tokens de texte[debut:fin] qui correspondent à
+    la requête, décalées de `decalage` (préfixe ajouté à l'extrait)
+
+    Args:
+        correspond: Fonction token (minuscules) -> bool
+    """
+    fin = len(texte) if fin is None else fin
+    return [[decalage + m.start() - debut, decalage + m.end() - debut]
+            for m in MOT_REGEX.finditer(texte.lower(), debut, fin) if correspond(m.group())]
+
+
+def correspondance_requete(mots, racines, analyser):
+    """
+    Fonction token -> bool: le token est un mot de la requête ou a la même
+    racine, formes pliées comparées (accents et casse ignorés)
+
+    Args:
+        analyser: TextProcessor._analyser_token (racine d'un token, None s'il est filtré)
+    """
+    mots_plies = {plier(mot) for mot in mots}
+    racines_pliees = {plier(racine) for racine in racines}
+
+    def correspond(token):
+        if plier(token) in mots_plies:
+            return True
+        racine = analyser(token)
+        return racine is not None and plier(racine) in racines_pliees
+    return correspond
+
+
+class ExtraitsDocuments:
+    """
+    Extraits des documents lus sans charger leur texte entier
+
+    À l'indexation, le décalage d'un token sur PAS_ANCRES est enregistré
+    pour chaque document (table ancres_documents). À la recherche, la
+    position (en tokens) du meilleur passage, tirée des postings, est
+    convertie par l'ancre qui la précède, et seuls quelques centaines
+    d'octets du texte sont lus (substr)
+    """
+
+    # Tokens conservés avant la position visée
+    CONTEXTE = 8
+
+    # Octets lus par extrait, en multiple de sa taille en caractères: de
+    # quoi aller de l'ancre à la position, puis couvrir l'extrait
+    FACTEUR_LECTURE = 6
+
+    def __init__(self, db_config, taille=200):
+        self.db = db_config
+        self.taille = taille
+
+    # --- Écriture (indexeur) ---
+
+    def ecrire(self, doc_id, ancres, pas=PAS_ANCRES):
+        """Enregistrer les ancres d'un document (array('I') de ancres_texte)"""
+        self.db.cursor.execute('''
+            INSERT OR REPLACE INTO ancres_documents (doc_id, pas, ancres)
+            VALUES (?, ?, ?)
+        ''', (doc_id, pas, ancres.tobytes()))
+
+    def supprimer(self, doc_id):
+        self.db.cursor.execute('DELETE FROM ancres_documents WHERE doc_id = ?', (doc_id,))
+
+    # --- Lecture (recherche) ---
+
+    def extraits(self, positions, correspond):
+        """
+        Extraits d'au plus `taille` caractères commençant peu avant une position
+
+        Args:
+            positions: Dict doc_id -> position (en tokens) du passage, None pour le début
+            correspond: Fonction token (minuscules) -> bool, tokens surlignés
+
+        Returns:
+            Dict doc_id -> (extrait, surlignages)
+        """
+        if not positions:
+            return {}
+
+        ids = sorted(positions)
+        try:
+            self.db.cursor.execute(f'''
+                SELECT doc_id, pas, ancres FROM ancres_documents
+                WHERE doc_id IN ({','.join(['?'] * len(ids))})
+            ''', ids)
+            ancres = {doc_id: (pas, memoryview(blob).cast('I'))
+                      for doc_id, pas, blob in self.db.cursor.fetchall()}
+        except sqlite3.OperationalError:
+            # Base antérieure aux ancres (create_tables pas encore relancé)
+            ancres = {}
+
+        extraits = {}
+        for doc_id in ids:
+            position = positions[doc_id]
+            # Document sans ancres (ou position inconnue): début du texte
+            premier_token, decalage = 0, 0
+            if position is not None and doc_id in ancres:
+                pas, decalages = ancres[doc_id]
+                k = min(max(position - self.CONTEXTE, 0) // pas, len(decalages) - 1)
+                if k >= 0:
+                    premier_token, decalage = k * pas, decalages[k]
+
+            lecture = self.FACTEUR_LECTURE * self.taille
+            self.db.cursor.execute('''
+                SELECT substr(CAST(contenu AS BLOB), ?, ?) FROM documents WHERE id = ?
+            ''', (decalage + 1, lecture, doc_id))
+            row = self.db.cursor.fetchone()
+            if row and row[0]:
+                # Le dernier caractère peut être coupé: ignoré au décodage
+                texte = bytes(row[0]).decode('utf-8', errors='ignore')
+                extraits[doc_id] = self._extrait(texte, decalage, premier_token, position,
+                                                 len(row[0]) == lecture, correspond)
+        return extraits
+
+    def debuts(self, ids, taille=500):
+        """Dict doc_id -> `taille` premiers caractères du texte"""
+        if not ids:
+            return {}
+        self.db.cursor.execute(f'''
+            SELECT id, substr(CAST(contenu AS BLOB), 1, ?) FROM documents
+            WHERE id IN ({','.join(['?'] * len(ids))})
+        ''', [4 * taille] + list(ids))
+        return {doc_id: bytes(debut or b'').decode('utf-8', errors='ignore')[:taille]
+                for doc_id, debut in self.db.cursor.fetchall()}
+
+    def _extrait(self, texte, decalage, premier_token, position, tronque, correspond):
+        """
+        Extrait d'un passage lu à partir de l'ancre (token premier_token à
+        l'octet decalage); tronque: le texte continue après le passage
+        """
+        tokens = list(MOT_REGEX.finditer(texte.lower()))
+        if not tokens:
+            return texte[:self.taille], []
+
+        # Premier token de l'extrait: CONTEXTE tokens avant la position
+        rang = 0
+        if position is not None:
+            rang = min(max(position - self.CONTEXTE - premier_token, 0), len(tokens) - 1)
+        debut = tokens[rang].start()
+
+        # Fin: dernier token entier dans la taille de l'extrait
+        fin = min(debut + self.taille, len(texte))
+        if fin < len(texte):
+            fins = [m.end() for m in tokens[rang:] if m.end() <= fin]
+            fin = fins[-1] if fins else fin
+
+        prefixe = "..." if decalage + debut > 0 else ""
+        suffixe = "..." if fin < len(texte) or tronque else ""
+        return (prefixe + texte[debut:fin] + suffixe,
+                surlignages(texte, correspond, debut, fin, len(prefixe)))
+
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index inversé en mémoire (fichier projeté par mmap)
+Instantané compact de la base: dictionnaire des termes, listes de postings
+en tableaux triés, statistiques BM25 et métadonnées des contenus. Le moteur
+de recherche y répond sans aucune requête SQL pour le classement, et les
+processus serveurs qui ouvrent le même fichier partagent ses pages en mémoire.
+Le fichier est reconstruit par reindex.py --index-mappe ou par ce script
+(remplacement atomique); tant que la base a changé depuis sa construction
+(génération différente, voir IndexMappe.est_synchronise), il n'est pas servi.
+Usage: python index_mappe.py [base] [fichier]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby, repeat
+from database_config import DatabaseConfig
+from statistiques import StatistiquesCorpus
+from text_processor import plier
+
+MAGIQUE = b'IDXMAPPE'
+
+COLONNES = list(DatabaseConfig.INDEX_CONTENUS)
+
+# Colonnes de métadonnées de chaque table (lues par SearchEngine._meilleurs_contenus).
+# Le texte des documents reste dans la base: seuls des extraits en sont lus
+METADONNEES = {
+    'documents': ['id', 'titre', 'type_doc', 'chemin_fichier'],
+    'images': ['id', 'titre', 'description', 'type_image', 'chemin_fichier', 'alt_text'],
+    'videos': ['id', 'titre', 'description', 'type_video', 'chemin_fichier', 'duree_secondes'],
+}
+
+
+def _listes(cles):
+    """
+    Clés distinctes d'une suite triée et début de chaque liste
+
+    Returns:
+        (tableau des clés, tableau des débuts avec la fin en dernier)
+    """
+    distinctes, debuts = array('q'), array('q')
+    position = 0
+    for cle, groupe in groupby(cles):
+        distinctes.append(cle)
+        debuts.append(position)
+        position += sum(1 for _ in groupe)
+    debuts.append(position)
+    return distinctes, debuts
+
+
+def _textes(textes):
+    """Textes concaténés en UTF-8 et début de chaque texte (fin en dernier)"""
+    blob, debuts = bytearray(), array('q', [0])
+    for texte in textes:
+        blob += texte
+        debuts.append(len(blob))
+    return blob, debuts
+
+
+def _encoder_valeur(valeur):
+    """Valeur d'une colonne de métadonnées: texte brut (préfixe 1), autre en JSON (2), NULL (0)"""
+    if valeur is None:
+        return b'\0'
+    if isinstance(valeur, str):
+        return b'\1' + valeur.encode('utf-8')
+    return b'\2' + json.dumps(valeur).encode('utf-8')
+
+
+def _decoder_valeur(octets):
+    if octets[0] == 1:
+        return bytes(octets[1:]).decode('utf-8')
+    if octets[0] == 2:
+        return json.loads(bytes(octets[1:]))
+    return None
+
+
+def construire_index_mappe(db, chemin):
+    """
+    Écrire l'instantané de la base `db` dans le fichier `chemin`
+    (fichier temporaire puis os.replace: les lecteurs gardent l'ancien)
+
+    Returns:
+        Nombre de postings exportés
+    """
+    sections = {}
+
+    # Dictionnaire des termes trié par forme pliée (octets UTF-8)
+    db.cursor.execute('SELECT forme_pliee, id, texte FROM termes')
+    termes = sorted((pliee.encode('utf-8'), id_terme, texte.encode('utf-8'))
+                    for pliee, id_terme, texte in db.cursor.fetchall())
+    sections['pliees'], sections['pliees_debuts'] = _textes(t[0] for t in termes)
+    sections['termes_ids'] = array('q', (t[1] for t in termes))
+    sections['textes'], sections['textes_debuts'] = _textes(t[2] for t in termes)
+
+    nb_postings = 0
+    for colonne in COLONNES:
+        db.cursor.execute(f'''
+            SELECT racine_id, {colonne}, terme_id, frequence, positions FROM index_mots_cles
+            WHERE {colonne} IS NOT NULL
+            ORDER BY racine_id, {colonne}, terme_id
+        ''')
+        postings = db.cursor.fetchall()
+        nb_postings += len(postings)
+
+        # Postings par racine (racine, contenu, terme), positions comprises
+        sections[f'p_{colonne}_cles'], sections[f'p_{colonne}_debuts'] = _listes(p[0] for p in postings)
+        sections[f'p_{colonne}_contenus'] = array('q', (p[1] for p in postings))
+        sections[f'p_{colonne}_termes'] = array('q', (p[2] for p in postings))
+        sections[f'p_{colonne}_frequences'] = array('q', (p[3] for p in postings))
+        sections[f'p_{colonne}_positions'], sections[f'p_{colonne}_positions_debuts'] = _textes(
+            p[4] or b'' for p in postings)
+
+        # Postings de chaque terme: indices dans les tableaux précédents
+        par_terme = sorted(range(len(postings)), key=lambda i: (postings[i][2], postings[i][1]))
+        sections[f't_{colonne}_cles'], sections[f't_{colonne}_debuts'] = _listes(
+            postings[i][2] for i in par_terme)
+        sections[f't_{colonne}_postings'] = array('q', par_terme)
+
+        # Fréquences cumulées par (racine, contenu): listes du classement BM25
+        cumuls = [(racine_id, contenu_id, sum(p[3] for p in groupe), len(groupe))
+                  for (racine_id, contenu_id), groupe in (
+                      (cle, list(g)) for cle, g in groupby(postings, key=lambda p: (p[0], p[1])))]
+        sections[f'r_{colonne}_cles'], sections[f'r_{colonne}_debuts'] = _listes(c[0] for c in cumuls)
+        sections[f'r_{colonne}_contenus'] = array('q', (c[1] for c in cumuls))
+        sections[f'r_{colonne}_frequences'] = array('q', (c[2] for c in cumuls))
+        sections[f'r_{colonne}_nb'] = array('q', (c[3] for c in cumuls))
+
+        db.cursor.execute('''
+            SELECT contenu_id, longueur FROM longueurs_contenus WHERE colonne = ? ORDER BY contenu_id
+        ''', (colonne,))
+        longueurs = db.cursor.fetchall()
+        sections[f'l_{colonne}_contenus'] = array('q', (l[0] for l in longueurs))
+        sections[f'l_{colonne}_longueurs'] = array('q', (l[1] for l in longueurs))
+
+    db.cursor.execute('''
+        SELECT racine_id, nb_contenus, frequence_max, ratio_max FROM frequences_racines ORDER BY racine_id
+    ''')
+    racines = db.cursor.fetchall()
+    sections['s_racines'] = array('q', (r[0] for r in racines))
+    sections['s_nb'] = array('q', (r[1] for r in racines))
+    sections['s_frequences_max'] = array('q', (r[2] for r in racines))
+    sections['s_ratios_max'] = array('d', (r[3] for r in racines))
+
+    # Métadonnées par colonne: seules les colonnes demandées sont décodées
+    for table, colonnes in METADONNEES.items():
+        db.cursor.execute(f'SELECT {", ".join(colonnes)} FROM {table} ORDER BY id')
+        lignes = db.cursor.fetchall()
+        sections[f'm_{table}_ids'] = array('q', (ligne[0] for ligne in lignes))
+        for k, colonne in enumerate(colonnes[1:], 1):
+            sections[f'm_{table}_{colonne}'], sections[f'm_{table}_{colonne}_debuts'] = _textes(
+                _encoder_valeur(ligne[k]) for ligne in lignes)
+
+    db.cursor.execute('''
+        SELECT cle, valeur FROM statistiques_corpus
+        WHERE cle IN ('nb_contenus', 'somme_longueurs', 'generation')
+    ''')
+    corpus = dict(db.cursor.fetchall())
+
+    # Table des sections: nom -> (début, taille en octets, format), sections alignées sur 8 octets
+    table, position, contenus = {}, 0, []
+    for nom, donnees in sections.items():
+        octets = donnees.tobytes() if isinstance(donnees, array) else bytes(donnees)
+        table[nom] = (position, len(octets), donnees.typecode if isinstance(donnees, array) else 'B')
+        contenus.append(octets + b'\0' * (-len(octets) % 8))
+        position += len(contenus[-1])
+    entete = json.dumps({'sections': table, 'corpus': corpus}).encode('utf-8')
+    entete += b' ' * (-len(entete) % 8)
+
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, 'wb') as f:
+        f.write(MAGIQUE + len(entete).to_bytes(8, 'little') + entete)
+        for octets in contenus:
+            f.write(octets)
+    os.replace(temporaire, chemin)
+    return nb_postings
+
+
+class IndexMappe:
+    """
+    Lecture d'un index projeté en mémoire (voir construire_index_mappe)
+
+    Remplace, pour SearchEngine, à la fois l'index de la base (mêmes
+    méthodes frequences / postings / scores que GestionnaireSegments), le
+    dictionnaire des termes (variantes_pliees, identifiants_plies) et les
+    statistiques BM25 (corpus, racines, longueurs). Les tableaux sont des
+    vues sur les pages projetées: rien n'est copié à l'ouverture.
+    """
+
+    FICHIER = 'index_mappe.bin'
+
+    def __init__(self, chemin=FICHIER):
+        self.chemin = os.path.abspath(chemin)
+        with open(self.chemin, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.signature = (stat.st_ino, stat.st_mtime_ns)
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mmap[:len(MAGIQUE)] != MAGIQUE:
+            raise ValueError(f"Fichier d'index mappé invalide: {self.chemin}")
+        taille_entete = int.from_bytes(self.mmap[8:16], 'little')
+        entete = json.loads(self.mmap[16:16 + taille_entete])
+
+        vue = memoryview(self.mmap)
+        base = 16 + taille_entete
+        self.sections = {}
+        for nom, (debut, taille, format_) in entete['sections'].items():
+            section = vue[base + debut:base + debut + taille]
+            self.sections[nom] = section.cast(format_) if format_ != 'B' else section
+
+        self.nb_contenus = entete['corpus'].get('nb_contenus', 0)
+        self.somme_longueurs = entete['corpus'].get('somme_longueurs', 0)
+        self.generation_base = entete['corpus'].get('generation', 0)
+
+    @classmethod
+    def existe(cls, chemin=FICHIER):
+        return os.path.exists(chemin)
+
+    def est_a_jour(self):
+        """Le fichier n'a pas été remplacé depuis l'ouverture"""
+        try:
+            stat = os.stat(self.chemin)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == self.signature
+
+    def est_synchronise(self, db_config):
+        """
+        L'instantané reflète la base: aucun commit de l'indexeur (document
+        ajouté, modifié ou supprimé) depuis sa construction
+        """
+        return self.generation_base == StatistiquesCorpus(db_config).generation()
+
+    def _liste(self, prefixe, cle):
+        """Bornes [début, fin) de la liste d'une clé (vide si absente)"""
+        cles = self.sections[f'{prefixe}_cles']
+        i = bisect_left(cles, cle)
+        if i == len(cles) or cles[i] != cle:
+            return 0, 0
+        debuts = self.sections[f'{prefixe}_debuts']
+        return debuts[i], debuts[i + 1]
+
+    # --- Dictionnaire des termes (interface de DictionnaireTermes) ---
+
+    def variantes_pliees(self, textes):
+        """Termes de même forme pliée que l'un des textes: liste de (id, texte) par id croissant"""
+        pliees, debuts = self.sections['pliees'], self.sections['pliees_debuts']
+        textes_termes, debuts_textes = self.sections['textes'], self.sections['textes_debuts']
+        ids = self.sections['termes_ids']
+
+        variantes = []
+        for pliee in {plier(texte).encode('utf-8') for texte in textes}:
+            # Recherche dichotomique de la première forme pliée >= pliee
+            bas, haut = 0, len(ids)
+            while bas < haut:
+                milieu = (bas + haut) // 2
+                if bytes(pliees[debuts[milieu]:debuts[milieu + 1]]) < pliee:
+                    bas = milieu + 1
+                else:
+                    haut = milieu
+            while bas < len(ids) and bytes(pliees[debuts[bas]:debuts[bas + 1]]) == pliee:
+                variantes.append((ids[bas], bytes(textes_termes[debuts_textes[bas]:debuts_textes[bas + 1]])
+                                  .decode('utf-8')))
+                bas += 1
+        return sorted(variantes)
+
+    def identifiants_plies(self, textes):
+        return [id_terme for id_terme, _ in self.variantes_pliees(textes)]
+
+    # --- Statistiques BM25 (interface de StatistiquesCorpus) ---
+
+    def corpus(self):
+        moyenne = self.somme_longueurs / self.nb_contenus if self.nb_contenus else 0
+        return self.nb_contenus, moyenne
+
+    def generation(self):
+        """Génération de la base au moment de la construction du fichier"""
+        return self.generation_base
+
+    def racines(self, ids_racines):
+        cles = self.sections['s_racines']
+        stats = {}
+        for racine_id in ids_racines:
+            i = bisect_left(cles, racine_id)
+            if i < len(cles) and cles[i] == racine_id:
+                stats[racine_id] = (self.sections['s_nb'][i], self.sections['s_frequences_max'][i],
+                                    self.sections['s_ratios_max'][i])
+        return stats
+
+    def longueurs(self, colonne_id, ids_contenus):
+        contenus, valeurs = self.sections[f'l_{colonne_id}_contenus'], self.sections[f'l_{colonne_id}_longueurs']
+        longueurs = {}
+        for contenu_id in ids_contenus:
+            i = bisect_left(contenus, contenu_id)
+            if i < len(contenus) and contenus[i] == contenu_id:
+                longueurs[contenu_id] = valeurs[i]
+        return longueurs
+
+    # --- Postings (interface de GestionnaireSegments) ---
+
+    def frequences(self, ids_racines, colonne_id, ids_contenus=None):
+        """Occurrences de chaque racine par contenu: liste de (contenu_id, racine_id, frequence, nb_postings)"""
+        contenus = self.sections[f'r_{colonne_id}_contenus']
+        frequences = self.sections[f'r_{colonne_id}_frequences']
+        nb = self.sections[f'r_{colonne_id}_nb']
+
+        lignes = []
+        for racine_id in ids_racines:
+            debut, fin = self._liste(f'r_{colonne_id}', racine_id)
+            if ids_contenus is None:
+                lignes.extend(zip(contenus[debut:fin], repeat(racine_id),
+                                  frequences[debut:fin], nb[debut:fin]))
+                continue
+            # Listes triées par contenu: une recherche dichotomique par contenu demandé
+            for contenu_id in sorted(ids_contenus):
+                i = bisect_left(contenus, contenu_id, debut, fin)
+                if i < fin and contenus[i] == contenu_id:
+                    lignes.append((contenu_id, racine_id, frequences[i], nb[i]))
+                debut = i
+        return lignes
+
+    def postings(self, ids_termes, ids_racines, colonne_id, ids_contenus=None, valeur='positions'):
+        """Postings des termes ou racines: liste de (contenu_id, terme_id, racine_id, valeur)"""
+        indices = set()
+        for racine_id in ids_racines:
+            indices.update(range(*self._liste(f'p_{colonne_id}', racine_id)))
+        par_terme = self.sections[f't_{colonne_id}_postings']
+        for terme_id in ids_termes:
+            debut, fin = self._liste(f't_{colonne_id}', terme_id)
+            indices.update(par_terme[debut:fin])
+
+        contenus = self.sections[f'p_{colonne_id}_contenus']
+        termes = self.sections[f'p_{colonne_id}_termes']
+        racines, debuts_racines = self.sections[f'p_{colonne_id}_cles'], self.sections[f'p_{colonne_id}_debuts']
+        if valeur == 'positions':
+            blob, debuts = self.sections[f'p_{colonne_id}_positions'], self.sections[f'p_{colonne_id}_positions_debuts']
+            lire = lambda i: bytes(blob[debuts[i]:debuts[i + 1]])
+        else:
+            lire = self.sections[f'p_{colonne_id}_frequences'].__getitem__
+
+        resultats = []
+        for i in sorted(indices):
+            if ids_contenus is not None and contenus[i] not in ids_contenus:
+                continue
+            racine_id = racines[bisect_right(debuts_racines, i) - 1]
+            resultats.append((contenus[i], termes[i], racine_id, lire(i)))
+        return resultats
+
+    def scores(self, ids_mots, ids_racines, colonne_id):
+        """Dict contenu_id -> [nb_correspondances, score_total] (classement par fréquences)"""
+        scores = {}
+        for contenu_id, _, _, frequence in self.postings(ids_mots, ids_racines, colonne_id,
+                                                          valeur='frequence'):
+            cumul = scores.setdefault(contenu_id, [0, 0])
+            cumul[0] += 1
+            cumul[1] += frequence
+        return scores
+
+    # --- Métadonnées des contenus ---
+
+    def lignes(self, table, colonnes, ids):
+        """Colonnes demandées des contenus `ids` (dict id -> tuple), comme un SELECT"""
+        noms = [colonne.strip() for colonne in colonnes.split(',')]
+        cles = self.sections[f'm_{table}_ids']
+        lignes = {}
+        for contenu_id in ids:
+            i = bisect_left(cles, contenu_id)
+            if i == len(cles) or cles[i] != contenu_id:
+                continue
+            ligne = []
+            for nom in noms:
+                if nom == 'id':
+                    ligne.append(contenu_id)
+                    continue
+                blob, debuts = self.sections[f'm_{table}_{nom}'], self.sections[f'm_{table}_{nom}_debuts']
+                ligne.append(_decoder_valeur(blob[debuts[i]:debuts[i + 1]]))
+            lignes[contenu_id] = tuple(ligne)
+        return lignes
+
+    def fermer(self):
+        """Libérer les vues et la projection"""
+        for section in self.sections.values():
+            section.release()
+        self.sections = {}
+        self.mmap.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construire l'index mappé depuis la base")
+    parser.add_argument('base', nargs='?', default='ai_search_engine.db')
+    parser.add_argument('fichier', nargs='?', default=IndexMappe.FICHIER)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base):
+        print(f"❌ Base introuvable: {args.base} (lancer d'abord l'indexation)")
+        sys.exit(1)
+
+    db = DatabaseConfig(args.base)
+    db.connect()
+    nb_postings = construire_index_mappe(db, args.fichier)
+    db.close()
+    print(f"✓ Index mappé écrit: {args.fichier} ({nb_postings} postings, "
+          f"{os.path.getsize(args.fichier) / 1e6:.1f} Mo)")
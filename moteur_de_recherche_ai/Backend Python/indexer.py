@@ -1,19 +1,285 @@
 import os
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import PyPDF2
 import docx
 from pathlib import Path
 from database_config import DatabaseConfig
 from text_processor import TextProcessor
+from postings import agreger_colonnes, AccumulateurPostings
+from manifeste import ManifesteFichiers, calculer_empreinte
+from cache_extraction import CacheExtraction
+from termes import DictionnaireTermes
+from statistiques import StatistiquesCorpus
+from extraits import ExtraitsDocuments, ancres_texte
+from correction import IndexCorrection
 
 class DocumentIndexer:
     """Classe pour l'indexation des documents dans la base de données"""
     
-    def __init__(self, db_config):
+    # Extensions indexables par catégorie
+    EXTENSIONS_DOCUMENTS = ['.txt', '.pdf', '.docx', '.html', '.htm']
+    EXTENSIONS_IMAGES = ['.jpg', '.jpeg', '.png', '.gif', '.svg']
+    EXTENSIONS_VIDEOS = ['.mp4', '.avi', '.mov', '.webm']
+    
+    # Table et colonne de index_mots_cles par catégorie
+    TABLES_CATEGORIES = {
+        'docs': ('documents', 'doc_id'),
+        'images': ('images', 'img_id'),
+        'videos': ('videos', 'video_id')
+    }
+    
+    # Nombre de postings par transaction en mode chargement en masse
+    TAILLE_TRANSACTION_BULK = 200000
+    
+    # Volume (caractères de texte + octets de positions) accumulé pendant
+    # l'indexation d'un PDF en flux avant écriture dans la base
+    TAILLE_TAMPON_FLUX = 1024 * 1024
+    
+    def __init__(self, db_config, utiliser_cache=True, segments=None):
         self.db = db_config
         self.processor = TextProcessor()
+        
+        # Cache disque du texte extrait (voir cache_extraction.py)
+        self.cache = CacheExtraction() if utiliser_cache else None
+        
+        # Index segmenté (voir segments.py): les postings sont accumulés en
+        # mémoire et publiés en un nouveau segment à chaque commit
+        self.segments = segments
+        self.tampon_segment = {}
+        self.suppressions_en_attente = []
+        
+        # État du mode chargement en masse (voir indexer_dossier)
+        self.commit_differe = False
+        self.mode_bulk = False
+        self.taille_transaction = self.TAILLE_TRANSACTION_BULK
+        self.postings_en_attente = 0
+        self.nb_postings = 0
+        
+        self._termes = None
+        self._statistiques = None
+        self._correction = None
+        
+        # Ancres des extraits de chaque document (voir extraits.py)
+        self.extraits = ExtraitsDocuments(db_config)
+    
+    @property
+    def termes(self):
+        """Dictionnaire des termes de la base (chargé à la première écriture)"""
+        if self._termes is None:
+            self._termes = DictionnaireTermes(self.db)
+        return self._termes
+    
+    @property
+    def statistiques(self):
+        """Statistiques BM25 (longueurs des contenus, fréquences des racines)"""
+        if self._statistiques is None:
+            self._statistiques = StatistiquesCorpus(self.db)
+        return self._statistiques
+    
+    @property
+    def correction(self):
+        """Index des fautes de frappe (formes des mots indexés)"""
+        if self._correction is None:
+            self._correction = IndexCorrection(self.db)
+        return self._correction
+    
+    def _compter_contenu(self, colonne_id, contenu_id, longueur, frequences_racines):
+        """
+        Mettre à jour les statistiques BM25 pour un contenu indexé
+        (frequences_racines: dict racine -> occurrences dans le contenu)
+        """
+        racines = sorted(frequences_racines)
+        ids_racines = self.termes.identifiants(racines)
+        self.statistiques.ajouter_contenu(
+            colonne_id, contenu_id, longueur,
+            {id_racine: frequences_racines[racine] for id_racine, racine in zip(ids_racines, racines)})
+    
+    def _compter_postings(self, colonne_id, contenu_id, postings):
+        """Mettre à jour les statistiques BM25 d'après les postings complets d'un contenu"""
+        frequences_racines = Counter()
+        for _, racine, freq, _ in postings:
+            frequences_racines[racine] += freq
+        self._compter_contenu(colonne_id, contenu_id, sum(frequences_racines.values()),
+                              frequences_racines)
+    
+    def _racines_contenu(self, colonne_id, contenu_id):
+        """Identifiants des racines distinctes d'un contenu déjà indexé"""
+        if self.segments is None:
+            self.db.cursor.execute(f'''
+                SELECT DISTINCT racine_id FROM index_mots_cles WHERE {colonne_id} = ?
+            ''', (contenu_id,))
+            return [row[0] for row in self.db.cursor.fetchall()]
+        
+        postings_contenu = self.tampon_segment.get((colonne_id, contenu_id))
+        if postings_contenu is not None:
+            return list({racine_id for racine_id, _, _ in postings_contenu.values()})
+        return self.segments.racines_contenu(colonne_id, contenu_id)
+    
+    def _postings_ids(self, postings):
+        """
+        Identifiants des termes des postings (voir DictionnaireTermes.postings_ids),
+        mots retenus pour l'index des fautes de frappe
+        """
+        self.correction.ajouter(mot for mot, _, _, _ in postings)
+        return self.termes.postings_ids(postings)
+    
+    def _inserer_postings(self, colonne_id, contenu_id, postings):
+        """
+        Insérer les postings d'un contenu en un seul executemany
+        Une ligne par terme: fréquence précalculée et positions compactées
+        
+        Args:
+            postings: Sortie de agreger_postings() ou agreger_colonnes()
+        
+        Returns:
+            Nombre de postings insérés
+        """
+        postings_ids = self._postings_ids(postings)
+        if self.segments is not None:
+            self._ajouter_au_segment(colonne_id, contenu_id, postings_ids)
+        else:
+            self.db.cursor.executemany(f'''
+                INSERT INTO index_mots_cles 
+                (terme_id, racine_id, {colonne_id}, frequence, positions)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(terme_id, racine_id, contenu_id, freq, positions)
+                  for terme_id, racine_id, freq, positions in postings_ids])
+        self.nb_postings += len(postings)
+        return len(postings)
+    
+    def _fusionner_postings(self, colonne_id, contenu_id, postings):
+        """
+        Fusionner des postings partiels avec ceux déjà écrits pour ce contenu:
+        fréquences additionnées, blobs de positions concaténés
+        (voir AccumulateurPostings.vider)
+        """
+        postings_ids = self._postings_ids(postings)
+        if self.segments is not None:
+            self._ajouter_au_segment(colonne_id, contenu_id, postings_ids)
+            return
+        
+        self.db.cursor.executemany(f'''
+            INSERT INTO index_mots_cles 
+            (terme_id, racine_id, {colonne_id}, frequence, positions)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT({colonne_id}, terme_id) WHERE {colonne_id} IS NOT NULL
+            DO UPDATE SET frequence = frequence + excluded.frequence,
+                          positions = CAST(positions || excluded.positions AS BLOB)
+        ''', [(terme_id, racine_id, contenu_id, freq, positions)
+              for terme_id, racine_id, freq, positions in postings_ids])
+    
+    def _ajouter_au_segment(self, colonne_id, contenu_id, postings_ids):
+        """Accumuler des postings (éventuellement partiels) dans le segment en cours"""
+        postings_contenu = self.tampon_segment.setdefault((colonne_id, contenu_id), {})
+        for terme_id, racine_id, freq, positions in postings_ids:
+            if terme_id in postings_contenu:
+                _, freq_precedente, positions_precedentes = postings_contenu[terme_id]
+                postings_contenu[terme_id] = (racine_id, freq_precedente + freq,
+                                              positions_precedentes + positions)
+            else:
+                postings_contenu[terme_id] = (racine_id, freq, positions)
+    
+    def _publier_segment(self):
+        """Écrire les postings accumulés dans un nouveau segment, puis les suppressions"""
+        colonnes = {'doc_id': 0, 'img_id': 1, 'video_id': 2}
+        lignes = []
+        for (colonne_id, contenu_id), postings_contenu in self.tampon_segment.items():
+            ids = [None, None, None]
+            ids[colonnes[colonne_id]] = contenu_id
+            lignes.extend((terme_id, racine_id, *ids, freq, positions)
+                          for terme_id, (racine_id, freq, positions) in postings_contenu.items())
+        
+        self.segments.ajouter_segment(lignes)
+        for colonne_id, contenu_id in self.suppressions_en_attente:
+            self.segments.supprimer_contenu(colonne_id, contenu_id)
+        
+        self.tampon_segment = {}
+        self.suppressions_en_attente = []
+    
+    def _commit(self):
+        """
+        Commit de la base, précédé de l'écriture des statistiques BM25 cumulées,
+        des formes nouvelles de l'index des fautes de frappe et de la
+        publication du segment en cours en mode segmenté, suivi de la
+        publication des termes créés dans le miroir partagé
+        Toute écriture change la génération de l'index (cache des résultats)
+        """
+        if self._statistiques is not None:
+            self._statistiques.ecrire()
+        if self._correction is not None:
+            self._correction.ecrire()
+        if self.segments is not None:
+            self._publier_segment()
+        if self.db.conn.in_transaction:
+            self.statistiques.incrementer_generation()
+        self.db.conn.commit()
+        if self._termes is not None:
+            self._termes.valider()
+    
+    def _valider(self, nb_postings):
+        """
+        Valider la transaction courante
+        En mode bulk, on ne commit que tous les `taille_transaction` postings
+        Dans un bloc transaction(), le commit a lieu à la sortie du bloc
+        """
+        if not self.mode_bulk:
+            if not self.commit_differe:
+                self._commit()
+            return
+        
+        self.postings_en_attente += nb_postings
+        if self.postings_en_attente >= self.taille_transaction:
+            self._commit()
+            self.postings_en_attente = 0
+    
+    @contextmanager
+    def transaction(self):
+        """Regrouper plusieurs indexations dans une seule transaction"""
+        precedent = self.commit_differe
+        self.commit_differe = True
+        try:
+            yield
+        finally:
+            self.commit_differe = precedent
+            if not precedent:
+                self._commit()
     
-    def lire_fichier_texte(self, chemin):
-        """Lire un fichier texte simple"""
+    def debut_chargement_bulk(self, taille_transaction=None):
+        """
+        Passer en mode chargement en masse:
+        - grosses transactions (commit tous les `taille_transaction` postings)
+        - index secondaires supprimés, reconstruits à la fin du chargement
+        - écritures disque non synchronisées pendant le chargement
+        """
+        self._commit()
+        self.mode_bulk = True
+        self.taille_transaction = taille_transaction or self.TAILLE_TRANSACTION_BULK
+        self.postings_en_attente = 0
+        
+        self.db.cursor.execute("PRAGMA synchronous = OFF")
+        self.db.supprimer_index_secondaires()
+        self.db.conn.commit()
+    
+    def fin_chargement_bulk(self):
+        """Terminer le chargement en masse: dernier commit et reconstruction des index"""
+        self._commit()
+        print("🔧 Reconstruction des index secondaires...")
+        self.db.creer_index_secondaires()
+        self.db.conn.commit()
+        self.db.cursor.execute("PRAGMA synchronous = FULL")
+        
+        self.mode_bulk = False
+        self.postings_en_attente = 0
+    
+    def lire_fichier_texte(self, chemin, erreurs=None):
+        """
+        Lire un fichier texte simple
+        Les erreurs de lecture sont ajoutées à `erreurs` (voir extraire_pages)
+        """
         try:
             with open(chemin, 'r', encoding='utf-8') as f:
                 return f.read()
@@ -23,55 +289,270 @@ class DocumentIndexer:
                     return f.read()
             except Exception as e:
                 print(f"❌ Erreur lecture {chemin}: {e}")
+                if erreurs is not None:
+                    erreurs.append(e)
                 return ""
     
     def lire_pdf(self, chemin):
         """Extraire le texte d'un PDF"""
+        return "".join(self.lire_pdf_pages(chemin))
+    
+    def lire_pdf_pages(self, chemin, erreurs=None):
+        """
+        Extraire le texte d'un PDF page par page (générateur)
+        En cas d'erreur, la lecture s'arrête après la dernière page lisible
+        et l'erreur est ajoutée à `erreurs`
+        """
         try:
-            texte = ""
             with open(chemin, 'rb') as f:
                 reader = PyPDF2.PdfReader(f)
                 for page in reader.pages:
-                    texte += page.extract_text() + "\n"
-            return texte
+                    yield (page.extract_text() or "") + "\n"
         except Exception as e:
             print(f"❌ Erreur lecture PDF {chemin}: {e}")
-            return ""
+            if erreurs is not None:
+                erreurs.append(e)
     
-    def lire_docx(self, chemin):
-        """Extraire le texte d'un fichier Word"""
+    def lire_docx(self, chemin, erreurs=None):
+        """Extraire le texte d'un fichier Word (erreur ajoutée à `erreurs`)"""
         try:
             doc = docx.Document(chemin)
             texte = "\n".join([para.text for para in doc.paragraphs])
             return texte
         except Exception as e:
             print(f"❌ Erreur lecture DOCX {chemin}: {e}")
+            if erreurs is not None:
+                erreurs.append(e)
             return ""
     
-    def lire_html(self, chemin):
-        """Extraire le texte d'un fichier HTML"""
+    def lire_html(self, chemin, erreurs=None):
+        """Extraire le texte d'un fichier HTML (erreur ajoutée à `erreurs`)"""
         try:
             from bs4 import BeautifulSoup
             with open(chemin, 'r', encoding='utf-8') as f:
                 soup = BeautifulSoup(f, 'html.parser')
                 return soup.get_text()
         except:
-            return self.lire_fichier_texte(chemin)
+            return self.lire_fichier_texte(chemin, erreurs)
     
     def extraire_contenu(self, chemin):
-        """Extraire le contenu selon le type de fichier"""
+        """Extraire le contenu selon le type de fichier (via le cache d'extraction)"""
+        return "".join(self.extraire_pages(chemin))
+    
+    def extraire_pages(self, chemin):
+        """
+        Extraire le contenu page par page (générateur)
+        Le cache d'extraction est consulté d'abord; en cas d'absence, les
+        pages lues sont enregistrées dans le cache au fil de l'eau, si la
+        lecture se termine sans erreur (sinon le texte lisible est indexé
+        sans être mis en cache)
+        """
+        if self.cache is None:
+            return self._lire_pages(chemin)
+        
+        empreinte = calculer_empreinte(chemin)
+        pages = self.cache.lire(empreinte)
+        if pages is None:
+            erreurs = []
+            pages = self.cache.ecrire(empreinte, self._lire_pages(chemin, erreurs),
+                                      reussie=lambda: not erreurs)
+        return pages
+    
+    def _lire_pages(self, chemin, erreurs=None):
+        """
+        Lire les pages d'un fichier selon son type (une seule page hors PDF)
+        Les erreurs de lecture sont ajoutées à `erreurs`
+        """
         ext = Path(chemin).suffix.lower()
         
         if ext == '.txt':
-            return self.lire_fichier_texte(chemin)
+            yield self.lire_fichier_texte(chemin, erreurs)
         elif ext == '.pdf':
-            return self.lire_pdf(chemin)
+            yield from self.lire_pdf_pages(chemin, erreurs)
         elif ext == '.docx':
-            return self.lire_docx(chemin)
+            yield self.lire_docx(chemin, erreurs)
         elif ext in ['.html', '.htm']:
-            return self.lire_html(chemin)
-        else:
-            return ""
+            yield self.lire_html(chemin, erreurs)
+    
+    def supprimer_contenu(self, chemin, categorie):
+        """
+        Supprimer un contenu déjà indexé et ses postings
+        
+        Returns:
+            True si un contenu existait pour ce chemin
+        """
+        table, colonne_id = self.TABLES_CATEGORIES[categorie]
+        
+        self.db.cursor.execute(f'SELECT id FROM {table} WHERE chemin_fichier = ?', (chemin,))
+        row = self.db.cursor.fetchone()
+        if not row:
+            return False
+        
+        self.statistiques.retirer_contenu(colonne_id, row[0], self._racines_contenu(colonne_id, row[0]))
+        self.db.cursor.execute(f'DELETE FROM index_mots_cles WHERE {colonne_id} = ?', (row[0],))
+        self.db.cursor.execute(f'DELETE FROM {table} WHERE id = ?', (row[0],))
+        if colonne_id == 'doc_id':
+            self.extraits.supprimer(row[0])
+            self.db.cursor.execute('DELETE FROM morceaux_contenus WHERE doc_id = ?', (row[0],))
+        
+        if self.segments is not None:
+            # Les segments sont immuables: pierre tombale publiée au prochain commit
+            self.tampon_segment.pop((colonne_id, row[0]), None)
+            self.suppressions_en_attente.append((colonne_id, row[0]))
+        return True
+    
+    def preparer_document(self, chemin, titre=None):
+        """
+        Extraire le contenu d'un document et calculer ses postings
+        N'accède pas à la base: peut s'exécuter dans un processus de travail
+        
+        Returns:
+            Dict prêt pour ecrire_document()
+        """
+        ext = Path(chemin).suffix.lower()[1:]  # Enlever le point
+        contenu = self.extraire_contenu(chemin)
+        
+        postings = []
+        if contenu:
+            postings = agreger_colonnes(self.processor.traiter_lot([contenu]), 0)
+        
+        return {
+            'chemin': chemin,
+            'titre': titre or Path(chemin).stem,
+            'type_doc': ext,
+            'taille': os.path.getsize(chemin),
+            'contenu': contenu,
+            'postings': postings,
+            'ancres': ancres_texte(contenu or '')[0]
+        }
+    
+    def ecrire_document(self, document):
+        """
+        Écrire dans la base un document préparé par preparer_document()
+        
+        Returns:
+            Nombre de postings insérés
+        """
+        if not document['contenu']:
+            print(f"⚠️ Aucun contenu extrait de {document['chemin']}")
+        
+        # Insérer le document (en retirant l'ancienne version et ses postings)
+        self.supprimer_contenu(document['chemin'], 'docs')
+        self.db.cursor.execute('''
+            INSERT OR REPLACE INTO documents 
+            (titre, contenu, type_doc, chemin_fichier, taille_octets)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (document['titre'], document['contenu'], document['type_doc'],
+              document['chemin'], document['taille']))
+        
+        doc_id = self.db.cursor.lastrowid
+        self.extraits.ecrire(doc_id, document['ancres'])
+        
+        # Indexer les mots-clés
+        nb_postings = self._inserer_postings('doc_id', doc_id, document['postings'])
+        self._compter_postings('doc_id', doc_id, document['postings'])
+        self._valider(nb_postings)
+        
+        print(f"✓ Document indexé: {document['titre']} ({nb_postings} mots-clés)")
+        return nb_postings
+    
+    def indexer_pdf_flux(self, chemin, titre=None):
+        """
+        Indexer un PDF page par page, sans jamais tenir le livre entier en mémoire:
+        chaque page est tokenisée dès sa lecture, ses postings sont accumulés
+        sous forme compacte, et texte + postings sont écrits dans la base dès
+        que le tampon dépasse TAILLE_TAMPON_FLUX. Le texte est écrit par
+        morceaux (table morceaux_contenus) et assemblé une seule fois dans
+        documents.contenu à la fin: chaque vidage n'écrit que son morceau
+        
+        Returns:
+            Nombre de postings insérés
+        """
+        titre = titre or Path(chemin).stem
+        
+        self.supprimer_contenu(chemin, 'docs')
+        self.db.cursor.execute('''
+            INSERT INTO documents 
+            (titre, contenu, type_doc, chemin_fichier, taille_octets)
+            VALUES (?, '', 'pdf', ?, ?)
+        ''', (titre, chemin, os.path.getsize(chemin)))
+        doc_id = self.db.cursor.lastrowid
+        
+        pages_en_attente = []
+        
+        def lire_pages():
+            for page in self.extraire_pages(chemin):
+                pages_en_attente.append(page)
+                yield page
+        
+        accumulateur = AccumulateurPostings()
+        taille_texte = 0
+        longueur = 0
+        texte_extrait = False
+        
+        # Ancres des extraits: positions et décalages continus d'une page à l'autre
+        ancres = array('I')
+        nb_tokens = 0
+        nb_octets = 0
+        
+        for mots_cles in self.processor.extraire_avec_positions_flux(lire_pages()):
+            accumulateur.ajouter(mots_cles)
+            longueur += len(mots_cles)
+            page = pages_en_attente[-1]
+            ancres_page, nb_tokens_page = ancres_texte(page, nb_tokens, nb_octets)
+            ancres.extend(ancres_page)
+            nb_tokens += nb_tokens_page
+            nb_octets += len(page.encode('utf-8'))
+            taille_texte += len(page)
+            
+            if taille_texte + accumulateur.taille >= self.TAILLE_TAMPON_FLUX:
+                texte_extrait = self._vider_flux(doc_id, pages_en_attente, accumulateur) or texte_extrait
+                taille_texte = 0
+        
+        texte_extrait = self._vider_flux(doc_id, pages_en_attente, accumulateur) or texte_extrait
+        if not texte_extrait:
+            print(f"⚠️ Aucun contenu extrait de {chemin}")
+        self._assembler_contenu(doc_id)
+        
+        nb_postings = len(accumulateur.dernieres_positions)
+        self.nb_postings += nb_postings
+        self.extraits.ecrire(doc_id, ancres)
+        self._compter_contenu('doc_id', doc_id, longueur, accumulateur.frequences_racines)
+        self._valider(nb_postings)
+        
+        print(f"✓ Document indexé: {titre} ({nb_postings} mots-clés)")
+        return nb_postings
+    
+    def _vider_flux(self, doc_id, pages_en_attente, accumulateur):
+        """
+        Écrire le texte (morceau suivant du document) et les postings en
+        attente d'un PDF indexé en flux
+        
+        Returns:
+            True si du texte non vide a été écrit
+        """
+        texte = "".join(pages_en_attente)
+        pages_en_attente.clear()
+        
+        if texte:
+            self.db.cursor.execute('''
+                INSERT INTO morceaux_contenus (doc_id, numero, texte)
+                VALUES (?, (SELECT COUNT(*) FROM morceaux_contenus WHERE doc_id = ?), ?)
+            ''', (doc_id, doc_id, texte))
+        self._fusionner_postings('doc_id', doc_id, accumulateur.vider())
+        return bool(texte.strip())
+    
+    def _assembler_contenu(self, doc_id):
+        """Écrire documents.contenu en une fois depuis les morceaux du document, puis les effacer"""
+        self.db.cursor.execute('''
+            UPDATE documents SET contenu = COALESCE((
+                SELECT group_concat(texte, '') FROM (
+                    SELECT texte FROM morceaux_contenus WHERE doc_id = ? ORDER BY numero
+                )
+            ), '')
+            WHERE id = ?
+        ''', (doc_id, doc_id))
+        self.db.cursor.execute('DELETE FROM morceaux_contenus WHERE doc_id = ?', (doc_id,))
     
     def indexer_document(self, chemin, titre=None):
         """Indexer un document dans la base de données"""
@@ -81,40 +562,11 @@ class DocumentIndexer:
                 print(f"❌ Fichier introuvable: {chemin}")
                 return False
             
-            # Extraire les métadonnées
-            ext = Path(chemin).suffix.lower()[1:]  # Enlever le point
-            taille = os.path.getsize(chemin)
-            titre = titre or Path(chemin).stem
-            
-            # Extraire le contenu
-            contenu = self.extraire_contenu(chemin)
-            
-            if not contenu:
-                print(f"⚠️ Aucun contenu extrait de {chemin}")
-            
-            # Insérer le document
-            self.db.cursor.execute('''
-                INSERT OR REPLACE INTO documents 
-                (titre, contenu, type_doc, chemin_fichier, taille_octets)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (titre, contenu, ext, chemin, taille))
-            
-            doc_id = self.db.cursor.lastrowid
-            
-            # Extraire et indexer les mots-clés
-            mots_cles = []
-            if contenu:
-                mots_cles = self.processor.extraire_avec_positions(contenu)
-                
-                for item in mots_cles:
-                    self.db.cursor.execute('''
-                        INSERT INTO index_mots_cles 
-                        (mot_cle, racine, doc_id, position_texte)
-                        VALUES (?, ?, ?, ?)
-                    ''', (item['mot'], item['racine'], doc_id, item['position']))
-            
-            self.db.conn.commit()
-            print(f"✓ Document indexé: {titre} ({len(mots_cles)} mots-clés)")
+            # Les PDF sont lus et indexés page par page
+            if Path(chemin).suffix.lower() == '.pdf':
+                self.indexer_pdf_flux(chemin, titre)
+            else:
+                self.ecrire_document(self.preparer_document(chemin, titre))
             return True
             
         except Exception as e:
@@ -132,6 +584,7 @@ class DocumentIndexer:
             taille = os.path.getsize(chemin)
             titre = titre or Path(chemin).stem
             
+            self.supprimer_contenu(chemin, 'images')
             self.db.cursor.execute('''
                 INSERT OR REPLACE INTO images 
                 (titre, description, chemin_fichier, type_image, taille_octets, alt_text)
@@ -142,16 +595,11 @@ class DocumentIndexer:
             
             # Indexer les mots-clés du titre, description et alt_text
             texte_complet = f"{titre} {description} {alt_text}"
-            mots_cles = self.processor.extraire_avec_positions(texte_complet)
+            postings = agreger_colonnes(self.processor.traiter_lot([texte_complet]), 0)
             
-            for item in mots_cles:
-                self.db.cursor.execute('''
-                    INSERT INTO index_mots_cles 
-                    (mot_cle, racine, img_id, position_texte)
-                    VALUES (?, ?, ?, ?)
-                ''', (item['mot'], item['racine'], img_id, item['position']))
-            
-            self.db.conn.commit()
+            nb_postings = self._inserer_postings('img_id', img_id, postings)
+            self._compter_postings('img_id', img_id, postings)
+            self._valider(nb_postings)
             print(f"✓ Image indexée: {titre}")
             return True
             
@@ -170,6 +618,7 @@ class DocumentIndexer:
             taille = os.path.getsize(chemin)
             titre = titre or Path(chemin).stem
             
+            self.supprimer_contenu(chemin, 'videos')
             self.db.cursor.execute('''
                 INSERT OR REPLACE INTO videos 
                 (titre, description, chemin_fichier, type_video, duree_secondes, taille_octets)
@@ -180,16 +629,11 @@ class DocumentIndexer:
             
             # Indexer les mots-clés du titre et description
             texte_complet = f"{titre} {description}"
-            mots_cles = self.processor.extraire_avec_positions(texte_complet)
-            
-            for item in mots_cles:
-                self.db.cursor.execute('''
-                    INSERT INTO index_mots_cles 
-                    (mot_cle, racine, video_id, position_texte)
-                    VALUES (?, ?, ?, ?)
-                ''', (item['mot'], item['racine'], video_id, item['position']))
+            postings = agreger_colonnes(self.processor.traiter_lot([texte_complet]), 0)
             
-            self.db.conn.commit()
+            nb_postings = self._inserer_postings('video_id', video_id, postings)
+            self._compter_postings('video_id', video_id, postings)
+            self._valider(nb_postings)
             print(f"✓ Vidéo indexée: {titre}")
             return True
             
@@ -197,52 +641,219 @@ class DocumentIndexer:
             print(f"❌ Erreur indexation vidéo {chemin}: {e}")
             return False
     
-    def indexer_dossier(self, dossier_corpus):
-        """Indexer tous les fichiers d'un dossier"""
+    def indexer_dossier(self, dossier_corpus, bulk=False, taille_transaction=None,
+                        workers=1, taille_file=None, incremental=False, filtre=None):
+        """
+        Indexer tous les fichiers d'un dossier
+        
+        Args:
+            dossier_corpus: Dossier à parcourir récursivement
+            bulk: Mode chargement en masse (grosses transactions, index
+                  secondaires reconstruits à la fin)
+            taille_transaction: Nombre de postings par transaction en mode bulk
+            workers: Nombre de processus d'extraction (1 = séquentiel)
+            taille_file: Nombre maximal de documents en cours de préparation
+                         (par défaut 2 × workers)
+            incremental: Ne ré-extraire que les fichiers nouveaux ou modifiés
+                         depuis la dernière indexation (voir manifeste.py)
+            filtre: Ne traiter que les fichiers pour lesquels filtre(chemin)
+                    est vrai (part du corpus d'un shard, voir shards.py)
+        """
         if not os.path.exists(dossier_corpus):
             print(f"❌ Dossier introuvable: {dossier_corpus}")
             return
         
-        compteurs = {'docs': 0, 'images': 0, 'videos': 0, 'erreurs': 0}
+        compteurs = {'docs': 0, 'images': 0, 'videos': 0, 'erreurs': 0,
+                     'inchanges': 0, 'supprimes': 0, 'ignores': []}
         
-        for root, dirs, files in os.walk(dossier_corpus):
-            for file in files:
-                chemin = os.path.join(root, file)
-                ext = Path(file).suffix.lower()
-                
-                try:
-                    # Documents
-                    if ext in ['.txt', '.pdf', '.docx', '.html', '.htm']:
-                        if self.indexer_document(chemin):
-                            compteurs['docs'] += 1
-                        else:
-                            compteurs['erreurs'] += 1
-                    
-                    # Images
-                    elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.svg']:
-                        if self.indexer_image(chemin):
-                            compteurs['images'] += 1
-                        else:
-                            compteurs['erreurs'] += 1
-                    
-                    # Vidéos
-                    elif ext in ['.mp4', '.avi', '.mov', '.webm']:
-                        if self.indexer_video(chemin):
-                            compteurs['videos'] += 1
-                        else:
-                            compteurs['erreurs'] += 1
-                
-                except Exception as e:
-                    print(f"❌ Erreur avec {file}: {e}")
-                    compteurs['erreurs'] += 1
+        debut = time.time()
+        postings_debut = self.nb_postings
+        
+        manifeste = ManifesteFichiers(self.db)
+        manifeste.charger()
+        
+        if bulk:
+            self.debut_chargement_bulk(taille_transaction)
+        
+        try:
+            fichiers = self._selectionner_fichiers(dossier_corpus, manifeste, incremental,
+                                                   compteurs, filtre)
+            
+            if workers > 1:
+                indexes = self._parcourir_dossier_parallele(fichiers, compteurs, workers,
+                                                            taille_file or 2 * workers)
+            else:
+                indexes = self._parcourir_dossier(fichiers, compteurs)
+            
+            for chemin, categorie in indexes:
+                manifeste.enregistrer(chemin, categorie, fichiers[chemin][1])
+            self._commit()
+        finally:
+            if bulk:
+                self.fin_chargement_bulk()
+        
+        duree = time.time() - debut
+        compteurs['postings'] = self.nb_postings - postings_debut
+        compteurs['postings_par_seconde'] = compteurs['postings'] / duree if duree > 0 else 0
         
         print("\n📊 Résumé de l'indexation:")
         print(f"  ✓ Documents indexés: {compteurs['docs']}")
         print(f"  ✓ Images indexées: {compteurs['images']}")
         print(f"  ✓ Vidéos indexées: {compteurs['videos']}")
+        if incremental:
+            print(f"  ⏭️  Fichiers inchangés ignorés: {compteurs['inchanges']}")
+        print(f"  🗑️  Fichiers supprimés retirés de l'index: {compteurs['supprimes']}")
         print(f"  ❌ Erreurs: {compteurs['erreurs']}")
+        print(f"  ⏱️  {compteurs['postings']} postings en {duree:.1f} s "
+              f"({compteurs['postings_par_seconde']:.0f} postings/s)")
         
         return compteurs
+    
+    def _selectionner_fichiers(self, dossier_corpus, manifeste, incremental, compteurs,
+                               filtre=None):
+        """
+        Comparer le dossier au manifeste
+        - retire de l'index les fichiers disparus depuis la dernière indexation
+        - en mode incrémental, écarte les fichiers inchangés
+        
+        Returns:
+            Dict chemin -> (categorie, empreinte) des fichiers à indexer
+        """
+        fichiers = {}
+        for chemin, categorie in self.lister_fichiers(dossier_corpus):
+            if filtre and not filtre(chemin):
+                continue
+            etat, empreinte = manifeste.comparer(chemin)
+            if incremental and etat == 'inchange':
+                compteurs['inchanges'] += 1
+                compteurs['ignores'].append(chemin)
+                continue
+            fichiers[chemin] = (categorie, empreinte)
+        
+        # Fichiers du manifeste sous ce dossier qui n'existent plus
+        prefixe = os.path.join(dossier_corpus, '')
+        for chemin, entree in list(manifeste.entrees.items()):
+            if chemin.startswith(prefixe) and not os.path.exists(chemin):
+                self.supprimer_contenu(chemin, entree[3])
+                manifeste.supprimer(chemin)
+                compteurs['supprimes'] += 1
+                print(f"🗑️  Retiré de l'index: {chemin}")
+        
+        return fichiers
+    
+    def categorie_fichier(self, chemin):
+        """Catégorie d'un fichier selon son extension ('docs', 'images', 'videos' ou None)"""
+        ext = Path(chemin).suffix.lower()
+        
+        if ext in self.EXTENSIONS_DOCUMENTS:
+            return 'docs'
+        elif ext in self.EXTENSIONS_IMAGES:
+            return 'images'
+        elif ext in self.EXTENSIONS_VIDEOS:
+            return 'videos'
+        return None
+    
+    def lister_fichiers(self, dossier_corpus):
+        """Parcourir le dossier et produire les couples (chemin, catégorie) indexables"""
+        for root, dirs, files in os.walk(dossier_corpus):
+            for file in files:
+                chemin = os.path.join(root, file)
+                categorie = self.categorie_fichier(chemin)
+                if categorie:
+                    yield chemin, categorie
+    
+    def indexer_fichier(self, chemin, categorie=None):
+        """Indexer un fichier selon sa catégorie"""
+        categorie = categorie or self.categorie_fichier(chemin)
+        
+        if categorie == 'docs':
+            return self.indexer_document(chemin)
+        elif categorie == 'images':
+            return self.indexer_image(chemin)
+        elif categorie == 'videos':
+            return self.indexer_video(chemin)
+        return False
+    
+    def _parcourir_dossier(self, fichiers, compteurs):
+        """
+        Indexer chaque fichier selon son type
+        
+        Args:
+            fichiers: Dict chemin -> (categorie, empreinte)
+        
+        Returns:
+            Liste des (chemin, categorie) indexés avec succès
+        """
+        indexes = []
+        for chemin, (categorie, _) in fichiers.items():
+            try:
+                if self.indexer_fichier(chemin, categorie):
+                    compteurs[categorie] += 1
+                    indexes.append((chemin, categorie))
+                else:
+                    compteurs['erreurs'] += 1
+            
+            except Exception as e:
+                print(f"❌ Erreur avec {chemin}: {e}")
+                compteurs['erreurs'] += 1
+        
+        return indexes
+    
+    def _parcourir_dossier_parallele(self, fichiers, compteurs, workers, taille_file):
+        """
+        Parcourir le dossier en parallèle:
+        - l'extraction et la tokenisation des documents tournent dans un pool de processus
+        - ce processus reste le seul à écrire dans SQLite
+        - au plus `taille_file` documents sont en cours ou en attente d'écriture,
+          pour que la mémoire reste stable sur les gros corpus
+        """
+        en_cours = {}
+        indexes = []
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chemin, (categorie, _) in fichiers.items():
+                # Images et vidéos: pas d'extraction coûteuse, indexées directement
+                if categorie != 'docs':
+                    if self.indexer_fichier(chemin, categorie):
+                        compteurs[categorie] += 1
+                        indexes.append((chemin, categorie))
+                    else:
+                        compteurs['erreurs'] += 1
+                    continue
+                
+                if len(en_cours) >= taille_file:
+                    termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                    self._ecrire_documents_prepares(termines, en_cours, compteurs, indexes)
+                
+                en_cours[pool.submit(_preparer_document_worker, chemin)] = chemin
+            
+            termines, _ = wait(en_cours)
+            self._ecrire_documents_prepares(termines, en_cours, compteurs, indexes)
+        
+        return indexes
+    
+    def _ecrire_documents_prepares(self, termines, en_cours, compteurs, indexes):
+        """Écrire les documents dont la préparation est terminée"""
+        for future in termines:
+            chemin = en_cours.pop(future)
+            try:
+                self.ecrire_document(future.result())
+                compteurs['docs'] += 1
+                indexes.append((chemin, 'docs'))
+            except Exception as e:
+                print(f"❌ Erreur indexation {chemin}: {e}")
+                compteurs['erreurs'] += 1
+
+
+# Indexeur propre à chaque processus de travail (voir _parcourir_dossier_parallele)
+_indexeur_worker = None
+
+def _preparer_document_worker(chemin):
+    """Préparer un document dans un processus de travail"""
+    global _indexeur_worker
+    if _indexeur_worker is None:
+        _indexeur_worker = DocumentIndexer(None)
+    return _indexeur_worker.preparer_document(chemin)
 
 
 # Test du module d'indexation
@@ -258,4 +869,4 @@ if __name__ == "__main__":
     print("\n✓ Module d'indexation prêt à l'emploi")
     print("  Usage: indexer.indexer_dossier('chemin/vers/corpus')")
     
-    db.close()
\ No newline at end of file
+    db.close()
\ No newline at end of file
@@ -8,6 +8,7 @@ print("🔥 FICHIER MAIN.PY CHARGÉ 🔥")
 
 import os
 import sys
+from curseurs import encoder_curseur
 from database_config import DatabaseConfig
 from downloader import ContentDownloader
 from indexer import DocumentIndexer
@@ -48,8 +49,10 @@ def indexer_corpus(db):
         print("💡 Veuillez d'abord télécharger le corpus (option 1)")
         return False
     
-    # Indexer le dossier complet
-    compteurs = indexer.indexer_dossier(corpus_dir)
+    # Indexer le dossier (incrémental: seuls les fichiers nouveaux ou
+    # modifiés sont ré-extraits, extraction parallèle)
+    compteurs = indexer.indexer_dossier(corpus_dir, workers=os.cpu_count() or 1,
+                                        incremental=True)
     
     print("\n✅ Indexation terminée !")
     return compteurs
@@ -214,6 +217,8 @@ def lancer_interface_web():
                     query = data.get('q', '')
                     type_filter = data.get('type', 'all')
                     limit = data.get('limit', 20)
+                    # Début du texte des documents ajouté seulement sur demande
+                    avec_contenu = bool(data.get('contenu', False))
                     
                     if not query:
                         return jsonify({
@@ -221,67 +226,100 @@ def lancer_interface_web():
                             'error': 'Requête vide'
                         }), 400
                     
+                    # Page suivante: 'curseur_suivant' de la page précédente, seuls les
+                    # types dont la page était pleine sont relus
+                    try:
+                        apres = SearchEngine.curseur_simple(data['apres']) if data.get('apres') else {}
+                    except ValueError as e:
+                        return jsonify({
+                            'success': False,
+                            'error': str(e)
+                        }), 400
+                    types = [type_resultat for type_resultat in ['document', 'image', 'video']
+                             if type_filter in ['all', type_resultat] and (not apres or type_resultat in apres)]
+                    
                     db = DatabaseConfig()
                     db.connect()
                     
                     resultats = []
+                    suivants = {}
+                    nb_total_estime = 0
+                    
+                    # Termes de la requête résolus par leur forme pliée (sans accents ni
+                    # majuscules): les contenus sont trouvés par l'index, sans LIKE sur leur texte
+                    # (seuls les titres, non indexés pour les documents, sont comparés par LIKE)
+                    moteur = SearchEngine(db)
+                    ids_mots, ids_racines = moteur.identifiants_termes(query)
                     
                     # Recherche dans les documents
-                    if type_filter in ['all', 'document']:
-                        db.cursor.execute('''
-                            SELECT DISTINCT d.id, d.titre, d.contenu, d.type_doc, d.chemin_fichier
-                            FROM documents d
-                            LEFT JOIN index_mots_cles i ON d.id = i.doc_id
-                            WHERE d.titre LIKE ? OR d.contenu LIKE ? OR i.mot_cle LIKE ?
-                            LIMIT ?
-                        ''', (f'%{query}%', f'%{query}%', f'%{query}%', limit))
+                    if 'document' in types:
+                        lignes, nb_total = moteur.page_simple(
+                            'document', 'id, titre, type_doc, chemin_fichier',
+                            ids_mots, ids_racines, limit, apres.get('document'), titre=query)
+                        nb_total_estime += nb_total
+                        if lignes and len(lignes) == limit:
+                            suivants['document'] = [lignes[-1][-1], lignes[-1][0]]
+                        
+                        # Extraits lus autour des mots trouvés, sans charger le texte entier
+                        ids_documents = [row[0] for row in lignes]
+                        extraits = moteur.extraits_documents(query, ids_documents)
+                        debuts = moteur.extraits.debuts(ids_documents) if avec_contenu else {}
                         
-                        for row in db.cursor.fetchall():
-                            resultats.append({
+                        for row in lignes:
+                            extrait, surlignages = extraits.get(row[0], ("", []))
+                            resultat = {
                                 'id': row[0],
                                 'titre': row[1],
-                                'contenu': row[2],
-                                'type_doc': row[3] or 'document',
-                                'chemin_fichier': row[4]
-                            })
+                                'extrait': extrait,
+                                'surlignages': surlignages,
+                                'type_doc': row[2] or 'document',
+                                'chemin_fichier': row[3]
+                            }
+                            if avec_contenu:
+                                resultat['contenu'] = debuts.get(row[0]) or ""
+                            resultats.append(resultat)
                     
                     # Recherche dans les images
-                    if type_filter in ['all', 'image']:
-                        db.cursor.execute('''
-                            SELECT DISTINCT i.id, i.titre, i.description, i.type_image, i.chemin_fichier
-                            FROM images i
-                            LEFT JOIN index_mots_cles idx ON i.id = idx.img_id
-                            WHERE i.titre LIKE ? OR i.description LIKE ? OR i.alt_text LIKE ? OR idx.mot_cle LIKE ?
-                            LIMIT ?
-                        ''', (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%', limit))
+                    if 'image' in types:
+                        lignes, nb_total = moteur.page_simple(
+                            'image', 'id, titre, description, type_image, chemin_fichier',
+                            ids_mots, ids_racines, limit, apres.get('image'), titre=query)
+                        nb_total_estime += nb_total
+                        if lignes and len(lignes) == limit:
+                            suivants['image'] = [lignes[-1][-1], lignes[-1][0]]
                         
-                        for row in db.cursor.fetchall():
-                            resultats.append({
+                        for row in lignes:
+                            resultat = {
                                 'id': row[0],
                                 'titre': row[1],
-                                'contenu': row[2],
+                                'extrait': row[2] or "",
                                 'type_doc': 'image',
                                 'chemin_fichier': row[4]
-                            })
+                            }
+                            if avec_contenu:
+                                resultat['contenu'] = row[2]
+                            resultats.append(resultat)
                     
                     # Recherche dans les vidéos
-                    if type_filter in ['all', 'video']:
-                        db.cursor.execute('''
-                            SELECT DISTINCT v.id, v.titre, v.description, v.type_video, v.chemin_fichier
-                            FROM videos v
-                            LEFT JOIN index_mots_cles idx ON v.id = idx.video_id
-                            WHERE v.titre LIKE ? OR v.description LIKE ? OR idx.mot_cle LIKE ?
-                            LIMIT ?
-                        ''', (f'%{query}%', f'%{query}%', f'%{query}%', limit))
+                    if 'video' in types:
+                        lignes, nb_total = moteur.page_simple(
+                            'video', 'id, titre, description, type_video, chemin_fichier',
+                            ids_mots, ids_racines, limit, apres.get('video'), titre=query)
+                        nb_total_estime += nb_total
+                        if lignes and len(lignes) == limit:
+                            suivants['video'] = [lignes[-1][-1], lignes[-1][0]]
                         
-                        for row in db.cursor.fetchall():
-                            resultats.append({
+                        for row in lignes:
+                            resultat = {
                                 'id': row[0],
                                 'titre': row[1],
-                                'contenu': row[2],
+                                'extrait': row[2] or "",
                                 'type_doc': 'video',
                                 'chemin_fichier': row[4]
-                            })
+                            }
+                            if avec_contenu:
+                                resultat['contenu'] = row[2]
+                            resultats.append(resultat)
                     
                     # Enregistrer la statistique de recherche
                     db.cursor.execute('''
@@ -296,6 +334,8 @@ def lancer_interface_web():
                         'success': True,
                         'resultats': resultats,
                         'nb_resultats': len(resultats),
+                        'nb_total_estime': nb_total_estime,
+                        'curseur_suivant': encoder_curseur(suivants) if suivants else None,
                         'requete': query
                     })
                     
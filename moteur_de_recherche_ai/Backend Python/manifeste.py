@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+
+def calculer_empreinte(chemin, taille_bloc=1024 * 1024):
+    """Calculer l'empreinte SHA-256 du contenu d'un fichier"""
+    empreinte = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+class ManifesteFichiers:
+    """
+    Manifeste des fichiers indexés (table manifeste_fichiers)
+    Mémorise taille, date de modification et empreinte de chaque fichier
+    pour ne ré-extraire que les fichiers modifiés
+    """
+
+    def __init__(self, db_config):
+        self.db = db_config
+        self.entrees = {}
+
+    def charger(self):
+        """Charger le manifeste en mémoire: chemin -> (taille, mtime, empreinte, categorie)"""
+        self.db.cursor.execute('''
+            SELECT chemin, taille, mtime, empreinte, categorie
+            FROM manifeste_fichiers
+        ''')
+        self.entrees = {row[0]: row[1:] for row in self.db.cursor.fetchall()}
+        return self.entrees
+
+    def comparer(self, chemin):
+        """
+        Comparer un fichier avec son entrée du manifeste
+
+        L'empreinte n'est calculée que si la taille ou la date de
+        modification ont changé: un corpus inchangé se vérifie sans lecture
+
+        Returns:
+            (etat, empreinte) avec etat parmi 'nouveau', 'modifie', 'inchange'
+        """
+        stat = os.stat(chemin)
+        entree = self.entrees.get(chemin)
+
+        if entree and entree[0] == stat.st_size and entree[1] == stat.st_mtime:
+            return 'inchange', entree[2]
+
+        empreinte = calculer_empreinte(chemin)
+
+        if entree is None:
+            return 'nouveau', empreinte
+        if entree[2] == empreinte:
+            # Contenu identique (fichier touché ou copié): mettre à jour la date
+            self.enregistrer(chemin, entree[3], empreinte)
+            return 'inchange', empreinte
+        return 'modifie', empreinte
+
+    def enregistrer(self, chemin, categorie, empreinte=None):
+        """Enregistrer (ou mettre à jour) l'entrée d'un fichier indexé"""
+        stat = os.stat(chemin)
+        empreinte = empreinte or calculer_empreinte(chemin)
+
+        self.db.cursor.execute('''
+            INSERT OR REPLACE INTO manifeste_fichiers
+            (chemin, taille, mtime, empreinte, categorie)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (chemin, stat.st_size, stat.st_mtime, empreinte, categorie))
+        self.entrees[chemin] = (stat.st_size, stat.st_mtime, empreinte, categorie)
+
+    def supprimer(self, chemin):
+        """Retirer un fichier du manifeste"""
+        self.db.cursor.execute('DELETE FROM manifeste_fichiers WHERE chemin = ?', (chemin,))
+        self.entrees.pop(chemin, None)
@@ -0,0 +1,245 @@
+import heapq
+from bisect import bisect_left
+from collections import Counter
+
+
+def encoder_positions(positions, precedente=0):
+    """
+    Encoder une liste de positions croissantes en blob compact
+    Chaque position est stockée comme l'écart avec la précédente, en varint
+    (7 bits par octet, bit de poids fort = octet suivant)
+
+    Args:
+        positions: Positions triées par ordre croissant
+        precedente: Dernière position déjà encodée (pour prolonger un blob existant)
+    """
+    blob = bytearray()
+    for position in positions:
+        ecart = position - precedente
+        precedente = position
+        while ecart >= 0x80:
+            blob.append((ecart & 0x7F) | 0x80)
+            ecart >>= 7
+        blob.append(ecart)
+    return bytes(blob)
+
+
+def decoder_positions(blob):
+    """Décoder un blob produit par encoder_positions en liste de positions"""
+    positions = []
+    if not blob:
+        return positions
+
+    position = 0
+    ecart = 0
+    decalage = 0
+    for octet in blob:
+        ecart |= (octet & 0x7F) << decalage
+        if octet & 0x80:
+            decalage += 7
+        else:
+            position += ecart
+            positions.append(position)
+            ecart = 0
+            decalage = 0
+    return positions
+
+
+class AccumulateurPostings:
+    """
+    Accumulateur de postings pour l'indexation incrémentale d'un contenu
+    (par exemple page par page)
+
+    Les positions sont encodées au fil de l'eau: la mémoire occupée est
+    celle des blobs compactés, pas celle des listes de dicts par occurrence.
+    vider() rend les postings accumulés sous forme de segments qui
+    prolongent les blobs déjà vidés (concaténation valide)
+
+    frequences_racines cumule les occurrences de chaque racine sur tout le
+    contenu (non remis à zéro par vider, voir statistiques.py)
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.frequences = {}
+        self.frequences_racines = Counter()
+        self.dernieres_positions = {}
+        self.taille = 0
+
+    def ajouter(self, mots_cles):
+        """Ajouter des occurrences (dicts {'mot', 'racine', 'position'}, positions croissantes)"""
+        for item in mots_cles:
+            cle = (item['mot'], item['racine'])
+            precedente = self.dernieres_positions.get(cle, 0)
+            segment = encoder_positions([item['position']], precedente)
+            self.dernieres_positions[cle] = item['position']
+
+            if cle in self.blobs:
+                self.blobs[cle] += segment
+                self.frequences[cle] += 1
+            else:
+                self.blobs[cle] = bytearray(segment)
+                self.frequences[cle] = 1
+            self.taille += len(segment)
+
+    def vider(self):
+        """
+        Rendre les postings accumulés depuis le dernier vidage
+
+        Returns:
+            Liste de tuples (mot, racine, frequence, blob_positions)
+        """
+        postings = [
+            (mot, racine, self.frequences[(mot, racine)], bytes(blob))
+            for (mot, racine), blob in self.blobs.items()
+        ]
+        for (_, racine), frequence in self.frequences.items():
+            self.frequences_racines[racine] += frequence
+        self.blobs = {}
+        self.frequences = {}
+        self.taille = 0
+        return postings
+
+
+def agreger_postings(mots_cles):
+    """
+    Regrouper les occurrences d'un contenu par terme
+
+    Args:
+        mots_cles: Liste de dicts {'mot', 'racine', 'position'}
+                   (sortie de TextProcessor.extraire_avec_positions)
+
+    Returns:
+        Liste de tuples (mot, racine, frequence, blob_positions)
+    """
+    accumulateur = AccumulateurPostings()
+    accumulateur.ajouter(mots_cles)
+    return accumulateur.vider()
+
+
+def agreger_colonnes(colonnes, indice):
+    """
+    Regrouper par terme les occurrences d'un document d'un lot colonnaire
+    Même résultat que agreger_postings sur extraire_avec_positions du texte
+
+    Args:
+        colonnes: Sortie de TextProcessor.traiter_lot()
+        indice: Rang du document dans le lot
+
+    Returns:
+        Liste de tuples (mot, racine, frequence, blob_positions)
+    """
+    ids_termes, _, positions = colonnes.documents[indice]
+    positions_par_terme = {}
+    for id_terme, position in zip(ids_termes, positions):
+        if id_terme in positions_par_terme:
+            positions_par_terme[id_terme].append(position)
+        else:
+            positions_par_terme[id_terme] = [position]
+
+    return [
+        (colonnes.termes[id_terme], colonnes.racines[colonnes.racine_du_terme[id_terme]],
+         len(liste), encoder_positions(liste))
+        for id_terme, liste in positions_par_terme.items()
+    ]
+
+
+def positions_fusionnees(blobs):
+    """Positions triées de plusieurs postings d'un même contenu (variantes d'un mot)"""
+    if len(blobs) == 1:
+        return decoder_positions(blobs[0])
+    return list(heapq.merge(*(decoder_positions(blob) for blob in blobs)))
+
+
+def occurrences_phrase(listes, decalages):
+    """
+    Compter les occurrences d'une phrase en fusionnant les listes de positions
+
+    La liste la plus courte sert de pivot; un curseur avance (par dichotomie)
+    dans chacune des autres, sans jamais revenir en arrière
+
+    Args:
+        listes: Positions triées de chaque mot de la phrase
+        decalages: Rang de chaque mot dans la phrase. Les mots vides ne sont
+                   pas indexés et laissent un trou (réseaux de neurones -> 0, 2)
+    """
+    if not listes or not all(listes):
+        return 0
+
+    ordre = sorted(range(len(listes)), key=lambda k: len(listes[k]))
+    pivot, autres = ordre[0], ordre[1:]
+    curseurs = [0] * len(listes)
+    nb = 0
+    for position in listes[pivot]:
+        debut = position - decalages[pivot]
+        for k in autres:
+            cible = debut + decalages[k]
+            i = curseurs[k] = bisect_left(listes[k], cible, curseurs[k])
+            if i == len(listes[k]):
+                return nb
+            if listes[k][i] != cible:
+                break
+        else:
+            nb += 1
+    return nb
+
+
+def fenetre_minimale(listes):
+    """
+    Taille (en tokens) de la plus petite fenêtre contenant une position de
+    chaque liste, par fusion des listes triées avec un tas
+
+    Returns:
+        Taille de la fenêtre, None si une liste est vide
+    """
+    if not listes or not all(listes):
+        return None
+
+    tas = [(liste[0], k, 0) for k, liste in enumerate(listes)]
+    heapq.heapify(tas)
+    maximum = max(liste[0] for liste in listes)
+    meilleure = maximum - tas[0][0] + 1
+    while True:
+        _, k, i = tas[0]
+        if i + 1 == len(listes[k]):
+            return meilleure
+        suivante = listes[k][i + 1]
+        heapq.heapreplace(tas, (suivante, k, i + 1))
+        maximum = max(maximum, suivante)
+        meilleure = min(meilleure, maximum - tas[0][0] + 1)
+
+
+def meilleure_fenetre(listes, taille):
+    """
+    Début de la fenêtre de `taille` tokens contenant le plus de mots
+    distincts (puis le plus d'occurrences), par fusion des listes triées
+
+    Args:
+        listes: Positions triées de chaque mot
+
+    Returns:
+        Position de la première occurrence de la fenêtre, None si toutes les listes sont vides
+    """
+    occurrences = list(heapq.merge(*([(position, k) for position in liste]
+                                     for k, liste in enumerate(listes))))
+    if not occurrences:
+        return None
+
+    comptes = [0] * len(listes)
+    distincts = 0
+    debut = 0
+    meilleure, position_meilleure = None, None
+    for fin, (position, k) in enumerate(occurrences):
+        if comptes[k] == 0:
+            distincts += 1
+        comptes[k] += 1
+        while occurrences[debut][0] <= position - taille:
+            k_debut = occurrences[debut][1]
+            comptes[k_debut] -= 1
+            if comptes[k_debut] == 0:
+                distincts -= 1
+            debut += 1
+        cle = (distincts, fin - debut + 1)
+        if meilleure is None or cle > meilleure:
+            meilleure, position_meilleure = cle, occurrences[debut][0]
+    return position_meilleure
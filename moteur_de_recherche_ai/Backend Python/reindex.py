@@ -1,35 +1,89 @@
 from database_config import DatabaseConfig
 from indexer import DocumentIndexer
+from segments import GestionnaireSegments
+from shards import IndexPartitionne
+from index_mappe import IndexMappe, construire_index_mappe
+import argparse
 import os
 
-print("🔄 Réindexation des documents...")
-
-# Connexion à la base
-db = DatabaseConfig()
-db.connect()
-db.create_tables()
-
-# Créer l'indexeur
-indexer = DocumentIndexer(db)
-
-# Chemin du dossier corpus
-corpus_path = os.path.join(os.path.dirname(__file__), 'corpus')  # ← Corrigé ici
-
-if os.path.exists(corpus_path):
-    print(f"📂 Indexation du dossier: {corpus_path}")
-    compteurs = indexer.indexer_dossier(corpus_path)
-    print("\n✅ Indexation terminée !")
-    print(f"   - Documents indexés: {compteurs.get('documents', 0)}")
-    print(f"   - Images: {compteurs.get('images', 0)}")
-    print(f"   - Vidéos: {compteurs.get('videos', 0)}")
-    
-    # Afficher les nouvelles stats
-    stats = db.get_stats()
-    print("\n📊 Statistiques de la base:")
-    for key, value in stats.items():
-        print(f"   - {key}: {value}")
-else:
-    print(f"❌ Dossier corpus introuvable: {corpus_path}")
-    print("💡 Créez un dossier 'corpus' et placez-y vos documents à indexer")
-
-db.close()
\ No newline at end of file
+
+def main():
+    parser = argparse.ArgumentParser(description="Réindexation du corpus")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus d'extraction (1 = séquentiel)")
+    parser.add_argument('--taille-file', type=int, default=None,
+                        help="Nombre maximal de documents en cours de préparation")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Ne ré-extraire que les fichiers nouveaux ou modifiés")
+    parser.add_argument('--segments', action='store_true',
+                        help="Écrire les postings dans l'index segmenté (dossier segments/)")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Répartir l'index entre N bases (un processus par shard)")
+    parser.add_argument('--index-mappe', action='store_true',
+                        help="Reconstruire l'index projeté en mémoire servi par app.py")
+    args = parser.parse_args()
+
+    print("🔄 Réindexation des documents...")
+
+    # Connexion à la base
+    db = DatabaseConfig()
+    db.connect()
+    db.create_tables()
+
+    # Créer l'indexeur
+    segments = GestionnaireSegments() if args.segments else None
+    indexer = DocumentIndexer(db, segments=segments)
+
+    # Chemin du dossier corpus
+    corpus_path = os.path.join(os.path.dirname(__file__), 'corpus')  # ← Corrigé ici
+
+    if os.path.exists(corpus_path) and args.shards:
+        print(f"📂 Indexation du dossier: {corpus_path} ({args.shards} shards)")
+        index = IndexPartitionne.creer(args.shards)
+        compteurs = index.indexer_dossier(corpus_path, incremental=args.incremental)
+        print("\n✅ Indexation terminée !")
+        print(f"   - Documents indexés: {compteurs.get('docs', 0)}")
+        print(f"   - Images: {compteurs.get('images', 0)}")
+        print(f"   - Vidéos: {compteurs.get('videos', 0)}")
+
+        print("\n📊 Statistiques des shards:")
+        for key, value in index.get_stats().items():
+            print(f"   - {key}: {value}")
+    elif os.path.exists(corpus_path):
+        print(f"📂 Indexation du dossier: {corpus_path} ({args.workers} processus)")
+        compteurs = indexer.indexer_dossier(corpus_path, bulk=not args.incremental,
+                                            workers=args.workers,
+                                            taille_file=args.taille_file,
+                                            incremental=args.incremental)
+        print("\n✅ Indexation terminée !")
+        print(f"   - Documents indexés: {compteurs.get('docs', 0)}")
+        print(f"   - Images: {compteurs.get('images', 0)}")
+        print(f"   - Vidéos: {compteurs.get('videos', 0)}")
+        if args.incremental:
+            print(f"   - Inchangés (ignorés): {compteurs.get('inchanges', 0)}")
+        print(f"   - Supprimés: {compteurs.get('supprimes', 0)}")
+
+        if segments:
+            segments.fusionner_selon_politique()
+            print(f"   - Segments: {segments.stats()['nb_segments']}")
+
+        # L'index mappé est un instantané de index_mots_cles (pas des segments)
+        if args.index_mappe and not segments:
+            nb_postings = construire_index_mappe(db, IndexMappe.FICHIER)
+            print(f"   - Index mappé: {IndexMappe.FICHIER} ({nb_postings} postings)")
+
+        # Afficher les nouvelles stats
+        stats = db.get_stats()
+        print("\n📊 Statistiques de la base:")
+        for key, value in stats.items():
+            print(f"   - {key}: {value}")
+    else:
+        print(f"❌ Dossier corpus introuvable: {corpus_path}")
+        print("💡 Créez un dossier 'corpus' et placez-y vos documents à indexer")
+
+    db.close()
+
+
+# Le point d'entrée protégé est nécessaire pour le pool de processus (Windows)
+if __name__ == "__main__":
+    main()
\ No newline at end of file
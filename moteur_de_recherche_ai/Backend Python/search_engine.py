@@ -1,84 +1,504 @@
+import heapq
+import math
+import re
 import time
+from correction import IndexCorrection
+from curseurs import decoder_curseur, encoder_curseur
 from database_config import DatabaseConfig
-from text_processor import TextProcessor
+from extraits import ExtraitsDocuments, correspondance_requete, surlignages
+from postings import fenetre_minimale, meilleure_fenetre, occurrences_phrase, positions_fusionnees
+from text_processor import MOT_REGEX, TextProcessor, plier
+from termes import DictionnaireTermes
+from statistiques import StatistiquesCorpus
+from synonymes import DictionnaireSynonymes
+
+# Phrase exacte: texte entre guillemets droits ou français
+PHRASE_REGEX = re.compile(r'"([^"]+)"|«([^»]+)»')
 
 class SearchEngine:
     """Moteur de recherche pour interroger la base de données"""
     
-    def __init__(self, db_config):
+    # Colonne de index_mots_cles de chaque type de résultat
+    COLONNES_TYPES = {'document': 'doc_id', 'image': 'img_id', 'video': 'video_id'}
+    
+    # Rang de chaque type: départage les ex aequo (voir _cle_resultat)
+    RANGS_TYPES = {type_resultat: rang for rang, type_resultat in enumerate(COLONNES_TYPES)}
+    
+    # Table et colonnes lues pour les résultats de chaque type
+    TABLES_TYPES = {
+        'document': ('documents', 'id, titre, type_doc, chemin_fichier'),
+        'image': ('images', 'id, titre, description, type_image, chemin_fichier, alt_text'),
+        'video': ('videos', 'id, titre, description, type_video, chemin_fichier, duree_secondes'),
+    }
+    
+    # Bonus de proximité: score multiplié par 1 + POIDS_PROXIMITE * n / fenêtre
+    # (n mots de la requête, fenêtre: plus petit passage les contenant tous, en tokens)
+    POIDS_PROXIMITE = 1.0
+    
+    # Extrait d'un document: passage autour de la fenêtre de FENETRE_EXTRAIT
+    # tokens contenant le plus de mots de la requête
+    FENETRE_EXTRAIT = 30
+    
+    # Classements disponibles: BM25, ou somme des occurrences (classement d'origine)
+    CLASSEMENTS = ['bm25', 'frequences']
+    
+    # Paramètres BM25: saturation de la fréquence (K1), normalisation par la longueur (B)
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    
+    # Top-k BM25 par élagage dynamique (MaxScore, voir _top_bm25);
+    # False: tous les contenus trouvés sont notés
+    ELAGAGE_BM25 = True
+    
+    # Mots de la requête absents de l'index remplacés par la forme indexée
+    # la plus proche (voir correction.py); False: requête prise telle quelle
+    CORRECTION = True
+    
+    def __init__(self, db_config, segments=None, shards=None, classement='bm25', index_mappe=None,
+                 cache=None, prefixes=None, synonymes=None):
         self.db = db_config
         self.processor = TextProcessor()
+        
+        if classement not in self.CLASSEMENTS:
+            raise ValueError(f"Classement inconnu: {classement} (choix: {', '.join(self.CLASSEMENTS)})")
+        self.classement = classement
+        
+        # Index segmenté (voir segments.py): remplace index_mots_cles s'il est fourni
+        self.segments = segments
+        
+        # Index partitionné (voir shards.py): les shards remplacent cette base
+        # pour les contenus; les statistiques de recherche restent dans db_config
+        self.shards = shards
+        
+        # Index projeté en mémoire (voir index_mappe.py): termes, statistiques,
+        # postings et métadonnées lus dans le fichier, sans requête SQL
+        self.index_mappe = index_mappe
+        
+        self._termes = index_mappe
+        self._statistiques = index_mappe
+        self._correction = None
+        
+        # Cache des résultats partagé entre requêtes (voir cache_resultats.py)
+        self.cache = cache
+        
+        # Index des préfixes de l'autocomplétion partagé entre requêtes (voir autocompletion.py)
+        self.prefixes = prefixes
+        
+        # Dictionnaire des synonymes (voir synonymes.py), par défaut celui
+        # du fichier livré, partagé par le processus et rechargé à chaud
+        self.synonymes = synonymes if synonymes is not None else DictionnaireSynonymes.partage()
+        
+        # Extraits lus dans le texte des documents de cette base (voir extraits.py)
+        self.extraits = ExtraitsDocuments(db_config)
+        
+        # Numéro du shard de cette base: départage les ex aequo de shards différents
+        self.numero_shard = 0
     
-    def normalize_query(self, query):
-        """Normalise les requêtes AI/ML pour inclure les synonymes"""
-        query_lower = query.lower().strip()
-        
-        # Dictionnaire des termes équivalents
-        ai_ml_terms = {
-            'ai': ['intelligence artificielle', 'artificial intelligence', 'ai', 'ia'],
-            'ia': ['intelligence artificielle', 'artificial intelligence', 'ai', 'ia'],
-            'ml': ['machine learning', 'apprentissage automatique', 'ml'],
-            'ai&ml' :['machine learning' , 'intelligence artificielle' ,'machine learning et intelligence artificielle'],
-            'deep learning': ['deep learning', 'apprentissage profond'],
-            'neural': ['neural network', 'réseau de neurones', 'neural'],
-            'tensorflow': ['tensorflow', 'tensor flow'],
-            'pytorch': ['pytorch', 'py torch'],
-            'nlp': ['natural language processing', 'traitement du langage naturel', 'nlp'],
-            'cnn': ['convolutional neural network', 'réseau de neurones convolutif', 'cnn'],
-            'rnn': ['recurrent neural network', 'réseau de neurones récurrent', 'rnn'],
-            'data science': ['data science', 'science des données'],
-            'algorithm': ['algorithm', 'algorithme'],
-            'model': ['model', 'modèle', 'modelling', 'modélisation']
-        }
+    @property
+    def termes(self):
+        """Dictionnaire des termes de la base (miroir en mémoire partagé)"""
+        if self._termes is None:
+            self._termes = DictionnaireTermes(self.db)
+        return self._termes
+    
+    @property
+    def statistiques(self):
+        """Statistiques BM25 de la base (tenues à jour par l'indexeur)"""
+        if self._statistiques is None:
+            self._statistiques = StatistiquesCorpus(self.db)
+        return self._statistiques
+    
+    @property
+    def correction(self):
+        """Index des fautes de frappe de la base"""
+        if self._correction is None:
+            self._correction = IndexCorrection(self.db)
+        return self._correction
+    
+    def _identifiants_requete(self, mots, racines, synonymes=None):
+        """
+        Identifiants des termes indexés correspondant aux mots et racines
+        de la requête, comparés par forme pliée (accents et casse ignorés),
+        racines de leurs synonymes comprises
+        """
+        ids_mots, ids_racines = set(), set()
+        for termes_mot, racines_mot in self._identifiants_par_mot(mots, racines):
+            ids_mots |= termes_mot
+            ids_racines |= racines_mot
+        for racines_synonymes in self._racines_synonymes(synonymes).values():
+            ids_racines.update(racines_synonymes)
+        return sorted(ids_mots), sorted(ids_racines)
+    
+    def _identifiants_par_mot(self, mots, racines):
+        """
+        Identifiants (termes, racines) de chaque mot de la requête
+        
+        La racine d'un mot sans accents peut différer de celle de sa forme
+        accentuée (donnees -> donnee, données -> donn): les racines des
+        variantes indexées sont ajoutées à celle du mot
+        """
+        par_mot = []
+        for mot, racine in zip(mots, racines):
+            variantes = self.termes.variantes_pliees([mot])
+            racines_mot = {racine}
+            for _, texte in variantes:
+                racine_variante = self.processor._analyser_token(texte)
+                if racine_variante is not None:
+                    racines_mot.add(racine_variante)
+            par_mot.append(({id_terme for id_terme, _ in variantes},
+                            set(self.termes.identifiants_plies(racines_mot))))
+        return par_mot
+    
+    def _racines_synonymes(self, synonymes):
+        """
+        Identifiants des racines des synonymes de chaque mot de la requête
+        
+        Args:
+            synonymes: Liste (une par mot) de (mot, racine, poids), voir _plan_requete
         
-        # Si la requête correspond à un terme AI/ML, retourner tous les synonymes
-        for key, terms in ai_ml_terms.items():
-            if query_lower == key:
-                return ' '.join(terms)  # Joindre tous les termes avec des espaces
+        Returns:
+            Dict indice du mot -> {racine_id: poids} (mots ayant des synonymes)
+        """
+        if not synonymes or not any(synonymes):
+            return {}
+        ids_par_forme = {}
+        racines = {racine for synonymes_mot in synonymes for _, racine, _ in synonymes_mot}
+        for id_terme, texte in self.termes.variantes_pliees(racines):
+            ids_par_forme.setdefault(plier(texte), []).append(id_terme)
         
-        return query  # Retourner la requête originale si pas de correspondance
+        par_mot = {}
+        for k, synonymes_mot in enumerate(synonymes):
+            for _, racine, poids in synonymes_mot:
+                poids_mot = par_mot.setdefault(k, {})
+                for racine_id in ids_par_forme.get(plier(racine), ()):
+                    poids_mot[racine_id] = max(poids_mot.get(racine_id, 0), poids)
+        return par_mot
     
-    def rechercher(self, requete, type_contenu='all', limit=20):
-        """Recherche principale"""
-        debut = time.time()
+    def _racines_ponderees(self, mots, racines, synonymes=None):
+        """
+        Racines de chaque mot de la requête (voir _identifiants_par_mot) avec
+        leur poids: 1 pour les siennes, celui du synonyme pour les racines
+        de ses synonymes (le plus grand si plusieurs)
+        
+        Returns:
+            Liste (une par mot) de dicts racine_id -> poids
+        """
+        par_synonymes = self._racines_synonymes(synonymes)
+        ponderees = []
+        for k, (_, racines_mot) in enumerate(self._identifiants_par_mot(mots, racines)):
+            poids_mot = dict(par_synonymes.get(k, {}))
+            poids_mot.update(dict.fromkeys(racines_mot, 1.0))
+            ponderees.append(poids_mot)
+        return ponderees
+    
+    def _candidats_correction(self, mots, racines):
+        """
+        Corrections possibles des mots de la requête absents de cette base
+        (aucune variante indexée, racine d'aucun contenu): formes indexées
+        les plus proches encore présentes dans au moins un contenu
+        
+        Returns:
+            Dict mot absent -> liste de (distance, nb_contenus, texte), toutes
+            à la plus petite distance trouvée (liste vide si aucune)
+        """
+        absents = {}
+        for mot, (termes_mot, racines_mot) in zip(mots, self._identifiants_par_mot(mots, racines)):
+            if termes_mot or mot in absents or self._nb_contenus_racines(racines_mot):
+                continue
+            
+            absents[mot] = []
+            for distance, formes in self.correction.plus_proches(mot):
+                for forme in formes:
+                    # Forme de surface indexée (la plus ancienne des variantes pliées)
+                    variantes = self.termes.variantes_pliees([forme])
+                    racine = self.processor._analyser_token(variantes[0][1]) if variantes else None
+                    if racine is None:
+                        continue
+                    nb_contenus = self._nb_contenus_racines(self.termes.identifiants_plies([racine]))
+                    if nb_contenus > 0:
+                        absents[mot].append((distance, nb_contenus, variantes[0][1]))
+                if absents[mot]:
+                    break
+        return absents
+    
+    def _nb_contenus_racines(self, ids_racines):
+        """Nombre de contenus contenant l'une des racines (somme par racine)"""
+        return sum(stats[0] for stats in self.statistiques.racines(ids_racines).values())
+    
+    def _corriger(self, mots, racines):
+        """
+        Correction des mots de la requête absents de l'index: forme indexée
+        la plus proche, puis la plus fréquente (nombre de contenus)
+        Un mot n'est corrigé que s'il est absent de tous les shards
         
-        # AJOUT : Normaliser la requête pour les termes AI/ML
-        requete_normalisee = self.normalize_query(requete)
+        Returns:
+            Dict mot -> forme corrigée
+        """
+        if self.shards is None:
+            candidats = self._candidats_correction(mots, racines)
+        else:
+            par_shard = self.shards.executer(
+                lambda db, numero: SearchEngine(db)._candidats_correction(mots, racines))
+            candidats = {}
+            for mot in set.intersection(*(set(absents) for absents in par_shard)):
+                nb_par_forme = {}
+                for absents in par_shard:
+                    for distance, nb_contenus, texte in absents[mot]:
+                        cle = (distance, texte)
+                        nb_par_forme[cle] = nb_par_forme.get(cle, 0) + nb_contenus
+                candidats[mot] = [(distance, nb, texte) for (distance, texte), nb in nb_par_forme.items()]
         
-        # Traiter la requête normalisée
-        mots_requete = self.processor.extraire_mots_cles(requete_normalisee, min_freq=1)
+        return {mot: min(formes, key=lambda c: (c[0], -c[1], c[2]))[2]
+                for mot, formes in candidats.items() if formes}
+    
+    def extraire_phrases(self, requete):
+        """
+        Phrases exactes de la requête (entre guillemets)
         
-        if not mots_requete:
-            return {
-                'resultats': [],
-                'temps_ms': 0,
-                'nb_total': 0,
-                'requete_traitee': []
-            }
+        Returns:
+            Liste de (mots indexables, rang de chaque mot dans la phrase);
+            les mots vides ne sont pas indexés et laissent un trou
+        """
+        phrases = []
+        for correspondance in PHRASE_REGEX.finditer(requete):
+            texte = correspondance.group(1) or correspondance.group(2)
+            mots, decalages = [], []
+            for rang, token in enumerate(self.processor.tokeniser(texte)):
+                if self.processor._analyser_token(token) is not None:
+                    mots.append(token)
+                    decalages.append(rang)
+            if mots:
+                phrases.append((mots, decalages))
+        return phrases
+    
+    def identifiants_termes(self, requete):
+        """
+        Identifiants (mots, racines) des termes indexés d'une requête brute
+        Sert aux recherches simples des serveurs API: les contenus sont
+        trouvés par l'index des termes, sans parcourir leur texte
+        """
+        mots_requete = self.processor.extraire_mots_cles(requete, min_freq=1)
+        return self._identifiants_requete([m[0] for m in mots_requete],
+                                          [m[1] for m in mots_requete])
+    
+    def extraits_documents(self, requete, ids_documents):
+        """
+        Extraits de documents pour une requête brute, avec les plages des
+        mots surlignés (recherches simples des serveurs API)
+        
+        Returns:
+            Dict doc_id -> (extrait, surlignages)
+        """
+        mots_requete = self.processor.extraire_mots_cles(requete, min_freq=1)
+        mots = [m[0] for m in mots_requete]
+        racines = [m[1] for m in mots_requete]
+        correspond = correspondance_requete(mots, racines, self.processor._analyser_token)
+        return self._extraits_documents(mots, racines, ids_documents, correspond)
+    
+    def page_simple(self, type_resultat, colonnes, ids_mots, ids_racines, limit, apres=None,
+                    titre=None):
+        """
+        Page d'une recherche simple des serveurs API: contenus d'un type
+        contenant les termes, triés par somme des fréquences puis identifiant
+        
+        Args:
+            colonnes: Colonnes lues dans la table du type (voir TABLES_TYPES)
+            apres: (score, id) du dernier contenu de la page précédente
+            titre: Requête aussi cherchée dans les titres (LIKE), qui ne sont pas
+                   indexés pour les documents; un contenu trouvé par son seul
+                   titre a un score nul
+        
+        Returns:
+            (lignes: colonnes demandées puis score, nombre de contenus trouvés)
+        """
+        table = self.TABLES_TYPES[type_resultat][0]
+        colonne_id = self.COLONNES_TYPES[type_resultat]
+        condition = (f"idx.terme_id IN ({','.join(['?'] * len(ids_mots))}) "
+                     f"OR idx.racine_id IN ({','.join(['?'] * len(ids_racines))})")
+        parametres = list(ids_mots) + list(ids_racines)
+        if titre:
+            jointure = (f"LEFT JOIN index_mots_cles idx ON c.id = idx.{colonne_id} AND ({condition}) "
+                        f"WHERE idx.{colonne_id} IS NOT NULL OR c.titre LIKE ?")
+            parametres.append(f'%{titre}%')
+        else:
+            jointure = f"JOIN index_mots_cles idx ON c.id = idx.{colonne_id} WHERE {condition}"
+        
+        # Le nombre de contenus trouvés est compté avant d'écarter ceux d'avant le curseur
+        filtre_apres, parametres_apres = '', []
+        if apres is not None:
+            filtre_apres = 'WHERE (score, -id) < (?, ?)'
+            parametres_apres = [apres[0], -apres[1]]
+        
+        self.db.cursor.execute(f'''
+            SELECT * FROM (
+                SELECT {', '.join('c.' + colonne.strip() for colonne in colonnes.split(','))},
+                       COALESCE(SUM(idx.frequence), 0) AS score,
+                       COUNT(*) OVER () AS nb_contenus
+                FROM {table} c
+                {jointure}
+                GROUP BY c.id
+            )
+            {filtre_apres}
+            ORDER BY score DESC, id
+            LIMIT ?
+        ''', parametres + parametres_apres + [limit])
+        lignes = self.db.cursor.fetchall()
+        
+        nb_total = lignes[0][-1] if lignes else 0
+        if not lignes and apres is not None:
+            nb_total = self.page_simple(type_resultat, colonnes, ids_mots, ids_racines, 1,
+                                        titre=titre)[1]
+        return [row[:-1] for row in lignes], nb_total
+    
+    @staticmethod
+    def curseur_simple(curseur):
+        """
+        Positions d'un curseur des recherches simples: dict type -> (score, id)
+        du dernier contenu rendu, pour les seuls types ayant une page suivante
+        
+        Raises:
+            ValueError: Curseur mal formé
+        """
+        positions = decoder_curseur(curseur)
+        if not isinstance(positions, dict) or not all(
+                type_resultat in SearchEngine.COLONNES_TYPES and isinstance(position, list)
+                and len(position) == 2 and all(isinstance(v, (int, float)) for v in position)
+                for type_resultat, position in positions.items()):
+            raise ValueError(f"Curseur invalide: {curseur!r}")
+        return {type_resultat: tuple(position) for type_resultat, position in positions.items()}
+    
+    def _plan_requete(self, requete, corriger=True):
+        """
+        Mots de la requête, corrections et synonymes
+        
+        Les expressions du dictionnaire des synonymes (un ou plusieurs mots)
+        sont cherchées dans les tokens de la requête (voir AutomateSynonymes):
+        les mots d'une expression reçoivent ses expansions, chacun des n mots
+        d'une expansion comptant pour poids / n. Une expression sans mot
+        indexable (ai, ml) devient un mot de la requête portant ses seuls
+        synonymes. Les mots d'une expression ne sont jamais corrigés
         
-        # Extraire les mots et racines
+        Returns:
+            (mots_requete, mots, racines, synonymes: liste (une par mot) de
+            (mot, racine, poids), corrections: dict mot -> forme corrigée)
+        """
+        mots_requete = self.processor.extraire_mots_cles(requete, min_freq=1)
         mots = [m[0] for m in mots_requete]
         racines = [m[1] for m in mots_requete]
         
-        resultats = []
+        tokens = self.processor.tokeniser(requete)
+        automate = self.synonymes.automate()
+        correspondances = automate.correspondances(tokens)
         
-        # Rechercher dans les documents (accepter 'document' ou 'documents')
-        if type_contenu in ['document', 'documents', 'all']:
-            resultats.extend(self._rechercher_documents(mots, racines, limit))
+        # Mots absents de l'index (fautes de frappe) remplacés par leur correction
+        corrections = {}
+        if corriger and self.CORRECTION:
+            expressions = {token for debut, fin, _ in correspondances for token in tokens[debut:fin]}
+            a_corriger = [k for k, mot in enumerate(mots) if mot not in expressions]
+            corrections = self._corriger([mots[k] for k in a_corriger], [racines[k] for k in a_corriger])
+        if corrections:
+            racines = [self.processor._analyser_token(corrections[mot]) if mot in corrections else racine
+                       for mot, racine in zip(mots, racines)]
+            mots = [corrections.get(mot, mot) for mot in mots]
+            tokens = [corrections.get(token, token) for token in tokens]
+            correspondances = automate.correspondances(tokens)
         
-        # Rechercher dans les images (accepter 'image' ou 'images')
-        if type_contenu in ['image', 'images', 'all']:
-            resultats.extend(self._rechercher_images(mots, racines, limit))
+        synonymes = [[] for _ in mots]
+        for debut, fin, expansions in correspondances:
+            indices = [k for k, mot in enumerate(mots) if mot in tokens[debut:fin]]
+            if not indices:
+                expression = ' '.join(tokens[debut:fin])
+                if expression in mots:
+                    continue
+                indices = [len(mots)]
+                mots.append(expression)
+                racines.append(expression)
+                synonymes.append([])
+            for mots_expansion, poids in expansions:
+                for k in indices:
+                    synonymes[k].extend((mot, racine, poids / len(mots_expansion))
+                                        for mot, racine in mots_expansion)
+        return mots_requete, mots, racines, synonymes, corrections
+    
+    @staticmethod
+    def _avec_synonymes(mots, racines, synonymes):
+        """Mots et racines de la requête suivis de ceux de leurs synonymes (extraits et surlignages)"""
+        mots, racines = list(mots), list(racines)
+        for synonymes_mot in synonymes or ():
+            for mot, racine, _ in synonymes_mot:
+                if mot not in mots:
+                    mots.append(mot)
+                    racines.append(racine)
+        return mots, racines
+    
+    def rechercher(self, requete, type_contenu='all', limit=20, proximite=True, avec_contenu=False,
+                   apres=None):
+        """
+        Recherche principale
+        Les passages entre guillemets doivent apparaître tels quels (phrase
+        exacte); avec plusieurs mots, les contenus où ils sont proches sont
+        favorisés (proximite=False: classement par fréquences seules)
+        Chaque résultat porte un extrait et ses mots surlignés; le début du
+        texte ('contenu') n'est ajouté qu'avec avec_contenu
         
-        # Rechercher dans les vidéos (accepter 'video' ou 'videos')
-        if type_contenu in ['video', 'videos', 'all']:
-            resultats.extend(self._rechercher_videos(mots, racines, limit))
+        Pagination par curseur: 'curseur_suivant' (None après la dernière
+        page) passé dans `apres` rend les `limit` résultats suivants, sans
+        recalculer les pages précédentes. Les pages se suivent dans l'ordre
+        des scores avant le bonus de proximité, qui ne reclasse les contenus
+        qu'à l'intérieur de leur page. 'nb_total_estime' estime le nombre
+        de contenus trouvés sans les noter tous (voir _estimer_total)
         
-        # Trier par score de pertinence
-        resultats.sort(key=lambda x: x['score'], reverse=True)
+        Raises:
+            ValueError: Curseur `apres` invalide
+        """
+        debut = time.time()
+        cle_apres = self._decoder_apres(apres) if apres else None
         
-        # Limiter les résultats
-        resultats = resultats[:limit]
+        # Résultats déjà calculés pour la même requête normalisée, sur la
+        # même génération de l'index et la même version des synonymes
+        if self.cache is not None:
+            self.synonymes.automate()
+            cle = (' '.join(requete.lower().split()), type_contenu, limit,
+                   self.classement, proximite, avec_contenu, cle_apres, self.synonymes.version)
+            generation = self.generation_index()
+            reponse = self.cache.lire(cle, generation)
+            if reponse is not None:
+                temps_ms = (time.time() - debut) * 1000
+                self._enregistrer_statistique(requete, reponse['nb_total'], temps_ms)
+                return dict(reponse, temps_ms=temps_ms, cache=True)
+        
+        # Mots, corrections et synonymes de la requête
+        mots_requete, mots, racines, synonymes, corrections = self._plan_requete(requete)
+        
+        if not mots:
+            return {
+                'resultats': [],
+                'temps_ms': 0,
+                'nb_total': 0,
+                'nb_total_estime': 0,
+                'curseur_suivant': None,
+                'requete_traitee': [],
+                'corrections': {},
+                'suggestion': None,
+                'synonymes': {}
+            }
+        
+        phrases = self.extraire_phrases(requete)
+        
+        if self.shards is not None:
+            resultats, nb_total_estime, cles, suite = self._rechercher_shards(
+                mots, racines, type_contenu, limit, phrases, proximite, avec_contenu, cle_apres,
+                synonymes)
+        else:
+            resultats, nb_total_estime, cles, suite = self._rechercher_page(
+                mots, racines, type_contenu, limit, phrases, proximite, avec_contenu, cle_apres,
+                synonymes)
+        
+        # Contenus restants: la page suivante commence après le dernier de
+        # celle-ci dans l'ordre avant le bonus de proximité
+        curseur_suivant = None
+        if suite and cles:
+            curseur_suivant = encoder_curseur(list(min(cles)))
         
         # Calculer le temps d'exécution
         temps_ms = (time.time() - debut) * 1000
@@ -86,178 +506,779 @@ class SearchEngine:
         # Enregistrer les statistiques avec la requête originale
         self._enregistrer_statistique(requete, len(resultats), temps_ms)
         
-        return {
+        reponse = {
             'resultats': resultats,
             'temps_ms': temps_ms,
             'nb_total': len(resultats),
-            'requete_traitee': mots_requete
+            'nb_total_estime': nb_total_estime,
+            'curseur_suivant': curseur_suivant,
+            'requete_traitee': mots_requete,
+            'phrases': [mots for mots, _ in phrases],
+            'corrections': corrections,
+            'suggestion': self._suggestion(requete, corrections),
+            'synonymes': {mot: list(dict.fromkeys(m for m, _, _ in synonymes_mot))
+                          for mot, synonymes_mot in zip(mots, synonymes) if synonymes_mot}
         }
+        if self.cache is not None:
+            self.cache.ecrire(cle, generation, reponse)
+        return reponse
+    
+    @staticmethod
+    def _suggestion(requete, corrections):
+        """Requête « Vouliez-vous dire » (mots corrigés remplacés), None sans correction"""
+        if not corrections:
+            return None
+        return MOT_REGEX.sub(lambda m: corrections.get(m.group().lower(), m.group()), requete)
     
-    def _rechercher_documents(self, mots, racines, limit):
-        """Rechercher dans les documents"""
-        resultats = []
+    @staticmethod
+    def _decoder_apres(apres):
+        """Clé de tri (voir _cle_resultat) d'un curseur rendu par rechercher"""
+        cle = decoder_curseur(apres)
+        if (not isinstance(cle, list) or len(cle) != 5
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in cle)):
+            raise ValueError(f"Curseur invalide: {apres!r}")
+        return tuple(cle)
+    
+    def _cle_resultat(self, resultat):
+        """
+        Clé de tri des résultats, par ordre décroissant: score, puis type,
+        nombre de correspondances, identifiant et shard (ordre total, base
+        des curseurs de pagination)
+        """
+        return (resultat['score'], -self.RANGS_TYPES[resultat['type']], resultat['nb_correspondances'],
+                -resultat['id'], -resultat.get('shard', self.numero_shard))
+    
+    def generation_index(self):
+        """
+        Génération de l'index interrogé, changée à chaque commit de l'indexeur
+        (celle de chaque shard pour un index partitionné)
+        """
+        if self.shards is not None:
+            return tuple(self.shards.executer(lambda db, numero: StatistiquesCorpus(db).generation()))
+        return self.statistiques.generation()
+    
+    def _rechercher_contenus(self, mots, racines, type_contenu, limit, phrases=(), proximite=True,
+                             avec_contenu=False, synonymes=None):
+        """Première page des contenus de cette base, triés par score"""
+        return self._rechercher_page(mots, racines, type_contenu, limit, phrases, proximite,
+                                     avec_contenu, synonymes=synonymes)[0]
+    
+    def _rechercher_page(self, mots, racines, type_contenu, limit, phrases=(), proximite=True,
+                         avec_contenu=False, apres=None, synonymes=None):
+        """
+        Rechercher dans les contenus de cette base, triés par score
         
-        # Construire la requête SQL
-        placeholders_mots = ','.join(['?'] * len(mots))
-        placeholders_racines = ','.join(['?'] * len(racines))
+        Une seule passe sur les postings note ensemble tous les types demandés
+        (le type n'est qu'un filtre sur les colonnes de contenu) et un seul tas
+        garde les meilleurs: les statistiques BM25 couvrant tout le corpus,
+        les scores sont comparables d'un type à l'autre
         
-        query = f'''
-            SELECT 
-                d.id,
-                d.titre,
-                d.contenu,
-                d.type_doc,
-                d.chemin_fichier,
-                COUNT(DISTINCT i.id) as nb_correspondances,
-                SUM(i.frequence) as score_total
-            FROM documents d
-            JOIN index_mots_cles i ON d.id = i.doc_id
-            WHERE i.mot_cle IN ({placeholders_mots})
-               OR i.racine IN ({placeholders_racines})
-            GROUP BY d.id
-            ORDER BY score_total DESC, nb_correspondances DESC
-            LIMIT ?
-        '''
+        La page est formée des `limit` meilleurs contenus selon le score avant
+        le bonus de proximité, puis reclassée par proximité. Avec `apres`
+        (clé de tri avant bonus du dernier contenu de la page précédente),
+        seuls les contenus classés après lui sont retenus dès la notation:
+        les pages précédentes ne sont ni notées ni triées à nouveau
         
-        self.db.cursor.execute(query, mots + racines + [limit])
+        Les synonymes (voir _plan_requete) comptent dans la fréquence de leur
+        mot; la proximité ne porte que sur les mots de la requête
         
-        for row in self.db.cursor.fetchall():
-            # Extraire un extrait pertinent
-            extrait = self._extraire_extrait(row[2], mots, racines) if row[2] else ""
-            
-            resultats.append({
+        Returns:
+            (résultats, nombre estimé de contenus trouvés, clé de tri avant
+            bonus de chaque résultat, True s'il reste des contenus après la page)
+        """
+        # Types demandés (accepter 'document' ou 'documents', etc.)
+        types = [type_resultat for type_resultat in self.COLONNES_TYPES
+                 if type_contenu in (type_resultat, type_resultat + 's', 'all')]
+        
+        # Un candidat de plus que la page: s'il existe, une page suit
+        proximite = proximite and len(mots) > 1
+        nb_candidats = limit + 1
+        
+        # Colonne de chaque type -> contenus contenant les phrases exactes (None: tous)
+        filtres = {}
+        for type_resultat in types:
+            colonne_id = self.COLONNES_TYPES[type_resultat]
+            ids_contenus = self._contenus_phrases(phrases, colonne_id)
+            if ids_contenus is None or ids_contenus:
+                filtres[colonne_id] = ids_contenus
+        
+        ids_mots, ids_racines = self._identifiants_requete(mots, racines, synonymes)
+        if not filtres or (not ids_mots and not ids_racines):
+            return [], 0, [], False
+        
+        if self.classement == 'bm25':
+            scores, nb_total = self._scores_bm25(filtres, mots, racines, nb_candidats, apres, synonymes)
+        else:
+            scores, nb_total = self._scores_frequences(filtres, ids_mots, ids_racines,
+                                                       nb_candidats, apres)
+        
+        resultats = [self._formater_resultat(type_resultat, row)
+                     for type_resultat, row in self._meilleurs_contenus(scores, nb_candidats, apres)]
+        suite = len(resultats) > limit
+        resultats = resultats[:limit]
+        cles = {id(r): self._cle_resultat(r) for r in resultats}
+        
+        if proximite:
+            self._appliquer_proximite(resultats, mots, racines)
+            # Trier par score de pertinence
+            resultats.sort(key=self._cle_resultat, reverse=True)
+        
+        # Extraits des seuls résultats rendus
+        self._completer_resultats(resultats, *self._avec_synonymes(mots, racines, synonymes),
+                                  avec_contenu)
+        return resultats, nb_total, [cles[id(r)] for r in resultats], suite
+    
+    def _rechercher_shards(self, mots, racines, type_contenu, limit, phrases=(), proximite=True,
+                           avec_contenu=False, apres=None, synonymes=None):
+        """
+        Interroger tous les shards en parallèle, puis garder les `limit`
+        meilleurs résultats selon leur clé de tri avant bonus de proximité,
+        triés par score (voir _rechercher_page)
+        Les identifiants n'étant uniques que par shard, chaque résultat porte son shard
+        
+        Returns:
+            (résultats, nombre estimé de contenus trouvés, sommé sur les shards,
+            clés de tri avant bonus, True s'il reste des contenus après la page)
+        """
+        def rechercher_shard(db, numero):
+            moteur = SearchEngine(db, classement=self.classement)
+            moteur.numero_shard = numero
+            page = moteur._rechercher_page(mots, racines, type_contenu, limit, phrases, proximite,
+                                           avec_contenu, apres, synonymes)
+            for resultat in page[0]:
+                resultat['shard'] = numero
+            return page
+        
+        par_shard = self.shards.executer(rechercher_shard)
+        entrees = sorted(((cle, resultat) for resultats, _, cles, _ in par_shard
+                          for cle, resultat in zip(cles, resultats)),
+                         key=lambda entree: entree[0], reverse=True)
+        suite = len(entrees) > limit or any(page[3] for page in par_shard)
+        entrees = sorted(entrees[:limit], key=lambda entree: self._cle_resultat(entree[1]),
+                         reverse=True)
+        return ([resultat for _, resultat in entrees], sum(page[1] for page in par_shard),
+                [cle for cle, _ in entrees], suite)
+    
+    def _formater_resultat(self, type_resultat, row):
+        """
+        Résultat de recherche d'un contenu (ligne de TABLES_TYPES, nb_correspondances, score)
+        Extrait et surlignages des documents ajoutés ensuite (voir _completer_resultats)
+        """
+        if type_resultat == 'document':
+            return {
                 'type': 'document',
                 'id': row[0],
                 'titre': row[1],
-                'extrait': extrait,
-                'contenu': row[2][:500] if row[2] else "",  # Ajouter contenu pour compatibilité
-                'type_fichier': row[3],
-                'chemin': row[4],
-                'nb_correspondances': row[5],
-                'score': row[6] if row[6] else 0
-            })
+                'extrait': "",
+                'type_fichier': row[2],
+                'chemin': row[3],
+                'nb_correspondances': row[4],
+                'score': row[5] if row[5] else 0
+            }
         
-        return resultats
+        resultat = {
+            'type': type_resultat,
+            'id': row[0],
+            'titre': row[1],
+            'extrait': row[2] or "",  # Ajouter extrait pour compatibilité
+            'description': row[2] or "",
+            'type_fichier': row[3],
+            'chemin': row[4],
+        }
+        if type_resultat == 'image':
+            resultat['alt_text'] = row[5] or ""
+        else:
+            resultat['duree_secondes'] = row[5] or 0
+        resultat['nb_correspondances'] = row[6]
+        resultat['score'] = row[7] if row[7] else 0
+        return resultat
     
-    def _rechercher_images(self, mots, racines, limit):
-        """Rechercher dans les images"""
-        resultats = []
+    def _completer_resultats(self, resultats, mots, racines, avec_contenu=False):
+        """
+        Ajouter l'extrait des documents et les plages surlignées des extraits
+        (dans 'surlignages': [début, fin[ des mots de la requête dans 'extrait')
         
-        placeholders_mots = ','.join(['?'] * len(mots))
-        placeholders_racines = ','.join(['?'] * len(racines))
+        Args:
+            avec_contenu: Ajouter 'contenu' (500 premiers caractères des
+                          documents, description des images et vidéos)
+        """
+        correspond = correspondance_requete(mots, racines, self.processor._analyser_token)
+        ids_documents = [r['id'] for r in resultats if r['type'] == 'document']
+        extraits = self._extraits_documents(mots, racines, ids_documents, correspond)
         
-        query = f'''
-            SELECT 
-                img.id,
-                img.titre,
-                img.description,
-                img.type_image,
-                img.chemin_fichier,
-                img.alt_text,
-                COUNT(DISTINCT i.id) as nb_correspondances,
-                SUM(i.frequence) as score_total
-            FROM images img
-            JOIN index_mots_cles i ON img.id = i.img_id
-            WHERE i.mot_cle IN ({placeholders_mots})
-               OR i.racine IN ({placeholders_racines})
-            GROUP BY img.id
-            ORDER BY score_total DESC, nb_correspondances DESC
-            LIMIT ?
-        '''
+        debuts = self.extraits.debuts(ids_documents) if avec_contenu else {}
         
-        self.db.cursor.execute(query, mots + racines + [limit])
+        for resultat in resultats:
+            if resultat['type'] == 'document':
+                resultat['extrait'], resultat['surlignages'] = extraits.get(resultat['id'], ("", []))
+                if avec_contenu:
+                    resultat['contenu'] = debuts.get(resultat['id']) or ""
+            else:
+                resultat['surlignages'] = surlignages(resultat['extrait'], correspond)
+                if avec_contenu:
+                    resultat['contenu'] = resultat['description']
+    
+    def _extraits_documents(self, mots, racines, ids_documents, correspond):
+        """
+        Extraits des documents autour de la fenêtre de FENETRE_EXTRAIT tokens
+        contenant le plus de mots de la requête (positions des postings),
+        lus sans charger le texte entier (voir extraits.py)
         
-        for row in self.db.cursor.fetchall():
-            resultats.append({
-                'type': 'image',
-                'id': row[0],
-                'titre': row[1],
-                'extrait': row[2] or "",  # Ajouter extrait pour compatibilité
-                'description': row[2] or "",
-                'contenu': row[2] or "",  # Ajouter contenu pour compatibilité
-                'type_fichier': row[3],
-                'chemin': row[4],
-                'alt_text': row[5] or "",
-                'nb_correspondances': row[6],
-                'score': row[7] if row[7] else 0
-            })
-        
-        return resultats
-    
-    def _rechercher_videos(self, mots, racines, limit):
-        """Rechercher dans les vidéos"""
-        resultats = []
-        
-        placeholders_mots = ','.join(['?'] * len(mots))
-        placeholders_racines = ','.join(['?'] * len(racines))
-        
-        query = f'''
-            SELECT 
-                v.id,
-                v.titre,
-                v.description,
-                v.type_video,
-                v.chemin_fichier,
-                v.duree_secondes,
-                COUNT(DISTINCT i.id) as nb_correspondances,
-                SUM(i.frequence) as score_total
-            FROM videos v
-            JOIN index_mots_cles i ON v.id = i.video_id
-            WHERE i.mot_cle IN ({placeholders_mots})
-               OR i.racine IN ({placeholders_racines})
-            GROUP BY v.id
-            ORDER BY score_total DESC, nb_correspondances DESC
+        Returns:
+            Dict doc_id -> (extrait, surlignages)
+        """
+        if not ids_documents:
+            return {}
+        
+        positions = dict.fromkeys(ids_documents)
+        for doc_id, blobs_mots in self._blobs_par_mot('doc_id', mots, racines, ids_documents).items():
+            positions[doc_id] = meilleure_fenetre([positions_fusionnees(b) if b else [] for b in blobs_mots],
+                                                  self.FENETRE_EXTRAIT)
+        return self.extraits.extraits(positions, correspond)
+    
+    @property
+    def _index_externe(self):
+        """Index remplaçant index_mots_cles (mappé ou segmenté), None sinon"""
+        return self.index_mappe if self.index_mappe is not None else self.segments
+    
+    def _scores_frequences(self, filtres, ids_mots, ids_racines, limit, apres=None):
+        """
+        Scores du classement par fréquences: occurrences des termes et
+        racines de la requête, sommées par contenu
+        
+        Args:
+            filtres: Dict colonne_id -> contenus retenus (None: tous)
+            apres: Clé de tri (voir _cle_resultat): seuls les contenus classés après sont rendus
+        
+        Returns:
+            (dict (colonne_id, contenu_id) -> [nb_correspondances, score],
+            réduit aux `limit` meilleurs quand index_mots_cles est interrogé;
+            nombre de contenus trouvés)
+        """
+        if self._index_externe is not None:
+            scores = {}
+            for colonne_id, ids_contenus in filtres.items():
+                for contenu_id, score in self._index_externe.scores(ids_mots, ids_racines,
+                                                                    colonne_id).items():
+                    if ids_contenus is None or contenu_id in ids_contenus:
+                        scores[(colonne_id, contenu_id)] = score
+            return scores, len(scores)
+        
+        colonnes = ', '.join(DatabaseConfig.INDEX_CONTENUS)
+        condition, parametres_condition = self._condition_contenus(filtres)
+        placeholders_mots = ','.join(['?'] * len(ids_mots))
+        placeholders_racines = ','.join(['?'] * len(ids_racines))
+        
+        # Rang du type et identifiant de chaque contenu: mêmes ex aequo que _cle_resultat
+        rang = ' '.join(f'WHEN {colonne_id} IS NOT NULL THEN {self.RANGS_TYPES[type_resultat]}'
+                        for type_resultat, colonne_id in self.COLONNES_TYPES.items())
+        
+        # Le nombre de contenus trouvés est compté avant d'écarter ceux d'avant le curseur
+        filtre_apres, parametres_apres = '', []
+        if apres is not None:
+            filtre_apres = ('WHERE (score_total, -rang, nb_correspondances, -contenu_id, ?)'
+                            ' < (?, ?, ?, ?, ?)')
+            parametres_apres = [-self.numero_shard] + list(apres)
+        
+        self.db.cursor.execute(f'''
+            SELECT {colonnes}, nb_correspondances, score_total, nb_contenus FROM (
+                SELECT
+                    {colonnes},
+                    CASE {rang} END as rang,
+                    COALESCE({colonnes}) as contenu_id,
+                    COUNT(*) as nb_correspondances,
+                    SUM(frequence) as score_total,
+                    COUNT(*) OVER () as nb_contenus
+                FROM index_mots_cles
+                WHERE (terme_id IN ({placeholders_mots})
+                       OR racine_id IN ({placeholders_racines}))
+                  AND {condition}
+                GROUP BY {colonnes}
+            )
+            {filtre_apres}
+            ORDER BY score_total DESC, rang, nb_correspondances DESC, contenu_id
             LIMIT ?
-        '''
+        ''', ids_mots + ids_racines + parametres_condition + parametres_apres + [limit])
+        lignes = self.db.cursor.fetchall()
+        
+        nb_total = lignes[0][-1] if lignes else 0
+        if not lignes and apres is not None:
+            # Dernière page dépassée: nombre compté sans le curseur
+            nb_total = self._scores_frequences(filtres, ids_mots, ids_racines, 1)[1]
+        return {self._cle_contenu(row): [row[-3], row[-2]] for row in lignes}, nb_total
+    
+    @staticmethod
+    def _cle_contenu(row):
+        """Clé (colonne_id, contenu_id) d'une ligne commençant par les colonnes de contenu"""
+        for colonne_id, contenu_id in zip(DatabaseConfig.INDEX_CONTENUS, row):
+            if contenu_id is not None:
+                return colonne_id, contenu_id
+    
+    def _meilleurs_contenus(self, scores, limit, apres=None):
+        """
+        Meilleurs contenus tous types confondus (un seul tas), métadonnées
+        lues dans la base (ou dans l'index mappé) pour eux seuls
         
-        self.db.cursor.execute(query, mots + racines + [limit])
+        Args:
+            scores: Dict (colonne_id, contenu_id) -> [nb_correspondances, score]
+            apres: Clé de tri (voir _cle_resultat): seuls les contenus classés après sont retenus
         
-        for row in self.db.cursor.fetchall():
-            resultats.append({
-                'type': 'video',
-                'id': row[0],
-                'titre': row[1],
-                'extrait': row[2] or "",  # Ajouter extrait pour compatibilité
-                'description': row[2] or "",
-                'contenu': row[2] or "",  # Ajouter contenu pour compatibilité
-                'type_fichier': row[3],
-                'chemin': row[4],
-                'duree_secondes': row[5] or 0,
-                'nb_correspondances': row[6],
-                'score': row[7] if row[7] else 0
-            })
+        Returns:
+            Liste de (type, ligne): colonnes de TABLES_TYPES, nb_correspondances, score
+        """
+        types = {colonne_id: type_resultat for type_resultat, colonne_id in self.COLONNES_TYPES.items()}
+        
+        # Ex aequo départagés par type puis identifiant (clé de _cle_resultat):
+        # même ordre quel que soit le calcul des scores
+        def cle_tri(entree):
+            (colonne_id, contenu_id), (nb_correspondances, score) = entree
+            return (score or 0, -self.RANGS_TYPES[types[colonne_id]], nb_correspondances,
+                    -contenu_id, -self.numero_shard)
+        
+        entrees = scores.items()
+        if apres is not None:
+            entrees = [entree for entree in entrees if cle_tri(entree) < apres]
+        meilleurs = heapq.nlargest(limit, entrees, key=cle_tri)
+        
+        metadonnees = {}
+        for colonne_id in {colonne_id for (colonne_id, _), _ in meilleurs}:
+            table, colonnes = self.TABLES_TYPES[types[colonne_id]]
+            ids = [contenu_id for (colonne, contenu_id), _ in meilleurs if colonne == colonne_id]
+            if self.index_mappe is not None:
+                lignes = self.index_mappe.lignes(table, colonnes, ids)
+            else:
+                self.db.cursor.execute(f'''
+                    SELECT {colonnes} FROM {table}
+                    WHERE id IN ({','.join(['?'] * len(ids))})
+                ''', ids)
+                lignes = {row[0]: row for row in self.db.cursor.fetchall()}
+            metadonnees.update(((colonne_id, contenu_id), row) for contenu_id, row in lignes.items())
+        
+        # Un contenu d'un segment publié mais pas encore validé dans la base est ignoré
+        return [(types[cle[0]], metadonnees[cle] + tuple(score))
+                for cle, score in meilleurs if cle in metadonnees]
+    
+    def _scores_bm25(self, filtres, mots, racines, limit, apres=None, synonymes=None):
+        """
+        Scores BM25 des contenus des colonnes retenues
+        
+        Chaque mot de la requête est un terme BM25: sa fréquence dans un
+        contenu additionne celles des racines du mot (la racine de chaque
+        variante indexée en fait partie) et, pondérées, celles de ses
+        synonymes; son IDF vient du nombre de contenus contenant sa racine.
+        Longueurs et fréquences documentaires sont lues dans les statistiques
+        tenues à jour à l'indexation (voir statistiques.py)
+        
+        Avec ELAGAGE_BM25, seuls les contenus pouvant entrer dans les `limit`
+        meilleurs (après le curseur `apres`) sont notés (voir _top_bm25);
+        sinon tous les contenus trouvés
+        
+        Args:
+            filtres: Dict colonne_id -> contenus retenus (None: tous)
+            apres: Clé de tri (voir _cle_resultat) du dernier résultat de la page précédente
+        
+        Returns:
+            (dict (colonne_id, contenu_id) -> [nb_correspondances, score],
+            nombre de contenus trouvés, estimé avec l'élagage)
+        """
+        termes, longueur_moyenne = self._termes_bm25(mots, racines, synonymes)
+        if not any(racines_mot for racines_mot, _, _, _ in termes):
+            return {}, 0
+        
+        if self.ELAGAGE_BM25:
+            return self._top_bm25(filtres, termes, longueur_moyenne, limit, apres)
+        
+        cumuls = {}
+        ids_racines = sorted(set().union(*(racines_mot for racines_mot, _, _, _ in termes)))
+        self._cumuler_frequences(cumuls, termes, range(len(termes)),
+                                 self._frequences_racines(filtres, ids_racines))
+        longueurs = self._longueurs(cumuls)
+        return {cle: [sum(postings.values()),
+                      round(self._score_bm25(termes, tf, longueurs.get(cle), longueur_moyenne), 4)]
+                for cle, (tf, postings) in cumuls.items()}, len(cumuls)
+    
+    def _termes_bm25(self, mots, racines, synonymes=None):
+        """
+        Termes BM25 de la requête: racines, IDF et borne supérieure de la
+        contribution de chaque mot au score d'un contenu
+        
+        La borne vient des maxima tenus à jour par racine (fréquence f et
+        rapport f / longueur L): f * (k1 + 1) / (f + k1 * (1 - b + b * L / Lmoy))
+        croît avec f et décroît avec L / f, donc ne dépasse pas sa valeur en
+        f = somme des fréquences max, L / f = 1 / somme des rapports max
+        (pondérées par le poids de chaque racine)
+        
+        Returns:
+            (liste de (racines_mot: dict racine_id -> poids, idf, borne, nombre
+            de contenus) par mot, longueur moyenne)
+        """
+        racines_par_mot = self._racines_ponderees(mots, racines, synonymes)
+        nb_contenus, longueur_moyenne = self.statistiques.corpus()
+        stats = self.statistiques.racines(set().union(*racines_par_mot))
+        
+        k1, b = self.BM25_K1, self.BM25_B
+        termes = []
+        for racines_mot in racines_par_mot:
+            stats_mot = [(poids, stats.get(racine_id, (0, 0, 0))) for racine_id, poids in racines_mot.items()]
+            n = max((nb for _, (nb, _, _) in stats_mot), default=0)
+            idf = math.log(1 + (max(nb_contenus - n, 0) + 0.5) / (n + 0.5))
+            
+            frequence_max = sum(poids * f for poids, (_, f, _) in stats_mot)
+            ratio_max = sum(poids * r for poids, (_, _, r) in stats_mot)
+            if frequence_max and ratio_max and longueur_moyenne:
+                borne = idf * (k1 + 1) / (1 + k1 * (1 - b) / frequence_max
+                                          + k1 * b / (ratio_max * longueur_moyenne))
+            else:
+                # Maxima inconnus (index segmenté antérieur): borne de saturation
+                borne = idf * (k1 + 1)
+            termes.append((racines_mot, idf, borne, n))
+        return termes, longueur_moyenne
+    
+    def _norme_bm25(self, longueur, longueur_moyenne):
+        """Normalisation BM25 de la fréquence selon la longueur du contenu"""
+        k1, b = self.BM25_K1, self.BM25_B
+        if not longueur_moyenne:
+            return k1
+        # Contenu sans statistiques (index antérieur): longueur moyenne
+        if longueur is None:
+            longueur = longueur_moyenne
+        return k1 * (1 - b + b * longueur / longueur_moyenne)
+    
+    def _score_bm25(self, termes, tf, longueur, longueur_moyenne):
+        """Score BM25 d'un contenu d'après la fréquence de chaque mot de la requête"""
+        k1 = self.BM25_K1
+        norme = self._norme_bm25(longueur, longueur_moyenne)
+        return sum(termes[k][1] * f * (k1 + 1) / (f + norme) for k, f in enumerate(tf) if f)
+    
+    def _top_bm25(self, filtres, termes, longueur_moyenne, limit, apres=None):
+        """
+        Meilleurs scores BM25 par élagage dynamique (MaxScore)
+        
+        Les listes des mots sont lues entièrement par borne décroissante,
+        tant qu'un contenu absent des listes déjà lues peut encore entrer
+        dans les `limit` meilleurs (somme des bornes des mots restants
+        supérieure au limit-ième score partiel). Les mots restants, souvent
+        les plus fréquents, ne sont ensuite lus que pour les candidats dont
+        le score partiel plus ces bornes atteint ce seuil. Les scores rendus
+        sont exacts. Le seuil est commun à toutes les colonnes retenues
+        
+        Avec un curseur `apres`, le seuil ne vient que des contenus sûrement
+        classés après lui (score partiel plus bornes restantes inférieur au
+        sien), et les contenus dont le score partiel le dépasse déjà sont écartés
+        
+        Returns:
+            (dict (colonne_id, contenu_id) -> [nb_correspondances, score], limité
+            aux candidats; nombre de contenus trouvés, estimé si des listes restent non lues)
+        """
+        ordre = sorted((k for k, (racines_mot, _, _, _) in enumerate(termes) if racines_mot),
+                       key=lambda k: termes[k][2], reverse=True)
+        cumuls = {}
+        longueurs = {}
+        normes = {}
+        partiels = {}
+        k1 = self.BM25_K1
+        # Contenus lus par mot (colonnes retenues) et contenus de ces mots, tous types confondus
+        nb_lus, nb_contenus_lus = 0, 0
+        
+        def seuil(reste):
+            # Marge: les scores sont comparés arrondis à 4 décimales
+            valeurs = partiels.values()
+            if apres is not None:
+                valeurs = [partiel for partiel in valeurs if partiel + reste < apres[0] - 1e-4]
+            if len(valeurs) < limit:
+                return None
+            return heapq.nlargest(limit, valeurs)[-1] - 1e-4
+        
+        while ordre:
+            reste = sum(termes[k][2] for k in ordre)
+            seuil_courant = seuil(reste)
+            if seuil_courant is not None and reste < seuil_courant:
+                break
+            k = ordre.pop(0)
+            lignes = self._frequences_racines(filtres, sorted(termes[k][0]))
+            modifies = self._cumuler_frequences(cumuls, termes, [k], lignes)
+            nb_lus += len(modifies)
+            nb_contenus_lus += termes[k][3]
+            nouveaux = [cle for cle in modifies if cle not in normes]
+            longueurs.update(self._longueurs(nouveaux))
+            for cle in nouveaux:
+                normes[cle] = self._norme_bm25(longueurs.get(cle), longueur_moyenne)
+            # Score partiel: contribution du seul mot lu ajoutée
+            idf = termes[k][1]
+            for cle in modifies:
+                f = cumuls[cle][0][k]
+                partiels[cle] = partiels.get(cle, 0) + idf * f * (k1 + 1) / (f + normes[cle])
+        
+        nb_total = len(cumuls)
+        if ordre:
+            # Mots restants: lus seulement pour les candidats
+            candidats = sorted(cle for cle, partiel in partiels.items()
+                               if partiel + reste >= seuil_courant
+                               and (apres is None or partiel - 1e-4 <= apres[0]))
+            ids_racines = sorted(set().union(*(termes[k][0] for k in ordre)))
+            
+            # Sonder chaque (racine, candidat) dans l'index, sauf si relire
+            # les listes entières coûte moins (sondage colonne par colonne:
+            # une condition sur plusieurs colonnes ne se résout pas par l'index)
+            taille_listes = sum(nb for nb, _, _ in self.statistiques.racines(ids_racines).values())
+            if len(candidats) * len(ids_racines) < taille_listes:
+                par_colonne = {}
+                for colonne_id, contenu_id in candidats:
+                    par_colonne.setdefault(colonne_id, []).append(contenu_id)
+                lignes = []
+                for colonne_id, ids in par_colonne.items():
+                    for i in range(0, len(ids), 500):
+                        lignes.extend(self._frequences_racines({colonne_id: ids[i:i + 500]},
+                                                               ids_racines))
+            else:
+                retenus = set(candidats)
+                lignes = [ligne for ligne in self._frequences_racines(filtres, ids_racines)
+                          if ligne[0] in retenus]
+            self._cumuler_frequences(cumuls, termes, ordre, lignes)
+            
+            # Contenus trouvés: ceux des listes lues, plus une estimation de
+            # ceux des seuls mots restants
+            part = min(nb_lus / nb_contenus_lus, 1) if nb_contenus_lus else 1
+            parts_candidats = [sum(1 for cle in candidats if cumuls[cle][0][k]) / len(candidats)
+                               if candidats else 0 for k in ordre]
+            nb_total = self._estimer_total(nb_total, part, [termes[k] for k in ordre], parts_candidats)
+        else:
+            candidats = partiels
+        
+        return {cle: [sum(cumuls[cle][1].values()),
+                      round(self._score_bm25(termes, cumuls[cle][0], longueurs.get(cle),
+                                             longueur_moyenne), 4)]
+                for cle in candidats}, nb_total
+    
+    def _estimer_total(self, nb_vus, part, termes_restants, parts_candidats):
+        """
+        Nombre estimé de contenus trouvés quand les listes de certains mots
+        n'ont pas été lues (élagage): la part des contenus de chacun de ces
+        mots déjà dans les listes lues est estimée sur les candidats sondés,
+        les autres contenus des mots restants sont supposés indépendants
+        
+        Args:
+            nb_vus: Contenus des listes lues (colonnes retenues)
+            part: Part des colonnes retenues dans les contenus des mots lus
+            termes_restants: Termes BM25 (voir _termes_bm25) des mots non lus
+            parts_candidats: Part des candidats sondés contenant chacun de ces mots
+        """
+        # Contenus des colonnes retenues absents des listes lues
+        autres = self.statistiques.corpus()[0] * part - nb_vus
+        if autres <= 0:
+            return nb_vus
+        absents = 1.0
+        for (_, _, _, n), part_vus in zip(termes_restants, parts_candidats):
+            hors_listes = max(n * part - part_vus * nb_vus, 0)
+            absents *= 1 - min(hors_listes / autres, 1)
+        return nb_vus + round(autres * (1 - absents))
+    
+    def _longueurs(self, cles):
+        """Longueurs des contenus (colonne_id, contenu_id), lues colonne par colonne"""
+        par_colonne = {}
+        for colonne_id, contenu_id in cles:
+            par_colonne.setdefault(colonne_id, []).append(contenu_id)
+        return {(colonne_id, contenu_id): longueur
+                for colonne_id, ids in par_colonne.items()
+                for contenu_id, longueur in self.statistiques.longueurs(colonne_id, ids).items()}
+    
+    @staticmethod
+    def _cumuler_frequences(cumuls, termes, indices, lignes):
+        """
+        Ajouter les fréquences lues aux mots `indices` de la requête,
+        pondérées par le poids de la racine pour chaque mot
+        
+        Args:
+            cumuls: Dict contenu_id -> (fréquence par mot, postings par racine)
+            lignes: Tuples (contenu_id, racine_id, frequence, nb_postings)
+        
+        Returns:
+            Ensemble des contenus modifiés
+        """
+        modifies = set()
+        for contenu_id, racine_id, frequence, nb_postings in lignes:
+            cumul = cumuls.get(contenu_id)
+            if cumul is None:
+                cumul = cumuls[contenu_id] = ([0] * len(termes), {})
+            for k in indices:
+                poids = termes[k][0].get(racine_id)
+                if poids:
+                    cumul[0][k] += poids * frequence
+            cumul[1][racine_id] = nb_postings
+            modifies.add(contenu_id)
+        return modifies
+    
+    def _frequences_racines(self, filtres, ids_racines):
+        """
+        Occurrences de chaque racine par contenu des colonnes retenues, lues
+        dans l'index mappé ou segmenté, ou en un seul parcours de l'index
+        couvrant idx_racine_contenu de index_mots_cles
+        
+        Args:
+            filtres: Dict colonne_id -> contenus retenus (None: tous)
+        
+        Returns:
+            Liste de ((colonne_id, contenu_id), racine_id, frequence, nb_postings)
+        """
+        if self._index_externe is not None:
+            return [((colonne_id, contenu_id), racine_id, frequence, nb_postings)
+                    for colonne_id, ids_contenus in filtres.items()
+                    for contenu_id, racine_id, frequence, nb_postings
+                    in self._index_externe.frequences(ids_racines, colonne_id, ids_contenus)]
+        
+        colonnes = ', '.join(DatabaseConfig.INDEX_CONTENUS)
+        condition, parametres_condition = self._condition_contenus(filtres)
+        self.db.cursor.execute(f'''
+            SELECT {colonnes}, racine_id, SUM(frequence), COUNT(*)
+            FROM index_mots_cles
+            WHERE racine_id IN ({','.join(['?'] * len(ids_racines))})
+              AND {condition}
+            GROUP BY racine_id, {colonnes}
+        ''', list(ids_racines) + parametres_condition)
+        return [(self._cle_contenu(row), row[-3], row[-2], row[-1])
+                for row in self.db.cursor.fetchall()]
+    
+    @staticmethod
+    def _condition_contenus(filtres):
+        """
+        Condition SQL sur index_mots_cles: postings des colonnes de contenu
+        retenues, éventuellement restreints à des contenus
+        Colonnes de contenu précédentes nulles: l'index est parcouru jusqu'à
+        la colonne du contenu (sondage racine + contenu)
         
-        return resultats
+        Args:
+            filtres: Dict colonne_id -> contenus retenus (None: tous)
+        """
+        colonnes = list(DatabaseConfig.INDEX_CONTENUS)
+        conditions, parametres = [], []
+        for colonne_id, ids_contenus in filtres.items():
+            nulles = ''.join(f'{colonne} IS NULL AND '
+                             for colonne in colonnes[:colonnes.index(colonne_id)])
+            if ids_contenus is None:
+                conditions.append(f'{nulles}{colonne_id} IS NOT NULL')
+            else:
+                ids = sorted(ids_contenus)
+                conditions.append(f"{nulles}{colonne_id} IN ({','.join(['?'] * len(ids))})")
+                parametres.extend(ids)
+        return '(' + ' OR '.join(f'({condition})' for condition in conditions) + ')', parametres
     
-    def _extraire_extrait(self, contenu, mots, racines, taille_extrait=200):
-        """Extraire un extrait pertinent du contenu"""
-        if not contenu:
-            return ""
+    @staticmethod
+    def _filtre_contenus(colonne, ids_contenus):
+        """Condition SQL restreignant une colonne à des contenus (vide si None)"""
+        if ids_contenus is None:
+            return '', []
+        ids = sorted(ids_contenus)
+        return f"AND {colonne} IN ({','.join(['?'] * len(ids))})", ids
+    
+    def _postings_positions(self, colonne_id, ids_termes, ids_racines, ids_contenus=None,
+                            valeur='positions'):
+        """
+        Postings des termes ou racines donnés, lus dans l'index mappé ou
+        segmenté, ou dans index_mots_cles
         
-        contenu_lower = contenu.lower()
+        Args:
+            valeur: Colonne lue pour chaque posting, 'positions' ou 'frequence'
         
-        # Trouver la première occurrence d'un mot de la requête
-        premiere_pos = -1
-        for mot in mots:
-            pos = contenu_lower.find(mot.lower())
-            if pos != -1 and (premiere_pos == -1 or pos < premiere_pos):
-                premiere_pos = pos
+        Returns:
+            Liste de (contenu_id, terme_id, racine_id, valeur)
+        """
+        if self._index_externe is not None:
+            return self._index_externe.postings(ids_termes, ids_racines, colonne_id, ids_contenus, valeur)
         
-        if premiere_pos == -1:
-            return contenu[:taille_extrait] + "..."
+        filtre, parametres_filtre = self._filtre_contenus(colonne_id, ids_contenus)
+        self.db.cursor.execute(f'''
+            SELECT {colonne_id}, terme_id, racine_id, {valeur}
+            FROM index_mots_cles
+            WHERE (terme_id IN ({','.join(['?'] * len(ids_termes))})
+                   OR racine_id IN ({','.join(['?'] * len(ids_racines))}))
+              AND {colonne_id} IS NOT NULL
+              {filtre}
+        ''', list(ids_termes) + list(ids_racines) + parametres_filtre)
+        return self.db.cursor.fetchall()
+    
+    def _contenus_phrases(self, phrases, colonne_id):
+        """
+        Contenus contenant toutes les phrases exactes de la requête
+        Les mots d'une phrase sont comparés par forme pliée (pas par racine);
+        leurs listes de positions sont fusionnées pour vérifier l'ordre
         
-        # Extraire autour de la correspondance
-        debut = max(0, premiere_pos - taille_extrait // 2)
-        fin = min(len(contenu), premiere_pos + taille_extrait // 2)
+        Returns:
+            Ensemble d'identifiants, None s'il n'y a pas de phrase
+        """
+        if not phrases:
+            return None
         
-        extrait = contenu[debut:fin]
+        contenus = None
+        for mots, decalages in phrases:
+            ids_par_mot = [set(self.termes.identifiants_plies([mot])) for mot in mots]
+            if not all(ids_par_mot):
+                return set()
+            
+            # Blobs de chaque mot par contenu; décodés seulement si tous les mots sont présents
+            blobs = {}
+            for contenu_id, terme_id, _, blob in self._postings_positions(
+                    colonne_id, sorted(set().union(*ids_par_mot)), []):
+                if contenus is not None and contenu_id not in contenus:
+                    continue
+                blobs_mots = blobs.setdefault(contenu_id, [[] for _ in mots])
+                for k, ids in enumerate(ids_par_mot):
+                    if terme_id in ids:
+                        blobs_mots[k].append(blob)
+            
+            contenus = {contenu_id for contenu_id, blobs_mots in blobs.items()
+                        if all(blobs_mots) and occurrences_phrase(
+                            [positions_fusionnees(b) for b in blobs_mots], decalages)}
+            if not contenus:
+                break
+        return contenus
+    
+    def _blobs_par_mot(self, colonne_id, mots, racines, ids_contenus):
+        """
+        Blobs de positions de chaque mot de la requête dans des contenus
+        (variantes et racines du mot comprises)
         
-        if debut > 0:
-            extrait = "..." + extrait
-        if fin < len(contenu):
-            extrait = extrait + "..."
+        Returns:
+            Dict contenu_id -> liste (une par mot) de listes de blobs
+        """
+        par_mot = self._identifiants_par_mot(mots, racines)
+        ids_termes = sorted(set().union(*(termes_mot for termes_mot, _ in par_mot)))
+        ids_racines = sorted(set().union(*(racines_mot for _, racines_mot in par_mot)))
+        if not ids_termes and not ids_racines:
+            return {}
         
-        return extrait
+        blobs = {}
+        for contenu_id, terme_id, racine_id, blob in self._postings_positions(
+                colonne_id, ids_termes, ids_racines, ids_contenus):
+            blobs_mots = blobs.setdefault(contenu_id, [[] for _ in par_mot])
+            for k, (termes_mot, racines_mot) in enumerate(par_mot):
+                if terme_id in termes_mot or racine_id in racines_mot:
+                    blobs_mots[k].append(blob)
+        return blobs
+    
+    def _appliquer_proximite(self, resultats, mots, racines):
+        """
+        Favoriser les contenus où les mots de la requête sont proches: le score
+        est multiplié selon la plus petite fenêtre contenant chacun des k mots
+        présents dans le contenu (fusion des listes de positions), pondérée
+        par la part k / n des n mots de la requête
+        """
+        for type_resultat, colonne_id in self.COLONNES_TYPES.items():
+            candidats = {r['id']: r for r in resultats if r['type'] == type_resultat}
+            if not candidats:
+                continue
+            
+            for contenu_id, blobs_mots in self._blobs_par_mot(colonne_id, mots, racines,
+                                                              candidats).items():
+                presents = [b for b in blobs_mots if b]
+                if len(presents) < 2:
+                    continue
+                fenetre = fenetre_minimale([positions_fusionnees(b) for b in presents])
+                # Un même token peut couvrir deux mots (racine commune)
+                k = len(presents)
+                bonus = self.POIDS_PROXIMITE * (k / len(mots)) * (k / max(fenetre, k))
+                resultat = candidats[contenu_id]
+                # Jamais sous le score initial (arrondi)
+                resultat['score'] = max(resultat['score'], round(resultat['score'] * (1 + bonus), 3))
     
     def _enregistrer_statistique(self, requete, nb_resultats, temps_ms):
         """Enregistrer les statistiques de recherche"""
@@ -288,14 +1309,69 @@ class SearchEngine:
         return self.db.cursor.fetchall()
     
     def suggestions_recherche(self, debut_mot, limit=5):
-        """Suggérer des mots-clés basés sur le début de la saisie"""
+        """
+        Suggérer des mots-clés basés sur le début de la saisie
+        
+        Avec un index des préfixes, lus en mémoire (reconstruit quand la
+        génération de l'index change); sinon, requête sur index_mots_cles
+        """
+        if self.prefixes is not None:
+            self.prefixes.rafraichir(self.generation_index(), self._charger_prefixes)
+            return self.prefixes.completer(debut_mot, limit)
+        
+        if self.shards is not None:
+            # Fréquences additionnées sur les meilleurs mots de chaque shard
+            frequences = {}
+            for lignes in self.shards.executer(
+                    lambda db, numero: SearchEngine(db)._suggestions_frequences(debut_mot, limit)):
+                for mot, freq in lignes:
+                    frequences[mot] = frequences.get(mot, 0) + freq
+            return heapq.nlargest(limit, frequences, key=frequences.get)
+        
+        return [row[0] for row in self._suggestions_frequences(debut_mot, limit)]
+    
+    def _suggestions_frequences(self, debut_mot, limit):
+        """Mots-clés commençant par debut_mot et leur fréquence totale"""
         self.db.cursor.execute('''
-            SELECT DISTINCT mot_cle, COUNT(*) as freq
-            FROM index_mots_cles
-            WHERE mot_cle LIKE ?
-            GROUP BY mot_cle
+            SELECT t.texte, SUM(i.frequence) as freq
+            FROM termes t
+            JOIN index_mots_cles i ON i.terme_id = t.id
+            WHERE t.texte LIKE ?
+            GROUP BY t.id
             ORDER BY freq DESC
             LIMIT ?
         ''', (debut_mot + '%', limit))
         
-        return [row[0] for row in self.db.cursor.fetchall()]
\ No newline at end of file
+        return self.db.cursor.fetchall()
+    
+    def _charger_prefixes(self):
+        """
+        Fréquences des mots indexés (additionnées sur les shards) et
+        recherches passées ayant trouvé des résultats, pour IndexPrefixes.construire
+        """
+        if self.shards is None:
+            frequences = self._frequences_termes()
+        else:
+            totaux = {}
+            for lignes in self.shards.executer(lambda db, numero: SearchEngine(db)._frequences_termes()):
+                for mot, freq in lignes:
+                    totaux[mot] = totaux.get(mot, 0) + freq
+            frequences = list(totaux.items())
+        
+        self.db.cursor.execute('''
+            SELECT requete, COUNT(*)
+            FROM statistiques_recherche
+            WHERE nb_resultats > 0
+            GROUP BY requete
+        ''')
+        return frequences, self.db.cursor.fetchall()
+    
+    def _frequences_termes(self):
+        """Mots indexés de cette base et leur fréquence totale"""
+        self.db.cursor.execute('''
+            SELECT t.texte, SUM(i.frequence)
+            FROM index_mots_cles i
+            JOIN termes t ON t.id = i.terme_id
+            GROUP BY i.terme_id
+        ''')
+        return self.db.cursor.fetchall()
\ No newline at end of file
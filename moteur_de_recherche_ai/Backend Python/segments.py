@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index segmenté
+Les nouveaux postings sont écrits dans de petits segments immuables
+(un fichier SQLite par segment). Les recherches interrogent tous les
+segments vivants; un fusionneur d'arrière-plan regroupe les segments
+selon une politique par paliers et purge les contenus supprimés.
+Les mises à jour du catalogue sont sérialisées entre threads et entre
+processus (verrou de fichier segments.lock): indexation, surveillant et
+serveur peuvent écrire en même temps.
+Usage: python segments.py [stats|fusionner] [--dossier segments]
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class GestionnaireSegments:
+    """
+    Catalogue des segments (segments.json) et opérations sur les segments
+
+    Le catalogue est le point de validation: un segment n'est visible par
+    les recherches qu'une fois inscrit au catalogue, et le remplacement de
+    segments fusionnés est atomique (os.replace du catalogue). Chaque
+    lecture-modification-écriture du catalogue se fait sous verrou (voir
+    _catalogue_verrouille).
+    Les contenus supprimés sont des « pierres tombales » (colonne, id)
+    filtrées à la recherche, puis purgées physiquement lors des fusions.
+    """
+
+    CATALOGUE = 'segments.json'
+    VERROU = 'segments.lock'
+
+    def __init__(self, dossier='segments', segments_par_palier=4, facteur_palier=10,
+                 taille_base=1000):
+        self.dossier = os.path.abspath(dossier)
+        self.segments_par_palier = segments_par_palier
+        self.facteur_palier = facteur_palier
+        self.taille_base = taille_base
+        self.verrou = threading.Lock()
+        os.makedirs(self.dossier, exist_ok=True)
+
+    @classmethod
+    def existe(cls, dossier='segments'):
+        """Indique si un index segmenté existe dans ce dossier"""
+        return os.path.exists(os.path.join(dossier, cls.CATALOGUE))
+
+    # --- Catalogue ---
+
+    def lire_catalogue(self):
+        try:
+            with open(os.path.join(self.dossier, self.CATALOGUE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'prochain_numero': 1, 'segments': [], 'supprimes': [], 'a_effacer': []}
+
+    @contextmanager
+    def _catalogue_verrouille(self):
+        """
+        Exclusion mutuelle des mises à jour du catalogue: verrou des threads
+        de ce gestionnaire, puis verrou exclusif sur segments.lock pour les
+        autres gestionnaires et processus (lire, modifier puis écrire le
+        catalogue sans perdre la mise à jour d'un autre écrivain)
+        """
+        with self.verrou:
+            with open(os.path.join(self.dossier, self.VERROU), 'a+b') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                else:
+                    f.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    else:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _ecrire_catalogue(self, catalogue):
+        """Remplacer le catalogue (sous _catalogue_verrouille), par un fichier temporaire unique"""
+        chemin = os.path.join(self.dossier, self.CATALOGUE)
+        descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, prefix=f"{self.CATALOGUE}.",
+                                                   suffix='.tmp')
+        try:
+            with os.fdopen(descripteur, 'w', encoding='utf-8') as f:
+                json.dump(catalogue, f)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+
+    def _chemin_segment(self, nom):
+        return os.path.join(self.dossier, nom)
+
+    def segments_vivants(self):
+        """
+        Instantané cohérent pour une recherche
+
+        Returns:
+            (liste des chemins de segments, ensemble des (colonne, id) supprimés)
+        """
+        catalogue = self.lire_catalogue()
+        return ([self._chemin_segment(s['nom']) for s in catalogue['segments']],
+                {tuple(t) for t in catalogue['supprimes']})
+
+    # --- Écriture ---
+
+    def _creer_fichier_segment(self, chemin, lignes):
+        """
+        Écrire un fichier segment: postings au format de index_mots_cles
+        (identifiants de termes du dictionnaire de la base principale)
+        """
+        conn = sqlite3.connect(chemin)
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('''
+            CREATE TABLE postings (
+                terme_id INTEGER NOT NULL,
+                racine_id INTEGER NOT NULL,
+                doc_id INTEGER,
+                img_id INTEGER,
+                video_id INTEGER,
+                frequence INTEGER,
+                positions BLOB
+            )
+        ''')
+        conn.executemany('INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?, ?)', lignes)
+        conn.execute('CREATE INDEX idx_seg_terme ON postings(terme_id)')
+        conn.execute('CREATE INDEX idx_seg_racine ON postings(racine_id, doc_id, img_id, video_id, frequence)')
+        conn.execute('CREATE INDEX idx_seg_contenu ON postings(doc_id, img_id, video_id)')
+        conn.commit()
+        conn.close()
+
+    def _construire_segment(self, lignes):
+        """Écrire un nouveau fichier segment (pas encore visible); rend son nom"""
+        with self._catalogue_verrouille():
+            catalogue = self.lire_catalogue()
+            numero = catalogue['prochain_numero']
+            catalogue['prochain_numero'] = numero + 1
+            self._ecrire_catalogue(catalogue)
+
+        nom = f"seg_{numero:06d}.db"
+        temporaire = self._chemin_segment(f"{nom}.tmp")
+        self._creer_fichier_segment(temporaire, lignes)
+        os.replace(temporaire, self._chemin_segment(nom))
+        return nom
+
+    def ajouter_segment(self, lignes):
+        """
+        Publier un nouveau segment immuable
+
+        Args:
+            lignes: Tuples (terme_id, racine_id, doc_id, img_id, video_id, frequence, positions)
+        """
+        if not lignes:
+            return None
+
+        nom = self._construire_segment(lignes)
+        with self._catalogue_verrouille():
+            catalogue = self.lire_catalogue()
+            catalogue['segments'].append({'nom': nom, 'nb_postings': len(lignes)})
+            self._ecrire_catalogue(catalogue)
+        return nom
+
+    def supprimer_contenu(self, colonne_id, contenu_id):
+        """Marquer un contenu comme supprimé (pierre tombale)"""
+        with self._catalogue_verrouille():
+            catalogue = self.lire_catalogue()
+            if [colonne_id, contenu_id] not in catalogue['supprimes']:
+                catalogue['supprimes'].append([colonne_id, contenu_id])
+                self._ecrire_catalogue(catalogue)
+
+    # --- Fusion ---
+
+    def palier(self, nb_postings):
+        """Palier d'un segment selon sa taille (0 pour les plus petits)"""
+        if nb_postings < self.taille_base:
+            return 0
+        return int(math.log(nb_postings / self.taille_base, self.facteur_palier)) + 1
+
+    def choisir_fusion(self):
+        """
+        Politique par paliers: dès qu'un palier contient `segments_par_palier`
+        segments, ses plus petits segments sont fusionnés en un segment du
+        palier supérieur
+
+        Returns:
+            Liste des noms de segments à fusionner, ou None
+        """
+        paliers = {}
+        for segment in self.lire_catalogue()['segments']:
+            paliers.setdefault(self.palier(segment['nb_postings']), []).append(segment)
+
+        for niveau in sorted(paliers):
+            candidats = sorted(paliers[niveau], key=lambda s: s['nb_postings'])
+            if len(candidats) >= self.segments_par_palier:
+                return [s['nom'] for s in candidats[:self.segments_par_palier]]
+        return None
+
+    def fusionner(self, noms):
+        """
+        Fusionner des segments en un seul, sans les postings des contenus supprimés
+        Le nouveau segment remplace les anciens en une seule écriture du
+        catalogue; les recherches en cours continuent de lire les anciens
+        """
+        supprimes = {tuple(t) for t in self.lire_catalogue()['supprimes']}
+        colonnes = ['doc_id', 'img_id', 'video_id']
+
+        # Ordre de création: les blobs partiels d'un même posting se concatènent dans l'ordre
+        lignes = {}
+        for nom in sorted(noms):
+            conn = sqlite3.connect(self._chemin_segment(nom))
+            for ligne in conn.execute('SELECT * FROM postings ORDER BY rowid'):
+                contenu = next((c, ligne[2 + i]) for i, c in enumerate(colonnes)
+                               if ligne[2 + i] is not None)
+                if contenu in supprimes:
+                    continue
+                cle = (ligne[0], contenu)
+                if cle in lignes:
+                    precedente = lignes[cle]
+                    lignes[cle] = precedente[:5] + (precedente[5] + ligne[5],
+                                                    precedente[6] + ligne[6])
+                else:
+                    lignes[cle] = ligne
+            conn.close()
+
+        nouveau = self._construire_segment(list(lignes.values())) if lignes else None
+
+        with self._catalogue_verrouille():
+            catalogue = self.lire_catalogue()
+            catalogue['segments'] = [s for s in catalogue['segments'] if s['nom'] not in noms]
+            if nouveau:
+                catalogue['segments'].append({'nom': nouveau, 'nb_postings': len(lignes)})
+            catalogue['a_effacer'].extend(noms)
+
+            # Oublier les pierres tombales purgées qui ne concernent plus aucun segment
+            restants = [self._chemin_segment(s['nom']) for s in catalogue['segments']
+                        if s['nom'] != nouveau]
+            catalogue['supprimes'] = [
+                t for t in catalogue['supprimes']
+                if tuple(t) not in supprimes or self._contenu_present(restants, *t)
+            ]
+            self._ecrire_catalogue(catalogue)
+
+        self.effacer_segments_obsoletes()
+        print(f"🔀 Fusion de {len(noms)} segments → {nouveau} ({len(lignes)} postings)")
+        return nouveau
+
+    def _contenu_present(self, chemins, colonne_id, contenu_id):
+        for chemin in chemins:
+            conn = sqlite3.connect(chemin)
+            present = conn.execute(f'SELECT 1 FROM postings WHERE {colonne_id} = ? LIMIT 1',
+                                   (contenu_id,)).fetchone()
+            conn.close()
+            if present:
+                return True
+        return False
+
+    def effacer_segments_obsoletes(self):
+        """Effacer les fichiers des segments fusionnés (réessayé si encore ouverts)"""
+        with self._catalogue_verrouille():
+            catalogue = self.lire_catalogue()
+            restants = []
+            for nom in catalogue['a_effacer']:
+                try:
+                    os.remove(self._chemin_segment(nom))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    restants.append(nom)
+            catalogue['a_effacer'] = restants
+            self._ecrire_catalogue(catalogue)
+
+    def fusionner_selon_politique(self):
+        """Appliquer la politique de fusion jusqu'à stabilité"""
+        nb_fusions = 0
+        noms = self.choisir_fusion()
+        while noms:
+            self.fusionner(noms)
+            nb_fusions += 1
+            noms = self.choisir_fusion()
+        return nb_fusions
+
+    # --- Recherche ---
+
+    def scores(self, ids_mots, ids_racines, colonne_id):
+        """
+        Agréger les postings correspondant à la requête sur tous les segments vivants
+
+        Args:
+            ids_mots, ids_racines: Identifiants des termes de la requête (voir termes.py)
+
+        Returns:
+            Dict contenu_id -> [nb_correspondances, score_total]
+        """
+        chemins, supprimes = self.segments_vivants()
+        placeholders_mots = ','.join(['?'] * len(ids_mots))
+        placeholders_racines = ','.join(['?'] * len(ids_racines))
+
+        scores = {}
+        for chemin in chemins:
+            try:
+                conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                # Segment fusionné et effacé entre la lecture du catalogue et l'ouverture
+                continue
+            try:
+                lignes = conn.execute(f'''
+                    SELECT {colonne_id}, COUNT(*), SUM(frequence)
+                    FROM postings
+                    WHERE {colonne_id} IS NOT NULL
+                      AND (terme_id IN ({placeholders_mots})
+                           OR racine_id IN ({placeholders_racines}))
+                    GROUP BY {colonne_id}
+                ''', ids_mots + ids_racines).fetchall()
+            except sqlite3.OperationalError:
+                lignes = []
+            finally:
+                conn.close()
+
+            for contenu_id, nb, score in lignes:
+                if (colonne_id, contenu_id) in supprimes:
+                    continue
+                cumul = scores.setdefault(contenu_id, [0, 0])
+                cumul[0] += nb
+                cumul[1] += score
+        return scores
+
+    def postings(self, ids_termes, ids_racines, colonne_id, ids_contenus=None, valeur='positions'):
+        """
+        Postings correspondant aux termes sur tous les segments vivants
+
+        Args:
+            ids_contenus: Restreindre à ces contenus (None = tous)
+            valeur: Colonne lue pour chaque posting, 'positions' ou 'frequence'
+
+        Returns:
+            Liste de (contenu_id, terme_id, racine_id, valeur)
+        """
+        chemins, supprimes = self.segments_vivants()
+        filtre = ''
+        parametres = list(ids_termes) + list(ids_racines)
+        if ids_contenus is not None:
+            filtre = f"AND {colonne_id} IN ({','.join(['?'] * len(ids_contenus))})"
+            parametres += list(ids_contenus)
+
+        resultats = []
+        for chemin in chemins:
+            try:
+                conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                continue
+            try:
+                lignes = conn.execute(f'''
+                    SELECT {colonne_id}, terme_id, racine_id, {valeur}
+                    FROM postings
+                    WHERE {colonne_id} IS NOT NULL
+                      AND (terme_id IN ({','.join(['?'] * len(ids_termes))})
+                           OR racine_id IN ({','.join(['?'] * len(ids_racines))}))
+                      {filtre}
+                ''', parametres).fetchall()
+            except sqlite3.OperationalError:
+                lignes = []
+            finally:
+                conn.close()
+
+            resultats.extend(ligne for ligne in lignes
+                             if (colonne_id, ligne[0]) not in supprimes)
+        return resultats
+
+    def frequences(self, ids_racines, colonne_id, ids_contenus=None):
+        """
+        Occurrences de chaque racine par contenu sur tous les segments vivants
+        (lues dans l'index idx_seg_racine, sans accès aux positions)
+
+        Args:
+            ids_contenus: Restreindre à ces contenus (None = tous)
+
+        Returns:
+            Liste de (contenu_id, racine_id, frequence, nb_postings)
+        """
+        chemins, supprimes = self.segments_vivants()
+        filtre = ''
+        parametres = list(ids_racines)
+        if ids_contenus is not None:
+            filtre = f"AND {colonne_id} IN ({','.join(['?'] * len(ids_contenus))})"
+            parametres += list(ids_contenus)
+
+        resultats = []
+        for chemin in chemins:
+            try:
+                conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                continue
+            try:
+                lignes = conn.execute(f'''
+                    SELECT {colonne_id}, racine_id, SUM(frequence), COUNT(*)
+                    FROM postings
+                    WHERE racine_id IN ({','.join(['?'] * len(ids_racines))})
+                      AND {colonne_id} IS NOT NULL
+                      {filtre}
+                    GROUP BY {colonne_id}, racine_id
+                ''', parametres).fetchall()
+            except sqlite3.OperationalError:
+                lignes = []
+            finally:
+                conn.close()
+
+            resultats.extend(ligne for ligne in lignes
+                             if (colonne_id, ligne[0]) not in supprimes)
+        return resultats
+
+    def racines_contenu(self, colonne_id, contenu_id):
+        """Identifiants des racines distinctes d'un contenu publié (statistiques BM25)"""
+        chemins, supprimes = self.segments_vivants()
+        if (colonne_id, contenu_id) in supprimes:
+            return []
+
+        racines = set()
+        for chemin in chemins:
+            try:
+                conn = sqlite3.connect(f"file:{chemin}?mode=ro", uri=True)
+            except sqlite3.OperationalError:
+                continue
+            try:
+                racines.update(row[0] for row in conn.execute(f'''
+                    SELECT DISTINCT racine_id FROM postings WHERE {colonne_id} = ?
+                ''', (contenu_id,)))
+            except sqlite3.OperationalError:
+                pass
+            finally:
+                conn.close()
+        return list(racines)
+
+    def stats(self):
+        catalogue = self.lire_catalogue()
+        return {
+            'nb_segments': len(catalogue['segments']),
+            'nb_postings': sum(s['nb_postings'] for s in catalogue['segments']),
+            'nb_supprimes': len(catalogue['supprimes']),
+            'paliers': sorted(self.palier(s['nb_postings']) for s in catalogue['segments'])
+        }
+
+
+class FusionneurArriere(threading.Thread):
+    """Thread qui applique la politique de fusion en continu"""
+
+    def __init__(self, gestionnaire, intervalle=5.0):
+        super().__init__(daemon=True)
+        self.gestionnaire = gestionnaire
+        self.intervalle = intervalle
+        self.arret = threading.Event()
+
+    def run(self):
+        while not self.arret.is_set():
+            try:
+                noms = self.gestionnaire.choisir_fusion()
+                if noms:
+                    self.gestionnaire.fusionner(noms)
+                    continue
+                self.gestionnaire.effacer_segments_obsoletes()
+            except Exception as e:
+                print(f"❌ Erreur fusion de segments: {e}")
+            self.arret.wait(self.intervalle)
+
+    def arreter(self):
+        self.arret.set()
+        self.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index segmenté")
+    parser.add_argument('action', nargs='?', default='stats', choices=['stats', 'fusionner'])
+    parser.add_argument('--dossier', default='segments')
+    args = parser.parse_args()
+
+    gestionnaire = GestionnaireSegments(args.dossier)
+    if args.action == 'fusionner':
+        print(f"✓ {gestionnaire.fusionner_selon_politique()} fusion(s) effectuée(s)")
+
+    stats = gestionnaire.stats()
+    print("\n📊 Index segmenté:")
+    for key, value in stats.items():
+        print(f"  - {key}: {value}")
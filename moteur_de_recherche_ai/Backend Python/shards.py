@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index partitionné (shards)
+Les contenus sont répartis entre N bases SQLite selon une empreinte de leur
+chemin. L'indexation tourne en parallèle (un processus par shard) et les
+recherches interrogent tous les shards en parallèle (voir SearchEngine).
+Usage: python shards.py [dossier] --shards N [--incremental]
+"""
+
+import argparse
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+
+
+def numero_shard(chemin, nb_shards):
+    """Shard d'un fichier: empreinte stable de son chemin modulo le nombre de shards"""
+    return zlib.crc32(os.path.normpath(chemin).encode('utf-8')) % nb_shards
+
+
+class IndexPartitionne:
+    """
+    Ensemble de N bases SQLite au schéma complet (contenus, postings, manifeste)
+
+    Le nombre de shards est fixé à la première indexation et mémorisé dans
+    shards.json. Chaque thread garde ses propres connexions aux shards
+    (les connexions SQLite ne se partagent pas entre threads).
+    """
+
+    CONFIGURATION = 'shards.json'
+
+    def __init__(self, nb_shards, prefixe='ai_search_engine', dossier='.'):
+        self.nb_shards = nb_shards
+        self.prefixe = prefixe
+        self.dossier = os.path.abspath(dossier)
+        self.locales = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=nb_shards)
+
+    @classmethod
+    def charger(cls, dossier='.'):
+        """Charger la configuration existante (None si l'index n'est pas partitionné)"""
+        try:
+            with open(os.path.join(dossier, cls.CONFIGURATION), 'r', encoding='utf-8') as f:
+                configuration = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(configuration['nb_shards'], configuration['prefixe'], dossier)
+
+    @classmethod
+    def creer(cls, nb_shards, prefixe='ai_search_engine', dossier='.'):
+        """
+        Créer (ou rouvrir) un index partitionné en `nb_shards` bases
+        Le nombre de shards d'un index existant ne peut pas changer: les
+        contenus seraient cherchés dans le mauvais shard
+        """
+        existant = cls.charger(dossier)
+        if existant:
+            if existant.nb_shards != nb_shards:
+                raise ValueError(f"Index déjà partitionné en {existant.nb_shards} shards "
+                                 f"(supprimer {cls.CONFIGURATION} et les shards pour repartitionner)")
+            return existant
+
+        with open(os.path.join(dossier, cls.CONFIGURATION), 'w', encoding='utf-8') as f:
+            json.dump({'nb_shards': nb_shards, 'prefixe': prefixe}, f)
+        return cls(nb_shards, prefixe, dossier)
+
+    def chemin_shard(self, numero):
+        return os.path.join(self.dossier, f"{self.prefixe}_shard{numero:02d}.db")
+
+    def shard_de(self, chemin):
+        return numero_shard(chemin, self.nb_shards)
+
+    def connexion(self, numero):
+        """Connexion du thread courant au shard `numero`"""
+        connexions = getattr(self.locales, 'connexions', None)
+        if connexions is None:
+            connexions = self.locales.connexions = {}
+        if numero not in connexions:
+            db = DatabaseConfig(self.chemin_shard(numero))
+            db.connect()
+            connexions[numero] = db
+        return connexions[numero]
+
+    def executer(self, fonction):
+        """
+        Appeler fonction(db, numero) sur chaque shard en parallèle
+        (sqlite3 libère le GIL pendant l'exécution des requêtes)
+
+        Returns:
+            Liste des résultats, dans l'ordre des shards
+        """
+        return list(self.pool.map(lambda numero: fonction(self.connexion(numero), numero),
+                                  range(self.nb_shards)))
+
+    # --- Indexation ---
+
+    def indexer_dossier(self, dossier_corpus, incremental=False):
+        """
+        Indexer un dossier: chaque shard indexe sa part du corpus dans son
+        propre processus, sans contention d'écriture entre shards
+
+        Returns:
+            Compteurs additionnés sur tous les shards
+        """
+        with ProcessPoolExecutor(max_workers=self.nb_shards) as pool:
+            futures = [pool.submit(_indexer_shard, self.chemin_shard(numero), numero,
+                                   self.nb_shards, dossier_corpus, incremental)
+                       for numero in range(self.nb_shards)]
+            resultats = [future.result() for future in futures]
+
+        compteurs = {}
+        for compteurs_shard in resultats:
+            for cle, valeur in (compteurs_shard or {}).items():
+                if isinstance(valeur, list):
+                    compteurs.setdefault(cle, []).extend(valeur)
+                else:
+                    compteurs[cle] = compteurs.get(cle, 0) + valeur
+        return compteurs
+
+    def indexer_fichier(self, chemin):
+        """Indexer un fichier dans son shard"""
+        db = DatabaseConfig(self.chemin_shard(self.shard_de(chemin)))
+        db.connect()
+        db.create_tables()
+        try:
+            return DocumentIndexer(db).indexer_fichier(chemin)
+        finally:
+            db.close()
+
+    def get_stats(self):
+        """Statistiques de l'ensemble des shards"""
+        def stats_shard(db, numero):
+            stats = db.get_stats()
+            # Identifiants propres à chaque shard: comparer les textes des termes
+            db.cursor.execute('''
+                SELECT texte FROM termes
+                WHERE id IN (SELECT DISTINCT terme_id FROM index_mots_cles)
+            ''')
+            stats['mots_cles'] = {row[0] for row in db.cursor.fetchall()}
+            return stats
+
+        par_shard = self.executer(stats_shard)
+        stats = {cle: sum(s[cle] for s in par_shard)
+                 for cle in ['nb_documents', 'nb_images', 'nb_videos']}
+        stats['nb_mots_cles_uniques'] = len(set().union(*(s['mots_cles'] for s in par_shard)))
+        stats['nb_shards'] = self.nb_shards
+        return stats
+
+
+def _indexer_shard(chemin_db, numero, nb_shards, dossier_corpus, incremental):
+    """Indexer la part du corpus d'un shard (dans un processus dédié)"""
+    db = DatabaseConfig(chemin_db)
+    db.connect()
+    db.create_tables()
+    try:
+        indexer = DocumentIndexer(db)
+        return indexer.indexer_dossier(dossier_corpus, bulk=not incremental,
+                                       incremental=incremental,
+                                       filtre=lambda chemin: numero_shard(chemin, nb_shards) == numero)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index partitionné")
+    parser.add_argument('dossier', nargs='?', default='corpus')
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de shards (fixé à la première indexation)")
+    parser.add_argument('--incremental', action='store_true')
+    args = parser.parse_args()
+
+    index = IndexPartitionne.creer(args.shards)
+    index.indexer_dossier(args.dossier, incremental=args.incremental)
+
+    print("\n📊 Index partitionné:")
+    for key, value in index.get_stats().items():
+        print(f"  - {key}: {value}")
@@ -0,0 +1,159 @@
+import time
+from collections import Counter
+
+
+class StatistiquesCorpus:
+    """
+    Statistiques de classement BM25, tenues à jour par l'indexeur
+    - longueurs_contenus: nombre d'occurrences indexées de chaque contenu
+    - frequences_racines: nombre de contenus contenant chaque racine, et
+      bornes de sa fréquence dans un contenu (maximum de la fréquence et du
+      rapport fréquence / longueur, voir SearchEngine._termes_bm25)
+    - statistiques_corpus: compteurs globaux (clé -> valeur), dont la
+      génération de l'index, changée à chaque commit de l'indexeur
+
+    Une recherche ne lit que les lignes des racines et des contenus
+    concernés: aucune agrégation sur tout le corpus par requête.
+    Côté écriture, les fréquences par racine sont cumulées en mémoire et
+    écrites au commit de l'indexeur (voir ecrire)
+    """
+
+    def __init__(self, db_config):
+        self.db = db_config
+        self.deltas_racines = Counter()
+        self.maxima_racines = {}
+        self.delta_nb_contenus = 0
+        self.delta_somme_longueurs = 0
+
+    # --- Écriture (indexeur) ---
+
+    def ajouter_contenu(self, colonne_id, contenu_id, longueur, frequences_racines):
+        """
+        Compter un contenu indexé
+
+        Args:
+            longueur: Nombre d'occurrences indexées (somme des fréquences)
+            frequences_racines: Dict racine_id -> occurrences de la racine dans le contenu
+        """
+        self.db.cursor.execute('''
+            INSERT OR REPLACE INTO longueurs_contenus (colonne, contenu_id, longueur)
+            VALUES (?, ?, ?)
+        ''', (colonne_id, contenu_id, longueur))
+        self.deltas_racines.update(frequences_racines.keys())
+        for racine_id, frequence in frequences_racines.items():
+            maxima = self.maxima_racines.setdefault(racine_id, [0, 0.0])
+            maxima[0] = max(maxima[0], frequence)
+            maxima[1] = max(maxima[1], frequence / longueur)
+        self.delta_nb_contenus += 1
+        self.delta_somme_longueurs += longueur
+
+    def retirer_contenu(self, colonne_id, contenu_id, ids_racines):
+        """
+        Décompter un contenu supprimé (racines distinctes lues dans ses postings)
+        Les maxima des racines ne sont pas diminués: ils restent des bornes valides
+        """
+        self.db.cursor.execute('''
+            SELECT longueur FROM longueurs_contenus WHERE colonne = ? AND contenu_id = ?
+        ''', (colonne_id, contenu_id))
+        row = self.db.cursor.fetchone()
+        if not row:
+            return
+
+        self.db.cursor.execute('''
+            DELETE FROM longueurs_contenus WHERE colonne = ? AND contenu_id = ?
+        ''', (colonne_id, contenu_id))
+        self.deltas_racines.subtract(ids_racines)
+        self.delta_nb_contenus -= 1
+        self.delta_somme_longueurs -= row[0]
+
+    def ecrire(self):
+        """Reporter les compteurs cumulés dans la base (dans la transaction courante)"""
+        # Maxima de toutes les racines ajoutées, même à delta nul (contenu
+        # réindexé: retiré puis ajouté dans le même commit)
+        racines = {racine_id for racine_id, delta in self.deltas_racines.items() if delta}
+        racines.update(self.maxima_racines)
+        deltas = [(racine_id, self.deltas_racines[racine_id])
+                  + tuple(self.maxima_racines.get(racine_id, (0, 0.0)))
+                  for racine_id in racines]
+        if deltas:
+            self.db.cursor.executemany('''
+                INSERT INTO frequences_racines (racine_id, nb_contenus, frequence_max, ratio_max)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(racine_id) DO UPDATE SET
+                    nb_contenus = nb_contenus + excluded.nb_contenus,
+                    frequence_max = MAX(frequence_max, excluded.frequence_max),
+                    ratio_max = MAX(ratio_max, excluded.ratio_max)
+            ''', deltas)
+            self.db.cursor.execute('DELETE FROM frequences_racines WHERE nb_contenus <= 0')
+
+        for cle, delta in [('nb_contenus', self.delta_nb_contenus),
+                           ('somme_longueurs', self.delta_somme_longueurs)]:
+            if delta:
+                self.db.cursor.execute('''
+                    INSERT INTO statistiques_corpus (cle, valeur) VALUES (?, ?)
+                    ON CONFLICT(cle) DO UPDATE SET valeur = valeur + excluded.valeur
+                ''', (cle, delta))
+
+        self.deltas_racines.clear()
+        self.maxima_racines.clear()
+        self.delta_nb_contenus = 0
+        self.delta_somme_longueurs = 0
+
+    def incrementer_generation(self):
+        """
+        Changer la génération de l'index (dans la transaction courante)
+        Horodatage en millisecondes, strictement croissant: une base
+        réinitialisée ne retrouve pas une génération déjà servie
+        """
+        self.db.cursor.execute('''
+            INSERT INTO statistiques_corpus (cle, valeur) VALUES ('generation', ?)
+            ON CONFLICT(cle) DO UPDATE SET valeur = MAX(valeur + 1, excluded.valeur)
+        ''', (time.time_ns() // 1000000,))
+
+    # --- Lecture (moteur de recherche) ---
+
+    def corpus(self):
+        """(nombre de contenus, longueur moyenne d'un contenu)"""
+        self.db.cursor.execute('''
+            SELECT cle, valeur FROM statistiques_corpus
+            WHERE cle IN ('nb_contenus', 'somme_longueurs')
+        ''')
+        valeurs = dict(self.db.cursor.fetchall())
+        nb_contenus = valeurs.get('nb_contenus', 0)
+        moyenne = valeurs.get('somme_longueurs', 0) / nb_contenus if nb_contenus else 0
+        return nb_contenus, moyenne
+
+    def generation(self):
+        """Génération courante de l'index (0 avant le premier commit)"""
+        self.db.cursor.execute("SELECT valeur FROM statistiques_corpus WHERE cle = 'generation'")
+        row = self.db.cursor.fetchone()
+        return row[0] if row else 0
+
+    def racines(self, ids_racines):
+        """
+        Statistiques de chaque racine
+
+        Returns:
+            Dict racine_id -> (nb_contenus, frequence_max, ratio_max)
+        """
+        ids = list(ids_racines)
+        if not ids:
+            return {}
+        self.db.cursor.execute(f'''
+            SELECT racine_id, nb_contenus, frequence_max, ratio_max FROM frequences_racines
+            WHERE racine_id IN ({','.join(['?'] * len(ids))})
+        ''', ids)
+        return {row[0]: row[1:] for row in self.db.cursor.fetchall()}
+
+    def longueurs(self, colonne_id, ids_contenus, taille_lot=500):
+        """Longueur de chaque contenu (dict contenu_id -> longueur)"""
+        ids = list(ids_contenus)
+        longueurs = {}
+        for i in range(0, len(ids), taille_lot):
+            lot = ids[i:i + taille_lot]
+            self.db.cursor.execute(f'''
+                SELECT contenu_id, longueur FROM longueurs_contenus
+                WHERE colonne = ? AND contenu_id IN ({','.join(['?'] * len(lot))})
+            ''', [colonne_id] + lot)
+            longueurs.update(self.db.cursor.fetchall())
+        return longueurs
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Surveillance continue du corpus
+Les fichiers ajoutés, modifiés ou supprimés dans corpus/ sont indexés en
+quelques secondes, sans réindexation complète.
+Usage: python surveillant.py [--dossier corpus] [--polling]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from database_config import DatabaseConfig
+from indexer import DocumentIndexer
+from manifeste import ManifesteFichiers
+from segments import GestionnaireSegments, FusionneurArriere
+
+
+class SourceInotify:
+    """Événements du système de fichiers via inotify (Linux)"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    MASQUE = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE)
+    ENTETE = struct.Struct('iIII')
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self.dossiers_surveilles = {}
+        self.rescan_necessaire = False
+
+    @staticmethod
+    def disponible():
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+            return hasattr(libc, 'inotify_init1')
+        except OSError:
+            return False
+
+    def _surveiller(self, dossier):
+        """Surveiller un dossier et ses sous-dossiers; rend les fichiers déjà présents"""
+        fichiers = []
+        for root, dirs, files in os.walk(dossier):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.MASQUE)
+            if wd >= 0:
+                self.dossiers_surveilles[wd] = root
+            fichiers.extend(os.path.join(root, f) for f in files)
+        return fichiers
+
+    def _oublier(self, dossier):
+        """Ne plus surveiller un dossier retiré ni ses sous-dossiers"""
+        prefixe = os.path.join(dossier, '')
+        for wd, root in list(self.dossiers_surveilles.items()):
+            if root == dossier or root.startswith(prefixe):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dossiers_surveilles[wd]
+
+    def demarrer(self):
+        self._surveiller(self.dossier)
+
+    def evenements(self, timeout):
+        """
+        Attendre des événements au plus `timeout` secondes; rend les chemins
+        concernés. Un dossier déplacé hors du corpus ou supprimé est rendu
+        avec un séparateur final: ses fichiers indexés sont à retirer
+        """
+        lisibles, _, _ = select.select([self.fd], [], [], timeout)
+        if not lisibles:
+            return []
+
+        try:
+            donnees = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        chemins = []
+        decalage = 0
+        while decalage + self.ENTETE.size <= len(donnees):
+            wd, masque, _, longueur = self.ENTETE.unpack_from(donnees, decalage)
+            decalage += self.ENTETE.size
+            nom = donnees[decalage:decalage + longueur].rstrip(b'\0')
+            decalage += longueur
+
+            if masque & self.IN_Q_OVERFLOW:
+                # File du noyau pleine: des événements ont été perdus
+                self.rescan_necessaire = True
+                continue
+
+            if masque & self.IN_IGNORED:
+                # Surveillance retirée par le noyau (dossier supprimé)
+                self.dossiers_surveilles.pop(wd, None)
+                continue
+
+            dossier = self.dossiers_surveilles.get(wd)
+            if dossier is None or not nom:
+                continue
+            chemin = os.path.join(dossier, os.fsdecode(nom))
+
+            if masque & self.IN_ISDIR:
+                # Nouveau sous-dossier: le surveiller et prendre ses fichiers
+                if masque & (self.IN_CREATE | self.IN_MOVED_TO):
+                    chemins.extend(self._surveiller(chemin))
+                # Sous-dossier retiré: sa surveillance désignerait l'ancien chemin
+                elif masque & (self.IN_MOVED_FROM | self.IN_DELETE):
+                    self._oublier(chemin)
+                    chemins.append(os.path.join(chemin, ''))
+            else:
+                chemins.append(chemin)
+
+        return chemins
+
+    def arreter(self):
+        os.close(self.fd)
+
+
+class SourcePolling:
+    """Événements par comparaison périodique de l'état du dossier (repli portable)"""
+
+    def __init__(self, dossier, intervalle=2.0):
+        self.dossier = dossier
+        self.intervalle = intervalle
+        self.etat = {}
+        self.rescan_necessaire = False
+        self.prochain_scan = 0
+
+    def _scanner(self):
+        etat = {}
+        for root, dirs, files in os.walk(self.dossier):
+            for file in files:
+                chemin = os.path.join(root, file)
+                try:
+                    stat = os.stat(chemin)
+                except FileNotFoundError:
+                    continue
+                etat[chemin] = (stat.st_size, stat.st_mtime)
+        return etat
+
+    def demarrer(self):
+        self.etat = self._scanner()
+        self.prochain_scan = time.time() + self.intervalle
+
+    def evenements(self, timeout):
+        attente = self.prochain_scan - time.time()
+        if attente > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(attente, 0))
+
+        etat = self._scanner()
+        chemins = [c for c, e in etat.items() if self.etat.get(c) != e]
+        chemins.extend(c for c in self.etat if c not in etat)
+        self.etat = etat
+        self.prochain_scan = time.time() + self.intervalle
+        return chemins
+
+    def arreter(self):
+        pass
+
+
+class SurveillantCorpus:
+    """
+    Surveille le corpus et indexe les changements par micro-lots
+    - les événements d'un même fichier sont regroupés (anti-rebond): un
+      fichier n'est traité qu'après `delai_debounce` secondes sans événement
+    - les fichiers prêts sont indexés par lots d'au plus `taille_lot`,
+      chaque lot dans une seule transaction
+    - profondeur de file et retard sont exposés par etat() et écrits
+      périodiquement dans `fichier_etat`
+    """
+
+    def __init__(self, db_config, dossier='corpus', delai_debounce=1.0, taille_lot=20,
+                 forcer_polling=False, intervalle_polling=2.0,
+                 fichier_etat='surveillant_etat.json', segments=None):
+        self.db = db_config
+        self.dossier = dossier
+        self.delai_debounce = delai_debounce
+        self.taille_lot = taille_lot
+        self.fichier_etat = fichier_etat
+
+        # En mode segmenté, chaque micro-lot devient un petit segment;
+        # un fusionneur d'arrière-plan les regroupe
+        self.segments = segments
+        self.fusionneur = FusionneurArriere(segments) if segments else None
+        
+        self.indexer = DocumentIndexer(db_config, segments=segments)
+        self.manifeste = ManifesteFichiers(db_config)
+
+        if not forcer_polling and SourceInotify.disponible():
+            self.source = SourceInotify(dossier)
+            self.mode = 'inotify'
+        else:
+            self.source = SourcePolling(dossier, intervalle_polling)
+            self.mode = 'polling'
+
+        # chemin -> (premier événement, dernier événement)
+        self.en_attente = {}
+        self.arret = False
+        self.stats = {'nb_lots': 0, 'nb_indexes': 0, 'nb_supprimes': 0,
+                      'nb_erreurs': 0, 'duree_dernier_lot_ms': 0, 'dernier_lot': None}
+
+    def signaler(self, chemin, instant=None):
+        """
+        Signaler un changement sur un fichier, ou sur chaque fichier indexé
+        d'un dossier retiré (chemin terminé par un séparateur)
+        """
+        instant = instant or time.time()
+        if chemin.endswith(os.sep):
+            for indexe in [c for c in self.manifeste.entrees if c.startswith(chemin)]:
+                self.signaler(indexe, instant)
+            return
+        premier = self.en_attente.get(chemin, (instant, instant))[0]
+        self.en_attente[chemin] = (premier, instant)
+
+    def etat(self):
+        """Profondeur de la file d'attente et retard du plus ancien changement non indexé"""
+        maintenant = time.time()
+        plus_ancien = min((p for p, _ in self.en_attente.values()), default=None)
+        return {
+            'mode': self.mode,
+            'dossier': os.path.abspath(self.dossier),
+            'profondeur_file': len(self.en_attente),
+            'retard_s': round(maintenant - plus_ancien, 3) if plus_ancien else 0,
+            'mis_a_jour': maintenant,
+            **self.stats
+        }
+
+    def _lot_pret(self):
+        """Fichiers sans événement depuis delai_debounce, plus anciens d'abord"""
+        limite = time.time() - self.delai_debounce
+        prets = sorted((p, c) for c, (p, d) in self.en_attente.items() if d <= limite)
+        lot = [c for _, c in prets[:self.taille_lot]]
+        for chemin in lot:
+            del self.en_attente[chemin]
+        return lot
+
+    def _traiter_lot(self, chemins):
+        """Indexer (ou retirer de l'index) un micro-lot de fichiers"""
+        debut = time.time()
+
+        with self.indexer.transaction():
+            for chemin in chemins:
+                try:
+                    self._traiter_fichier(chemin)
+                except Exception as e:
+                    print(f"❌ Erreur avec {chemin}: {e}")
+                    self.stats['nb_erreurs'] += 1
+
+        self.stats['nb_lots'] += 1
+        self.stats['duree_dernier_lot_ms'] = round((time.time() - debut) * 1000, 1)
+        self.stats['dernier_lot'] = time.time()
+
+    def _traiter_fichier(self, chemin):
+        if not os.path.exists(chemin):
+            entree = self.manifeste.entrees.get(chemin)
+            if entree:
+                self.indexer.supprimer_contenu(chemin, entree[3])
+                self.manifeste.supprimer(chemin)
+                self.stats['nb_supprimes'] += 1
+                print(f"🗑️  Retiré de l'index: {chemin}")
+            return
+
+        categorie = self.indexer.categorie_fichier(chemin)
+        if not categorie:
+            return
+
+        etat, empreinte = self.manifeste.comparer(chemin)
+        if etat == 'inchange':
+            return
+
+        if self.indexer.indexer_fichier(chemin, categorie):
+            self.manifeste.enregistrer(chemin, categorie, empreinte)
+            self.stats['nb_indexes'] += 1
+        else:
+            self.stats['nb_erreurs'] += 1
+
+    def _rattraper(self):
+        """Signaler tous les fichiers du corpus (démarrage, événements perdus)"""
+        for chemin, _ in self.indexer.lister_fichiers(self.dossier):
+            self.signaler(chemin)
+        for chemin in list(self.manifeste.entrees):
+            if chemin.startswith(os.path.join(self.dossier, '')) and not os.path.exists(chemin):
+                self.signaler(chemin)
+
+    def _publier_etat(self):
+        if not self.fichier_etat:
+            return
+        temporaire = f"{self.fichier_etat}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(self.etat(), f, ensure_ascii=False)
+        os.replace(temporaire, self.fichier_etat)
+
+    def executer(self, intervalle_etat=5.0):
+        """Boucle principale (Ctrl+C pour arrêter)"""
+        print(f"👀 Surveillance de {os.path.abspath(self.dossier)} ({self.mode})")
+
+        self.manifeste.charger()
+        self.source.demarrer()
+        if self.fusionneur:
+            self.fusionneur.start()
+        # Rattraper les changements survenus pendant l'arrêt du surveillant
+        self._rattraper()
+        prochain_etat = 0
+
+        try:
+            while not self.arret:
+                for chemin in self.source.evenements(timeout=self.delai_debounce / 2):
+                    self.signaler(chemin)
+
+                if self.source.rescan_necessaire:
+                    print("⚠️  Événements perdus, nouveau parcours du corpus")
+                    self.source.rescan_necessaire = False
+                    self._rattraper()
+
+                lot = self._lot_pret()
+                if lot:
+                    self._traiter_lot(lot)
+
+                if time.time() >= prochain_etat:
+                    self._publier_etat()
+                    etat = self.etat()
+                    if etat['profondeur_file'] or lot:
+                        print(f"📊 File: {etat['profondeur_file']} | Retard: {etat['retard_s']:.1f} s "
+                              f"| Indexés: {etat['nb_indexes']}")
+                    prochain_etat = time.time() + intervalle_etat
+
+        except KeyboardInterrupt:
+            print("\n⏹️  Surveillance arrêtée")
+        finally:
+            self.source.arreter()
+            if self.fusionneur:
+                self.fusionneur.arreter()
+            self._publier_etat()
+
+
+def lire_etat(fichier_etat='surveillant_etat.json'):
+    """Lire le dernier état publié par le surveillant (None s'il ne tourne pas)"""
+    try:
+        with open(fichier_etat, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Surveillance continue du corpus")
+    parser.add_argument('--dossier', default='corpus')
+    parser.add_argument('--polling', action='store_true',
+                        help="Forcer le mode polling (sans inotify)")
+    parser.add_argument('--intervalle-polling', type=float, default=2.0)
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help="Délai sans événement avant d'indexer un fichier (s)")
+    parser.add_argument('--taille-lot', type=int, default=20)
+    parser.add_argument('--segments', action='store_true',
+                        help="Indexer dans l'index segmenté (dossier segments/)")
+    args = parser.parse_args()
+
+    db = DatabaseConfig()
+    db.connect()
+    db.create_tables()
+
+    surveillant = SurveillantCorpus(db, args.dossier,
+                                    delai_debounce=args.debounce,
+                                    taille_lot=args.taille_lot,
+                                    forcer_polling=args.polling,
+                                    intervalle_polling=args.intervalle_polling,
+                                    segments=GestionnaireSegments() if args.segments else None)
+    try:
+        surveillant.executer()
+    finally:
+        db.close()
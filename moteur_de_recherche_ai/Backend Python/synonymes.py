@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+from collections import deque
+from text_processor import TextProcessor, plier
+
+# Dictionnaire des synonymes livré avec le moteur
+FICHIER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synonymes.json')
+
+
+class AutomateSynonymes:
+    """
+    Expressions du dictionnaire des synonymes compilées en automate
+    d'Aho-Corasick sur les tokens (formes pliées): toutes les expressions
+    d'une requête, d'un ou plusieurs mots, sont trouvées en un seul
+    parcours de ses tokens
+
+    Chaque expression a ses expansions, avec leur poids (part de la
+    fréquence d'une expansion comptée pour le mot de la requête, voir
+    SearchEngine._racines_ponderees), déjà découpées en (mot, racine)
+    """
+
+    def __init__(self, synonymes, poids_defaut=1.0, processor=None):
+        """
+        Args:
+            synonymes: Dict expression -> liste de textes (poids par défaut)
+                       ou dict texte -> poids
+        """
+        processor = processor or TextProcessor()
+
+        # État -> {token: état suivant}, état de repli, (longueur, expression) reconnues
+        self.transitions = [{}]
+        self.echecs = [0]
+        self.sorties = [[]]
+        self.expansions = {}
+
+        for expression, expansions in synonymes.items():
+            tokens = tuple(plier(token) for token in processor.tokeniser(expression))
+            if not tokens:
+                continue
+            if not isinstance(expansions, dict):
+                expansions = dict.fromkeys(expansions, poids_defaut)
+
+            compilees = []
+            for texte, poids in expansions.items():
+                mots = tuple((token, racine) for token in processor.tokeniser(texte)
+                             for racine in [processor._analyser_token(token)] if racine is not None)
+                # L'expression elle-même n'est pas une expansion
+                if mots and tuple(plier(mot) for mot in processor.tokeniser(texte)) != tokens:
+                    compilees.append((mots, float(poids)))
+            if not compilees:
+                continue
+
+            etat = 0
+            for token in tokens:
+                suivant = self.transitions[etat].get(token)
+                if suivant is None:
+                    suivant = self.transitions[etat][token] = len(self.transitions)
+                    self.transitions.append({})
+                    self.echecs.append(0)
+                    self.sorties.append([])
+                etat = suivant
+            if tokens not in self.expansions:
+                self.sorties[etat].append((len(tokens), tokens))
+            self.expansions[tokens] = compilees
+
+        # États de repli (plus long suffixe reconnu) en largeur d'abord: les
+        # expressions reconnues par le repli le sont aussi par l'état
+        file = deque(self.transitions[0].values())
+        while file:
+            etat = file.popleft()
+            for token, suivant in self.transitions[etat].items():
+                repli = self.echecs[etat]
+                while repli and token not in self.transitions[repli]:
+                    repli = self.echecs[repli]
+                self.echecs[suivant] = self.transitions[repli].get(token, 0)
+                self.sorties[suivant] = self.sorties[suivant] + self.sorties[self.echecs[suivant]]
+                file.append(suivant)
+
+    def __len__(self):
+        return len(self.expansions)
+
+    def correspondances(self, tokens):
+        """
+        Expressions trouvées dans une suite de tokens: la plus à gauche,
+        puis la plus longue, sans chevauchement
+
+        Returns:
+            Liste de (début, fin, expansions): tokens[début:fin] est
+            l'expression, expansions est une liste de (mots, poids) avec
+            mots un tuple de (mot, racine)
+        """
+        trouvees = []
+        etat = 0
+        for i, token in enumerate(tokens):
+            token = plier(token)
+            while etat and token not in self.transitions[etat]:
+                etat = self.echecs[etat]
+            etat = self.transitions[etat].get(token, 0)
+            for longueur, expression in self.sorties[etat]:
+                trouvees.append((i + 1 - longueur, i + 1, expression))
+
+        trouvees.sort(key=lambda c: (c[0], c[0] - c[1]))
+        retenues, fin_precedente = [], 0
+        for debut, fin, expression in trouvees:
+            if debut >= fin_precedente:
+                retenues.append((debut, fin, self.expansions[expression]))
+                fin_precedente = fin
+        return retenues
+
+
+class DictionnaireSynonymes:
+    """
+    Dictionnaire des synonymes lu dans un fichier JSON, compilé une fois
+    (voir AutomateSynonymes) et partagé par les moteurs du processus
+
+    Le fichier est rechargé à chaud: l'automate est recompilé quand sa
+    date de modification ou sa taille change. Un fichier illisible laisse
+    l'automate précédent en place. Format:
+        {"poids_defaut": 1.0,
+         "synonymes": {"cnn": ["convolutional neural network", ...],
+                       "model": {"modèle": 1.0, "modélisation": 0.5}}}
+    """
+
+    # Dictionnaires partagés: chemin du fichier -> DictionnaireSynonymes
+    _instances = {}
+    _verrou_instances = threading.Lock()
+
+    def __init__(self, chemin=FICHIER):
+        self.chemin = chemin
+        self.signature = None
+        self.automate_courant = AutomateSynonymes({})
+        self.verrou = threading.Lock()
+
+        # Changé à chaque rechargement (clé du cache des résultats)
+        self.version = 0
+
+    @classmethod
+    def partage(cls, chemin=FICHIER):
+        """Dictionnaire du fichier, commun à tout le processus"""
+        with cls._verrou_instances:
+            if chemin not in cls._instances:
+                cls._instances[chemin] = cls(chemin)
+            return cls._instances[chemin]
+
+    def _signature_fichier(self):
+        try:
+            infos = os.stat(self.chemin)
+        except OSError:
+            return None
+        return infos.st_mtime_ns, infos.st_size
+
+    def automate(self):
+        """Automate du fichier, recompilé s'il a changé depuis le dernier chargement"""
+        if self._signature_fichier() != self.signature:
+            self.recharger()
+        return self.automate_courant
+
+    def recharger(self):
+        """
+        Relire et recompiler le fichier (sans fichier: aucun synonyme)
+
+        Returns:
+            True si l'automate a été remplacé
+        """
+        with self.verrou:
+            signature = self._signature_fichier()
+            if signature == self.signature:
+                return False
+            try:
+                if signature is None:
+                    automate = AutomateSynonymes({})
+                else:
+                    with open(self.chemin, encoding='utf-8') as f:
+                        config = json.load(f)
+                    automate = AutomateSynonymes(config.get('synonymes', {}),
+                                                 config.get('poids_defaut', 1.0))
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                print(f"⚠️ Synonymes non rechargés ({self.chemin}): {e}")
+                self.signature = signature
+                return False
+
+            self.automate_courant = automate
+            self.signature = signature
+            self.version += 1
+            if signature is not None:
+                print(f"✓ {len(automate)} expressions synonymes chargées depuis {self.chemin}")
+            return True
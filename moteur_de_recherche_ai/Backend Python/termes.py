@@ -0,0 +1,135 @@
+import threading
+from text_processor import plier
+
+
+class DictionnaireTermes:
+    """
+    Dictionnaire des termes (table termes): chaque forme de surface et
+    chaque racine est stockée une seule fois et désignée par un entier
+    dans index_mots_cles
+
+    Le miroir en mémoire texte -> id est chargé une fois par base et
+    partagé par toutes les connexions du processus (une par requête
+    dans app.py). Un terme absent du miroir est cherché dans la base,
+    où un autre processus a pu l'ajouter. Les termes créés par une
+    transaction restent dans les identifiants en attente de l'instance
+    jusqu'à son commit (voir valider): une transaction annulée, ou une
+    connexion fermée sans commit, ne laisse aucun identifiant dans le miroir.
+    
+    Chaque terme porte aussi sa forme pliée (sans accents ni majuscules,
+    colonne indexée forme_pliee): les requêtes sont résolues par elle.
+    """
+
+    # Miroirs partagés: chemin de la base -> {texte: id}
+    _miroirs = {}
+    _verrou = threading.Lock()
+
+    def __init__(self, db_config):
+        self.db = db_config
+        with self._verrou:
+            if db_config.db_path not in self._miroirs:
+                self.db.cursor.execute('SELECT texte, id FROM termes')
+                self._miroirs[db_config.db_path] = dict(self.db.cursor.fetchall())
+            self.ids = self._miroirs[db_config.db_path]
+
+        # Termes créés dans la transaction courante: texte -> id
+        self.en_attente = {}
+
+    @classmethod
+    def oublier(cls, db_path):
+        """Oublier le miroir d'une base (tables supprimées ou réinitialisées)"""
+        with cls._verrou:
+            cls._miroirs.pop(db_path, None)
+
+    def valider(self):
+        """Publier dans le miroir partagé les termes créés, après le commit de la transaction"""
+        if self.en_attente:
+            with self._verrou:
+                self.ids.update(self.en_attente)
+            self.en_attente = {}
+
+    def _oublier_annules(self):
+        """
+        Oublier les termes en attente d'une transaction terminée sans valider
+        (annulée, ou validée hors de l'indexeur: ils sont alors relus dans la base)
+        """
+        if self.en_attente and not self.db.conn.in_transaction:
+            self.en_attente = {}
+
+    def identifiant(self, texte):
+        """Identifiant d'un terme existant, ou None s'il n'a jamais été indexé"""
+        self._oublier_annules()
+        id_terme = self.ids.get(texte) or self.en_attente.get(texte)
+        if id_terme is None:
+            self.db.cursor.execute('SELECT id FROM termes WHERE texte = ?', (texte,))
+            row = self.db.cursor.fetchone()
+            if row:
+                id_terme = row[0]
+                # Une transaction ouverte sur la connexion peut avoir créé le terme
+                if not self.db.conn.in_transaction:
+                    self.ids[texte] = id_terme
+        return id_terme
+
+    def identifiants_existants(self, textes):
+        """Identifiants des termes déjà indexés (les termes inconnus sont ignorés)"""
+        ids = (self.identifiant(texte) for texte in textes)
+        return [id_terme for id_terme in ids if id_terme is not None]
+
+    def variantes_pliees(self, textes):
+        """
+        Termes indexés ayant la même forme pliée que l'un des textes
+        (réseau, reseau et Réseau se confondent)
+        Lus dans la base à chaque appel: un autre processus a pu ajouter
+        une variante d'un terme déjà connu
+        
+        Returns:
+            Liste de (id, texte), par identifiant croissant
+        """
+        pliees = sorted({plier(texte) for texte in textes})
+        if not pliees:
+            return []
+        self.db.cursor.execute(f'''
+            SELECT id, texte FROM termes
+            WHERE forme_pliee IN ({','.join(['?'] * len(pliees))})
+            ORDER BY id
+        ''', pliees)
+        return self.db.cursor.fetchall()
+    
+    def identifiants_plies(self, textes):
+        """Identifiants des termes indexés ayant la même forme pliée que l'un des textes"""
+        return [id_terme for id_terme, _ in self.variantes_pliees(textes)]
+    
+    def identifiants(self, textes):
+        """
+        Identifiants de termes, créés dans la table termes si nécessaire
+        (dans la transaction courante de l'indexeur, publiés par valider)
+
+        Returns:
+            Liste d'identifiants, dans l'ordre de `textes`
+        """
+        self._oublier_annules()
+        nouveaux = {texte for texte in textes if texte not in self.ids and texte not in self.en_attente}
+        if nouveaux:
+            # INSERT OR IGNORE: un autre processus a pu créer le terme entre-temps
+            self.db.cursor.executemany('INSERT OR IGNORE INTO termes (texte, forme_pliee) VALUES (?, ?)',
+                                       [(texte, plier(texte)) for texte in nouveaux])
+            for texte in nouveaux:
+                self.db.cursor.execute('SELECT id FROM termes WHERE texte = ?', (texte,))
+                self.en_attente[texte] = self.db.cursor.fetchone()[0]
+        return [self.ids.get(texte) or self.en_attente[texte] for texte in textes]
+
+    def postings_ids(self, postings):
+        """
+        Remplacer mots et racines des postings par leurs identifiants
+
+        Args:
+            postings: Tuples (mot, racine, frequence, blob_positions)
+
+        Returns:
+            Tuples (terme_id, racine_id, frequence, blob_positions)
+        """
+        ids = self.identifiants([mot for mot, _, _, _ in postings]
+                                + [racine for _, racine, _, _ in postings])
+        nb = len(postings)
+        return [(ids[i], ids[nb + i], freq, positions)
+                for i, (_, _, freq, positions) in enumerate(postings)]
@@ -1,10 +1,90 @@
 import re
 import string
-from collections import Counter
+import unicodedata
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# Un token est une suite de caractères de mot (lettres accentuées comprises)
+MOT_REGEX = re.compile(r'[\wàâäéèêëïîôùûüÿæœç]+')
+
+@lru_cache(maxsize=200000)
+def plier(texte):
+    """Forme pliée d'un terme: minuscules, sans accents ni ligatures de compatibilité (Réseau -> reseau)"""
+    decompose = unicodedata.normalize('NFKD', texte.lower())
+    return ''.join(c for c in decompose if not unicodedata.combining(c))
+
+class ColonnesTexte:
+    """
+    Résultat colonnaire du traitement d'un lot de textes (voir TextProcessor.traiter_lot)
+    - termes[i] et racines[j]: vocabulaire du lot, l'identifiant est l'indice
+    - racine_du_terme[i]: identifiant de la racine du terme i
+    - documents[k]: pour le k-ième texte, trois array('I') parallèles
+      (identifiants des termes, identifiants des racines, positions),
+      une entrée par occurrence retenue
+    """
+    
+    def __init__(self):
+        self.termes = []
+        self.racines = []
+        self.racine_du_terme = array('I')
+        self.ids_termes = {}
+        self.ids_racines = {}
+        self.documents = []
+    
+    def __len__(self):
+        return len(self.documents)
+    
+    def ajouter_terme(self, mot, racine):
+        """Identifiant d'un terme (ajouté au vocabulaire s'il est nouveau)"""
+        id_terme = self.ids_termes.get(mot)
+        if id_terme is None:
+            id_racine = self.ids_racines.get(racine)
+            if id_racine is None:
+                id_racine = self.ids_racines[racine] = len(self.racines)
+                self.racines.append(racine)
+            id_terme = self.ids_termes[mot] = len(self.termes)
+            self.termes.append(mot)
+            self.racine_du_terme.append(id_racine)
+        return id_terme
+    
+    def fusionner(self, autre):
+        """Ajouter les documents d'un autre lot, identifiants convertis dans ce vocabulaire"""
+        conversion = array('I', [self.ajouter_terme(mot, autre.racines[autre.racine_du_terme[i]])
+                                 for i, mot in enumerate(autre.termes)])
+        for ids_termes, _, positions in autre.documents:
+            ids_termes = array('I', [conversion[i] for i in ids_termes])
+            ids_racines = array('I', [self.racine_du_terme[i] for i in ids_termes])
+            self.documents.append((ids_termes, ids_racines, positions))
+
 
 class TextProcessor:
     """Classe pour le traitement et l'indexation du texte"""
     
+    # Dictionnaire de lemmes courants pour l'IA/ML
+    LEMMES = {
+        'algorithmes': 'algorithme',
+        'réseaux': 'réseau',
+        'neurones': 'neurone',
+        'données': 'donnée',
+        'modèles': 'modèle',
+        'apprentissage': 'apprendre',
+        'entraînement': 'entraîner',
+        'prédictions': 'prédiction',
+        'classifications': 'classification',
+        'optimisations': 'optimisation',
+        'networks': 'network',
+        'models': 'model',
+        'algorithms': 'algorithm',
+        'predictions': 'prediction',
+        'training': 'train',
+        'learning': 'learn'
+    }
+    
+    # Nombre de tokens distincts dont l'analyse (racine) est mémorisée
+    TAILLE_CACHE_TOKENS = 200000
+    
     def __init__(self):
         # Anti-dictionnaire (mots vides) en français et anglais
         self.stop_words_fr = {
@@ -45,28 +125,42 @@ class TextProcessor:
             'tion', 'sion', 'ance', 'ence', 'able', 'ible', 'al', 'ful',
             'less', 'ous', 'ive', 'ize', 'ise'
         ]
+        
+        # Suffixes précompilés: (longueur, ensemble) du plus long au plus court.
+        # À longueur égale un seul suffixe peut terminer le mot: même résultat
+        # que le parcours de la liste triée par longueur décroissante
+        self._suffixes_fr = self._compiler_suffixes(self.suffixes_fr)
+        self._suffixes_en = self._compiler_suffixes(self.suffixes_en)
+        
+        # Mémo borné token -> racine (None pour un mot vide ou trop court)
+        self._analyser_token = lru_cache(maxsize=self.TAILLE_CACHE_TOKENS)(self._analyser)
+    
+    @staticmethod
+    def _compiler_suffixes(suffixes):
+        longueurs = sorted({len(s) for s in suffixes}, reverse=True)
+        return [(n, frozenset(s for s in suffixes if len(s) == n)) for n in longueurs]
     
     def nettoyer_texte(self, texte):
         """Nettoyer le texte: minuscules, suppression ponctuation"""
         if not texte:
             return ""
         
-        # Convertir en minuscules
-        texte = texte.lower()
-        
-        # Remplacer les caractères spéciaux par des espaces
-        texte = re.sub(r'[^\w\sàâäéèêëïîôùûüÿæœç]', ' ', texte)
-        
-        # Supprimer les espaces multiples
-        texte = re.sub(r'\s+', ' ', texte)
-        
-        return texte.strip()
+        # Minuscules, ponctuation et espaces multiples remplacés par un espace
+        return ' '.join(self.tokeniser(texte))
     
     def tokeniser(self, texte):
-        """Diviser le texte en tokens (mots)"""
-        texte_propre = self.nettoyer_texte(texte)
-        tokens = texte_propre.split()
-        return tokens
+        """Diviser le texte en tokens (mots), en une seule passe"""
+        if not texte:
+            return []
+        return MOT_REGEX.findall(texte.lower())
+    
+    def plier(self, mot):
+        """
+        Pliage d'un terme (accents et casse), calculé à l'indexation pour
+        chaque terme du dictionnaire: une requête sans accents retrouve
+        le texte accentué, et inversement
+        """
+        return plier(mot)
     
     def appliquer_anti_dictionnaire(self, tokens):
         """Supprimer les mots vides (stop words)"""
@@ -80,15 +174,11 @@ class TextProcessor:
         if len(mot) <= 3:
             return mot
         
-        # Essayer les suffixes français
-        for suffixe in sorted(self.suffixes_fr, key=len, reverse=True):
-            if mot.endswith(suffixe) and len(mot) - len(suffixe) >= 3:
-                return mot[:-len(suffixe)]
-        
-        # Essayer les suffixes anglais
-        for suffixe in sorted(self.suffixes_en, key=len, reverse=True):
-            if mot.endswith(suffixe) and len(mot) - len(suffixe) >= 3:
-                return mot[:-len(suffixe)]
+        # Essayer les suffixes français, puis anglais
+        for suffixes in (self._suffixes_fr, self._suffixes_en):
+            for longueur, ensemble in suffixes:
+                if len(mot) - longueur >= 3 and mot[-longueur:] in ensemble:
+                    return mot[:-longueur]
         
         return mot
     
@@ -97,27 +187,13 @@ class TextProcessor:
         Lemmatisation simplifiée
         (Pour une vraie lemmatisation, utiliser spaCy ou NLTK)
         """
-        # Dictionnaire de lemmes courants pour l'IA/ML
-        lemmes = {
-            'algorithmes': 'algorithme',
-            'réseaux': 'réseau',
-            'neurones': 'neurone',
-            'données': 'donnée',
-            'modèles': 'modèle',
-            'apprentissage': 'apprendre',
-            'entraînement': 'entraîner',
-            'prédictions': 'prédiction',
-            'classifications': 'classification',
-            'optimisations': 'optimisation',
-            'networks': 'network',
-            'models': 'model',
-            'algorithms': 'algorithm',
-            'predictions': 'prediction',
-            'training': 'train',
-            'learning': 'learn'
-        }
-        
-        return lemmes.get(mot, mot)
+        return self.LEMMES.get(mot, mot)
+    
+    def _analyser(self, token):
+        """Racine d'un token (lemmatisé puis racinisé), None s'il est filtré"""
+        if token in self.stop_words or len(token) <= 2:
+            return None
+        return self.raciniser(self.lemmatiser_simple(token))
     
     def extraire_mots_cles(self, texte, min_freq=1):
         """
@@ -128,24 +204,17 @@ class TextProcessor:
         4. Lemmatisation
         5. Racinisation
         """
-        # Tokenisation
-        tokens = self.tokeniser(texte)
-        
-        # Appliquer l'anti-dictionnaire
-        tokens_filtres = self.appliquer_anti_dictionnaire(tokens)
-        
-        # Lemmatisation et racinisation
-        mots_cles = []
-        racines = []
+        analyser = self._analyser_token
         
-        for token in tokens_filtres:
-            lemme = self.lemmatiser_simple(token)
-            racine = self.raciniser(lemme)
-            mots_cles.append(token)
-            racines.append(racine)
+        # Tokenisation, anti-dictionnaire, lemmatisation et racinisation (mémorisées)
+        couples = []
+        for token in self.tokeniser(texte):
+            racine = analyser(token)
+            if racine is not None:
+                couples.append((token, racine))
         
         # Calculer les fréquences
-        freq_mots = Counter(zip(mots_cles, racines))
+        freq_mots = Counter(couples)
         
         # Filtrer par fréquence minimale
         resultats = [
@@ -162,13 +231,86 @@ class TextProcessor:
         CETTE MÉTHODE ÉTAIT MANQUANTE - C'EST LA CAUSE DE L'ERREUR
         """
         tokens = self.tokeniser(texte)
+        return self._filtrer_avec_positions(tokens)
+    
+    def extraire_avec_positions_flux(self, pages):
+        """
+        Version incrémentale de extraire_avec_positions pour un texte découpé
+        en pages (générateur): chaque page est tokenisée dès qu'elle arrive.
+        Les positions restent continues d'une page à l'autre, identiques à
+        celles obtenues sur le texte complet "\n".join(pages)
+        
+        Yields:
+            Liste des mots-clés (avec positions) de chaque page
+        """
+        decalage = 0
+        for page in pages:
+            tokens = self.tokeniser(page)
+            yield self._filtrer_avec_positions(tokens, decalage)
+            decalage += len(tokens)
+    
+    def traiter_lot(self, textes, workers=1, taille_paquet=16):
+        """
+        Traiter un lot de textes sans créer de dict par occurrence
+        
+        Args:
+            textes: Itérable de textes (consommé au fil de l'eau)
+            workers: Nombre de processus (1 = dans ce processus)
+            taille_paquet: Nombre de textes envoyés à la fois à un processus
+        
+        Returns:
+            ColonnesTexte, documents dans l'ordre des textes; mêmes occurrences
+            que extraire_avec_positions sur chaque texte
+        """
+        colonnes = ColonnesTexte()
+        
+        if workers <= 1:
+            for texte in textes:
+                self._ajouter_colonnes(colonnes, texte)
+            return colonnes
+        
+        # Au plus 2 paquets en attente par processus: mémoire bornée
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            en_cours = deque()
+            for paquet in _paquets(textes, taille_paquet):
+                if len(en_cours) >= 2 * workers:
+                    colonnes.fusionner(en_cours.popleft().result())
+                en_cours.append(pool.submit(_traiter_paquet_worker, paquet))
+            while en_cours:
+                colonnes.fusionner(en_cours.popleft().result())
+        
+        return colonnes
+    
+    def _ajouter_colonnes(self, colonnes, texte):
+        """Ajouter les occurrences d'un texte à un ColonnesTexte"""
+        ids_termes = array('I')
+        ids_racines = array('I')
+        positions = array('I')
+        ids_connus = colonnes.ids_termes
+        racine_du_terme = colonnes.racine_du_terme
+        analyser = self._analyser_token
+        
+        for i, token in enumerate(self.tokeniser(texte)):
+            id_terme = ids_connus.get(token)
+            if id_terme is None:
+                racine = analyser(token)
+                if racine is None:
+                    continue
+                id_terme = colonnes.ajouter_terme(token, racine)
+            ids_termes.append(id_terme)
+            ids_racines.append(racine_du_terme[id_terme])
+            positions.append(i)
+        
+        colonnes.documents.append((ids_termes, ids_racines, positions))
+    
+    def _filtrer_avec_positions(self, tokens, decalage=0):
+        """Filtrer, lemmatiser et raciniser des tokens en conservant leur position"""
         tokens_filtres_avec_pos = []
+        analyser = self._analyser_token
         
-        position = 0
-        for i, token in enumerate(tokens):
-            if token not in self.stop_words and len(token) > 2:
-                lemme = self.lemmatiser_simple(token)
-                racine = self.raciniser(lemme)
+        for i, token in enumerate(tokens, decalage):
+            racine = analyser(token)
+            if racine is not None:
                 tokens_filtres_avec_pos.append({
                     'mot': token,
                     'racine': racine,
@@ -178,6 +320,28 @@ class TextProcessor:
         return tokens_filtres_avec_pos
 
 
+def _paquets(textes, taille_paquet):
+    paquet = []
+    for texte in textes:
+        paquet.append(texte)
+        if len(paquet) >= taille_paquet:
+            yield paquet
+            paquet = []
+    if paquet:
+        yield paquet
+
+
+# Processeur propre à chaque processus de travail (voir traiter_lot)
+_processeur_worker = None
+
+def _traiter_paquet_worker(textes):
+    """Traiter un paquet de textes dans un processus de travail"""
+    global _processeur_worker
+    if _processeur_worker is None:
+        _processeur_worker = TextProcessor()
+    return _processeur_worker.traiter_lot(textes)
+
+
 # Test du processeur de texte
 if __name__ == "__main__":
     processor = TextProcessor()